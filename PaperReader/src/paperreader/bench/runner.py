@@ -0,0 +1,231 @@
+"""Offline end-to-end benchmark of ``run_pipeline`` against the fake services.
+
+Synthetic DOIs are pushed through the real pipeline in a temporary data
+directory. A share of them get a stub PDF, so they go to the fake
+Uni-parser; the rest download XML from the fake Elsevier endpoint. Every
+LLM call goes to the fake chat API, or to its batch endpoints with
+``BenchConfig.batch``. Stage latencies come from the
+pipeline's progress events: a stage's time runs from the previous event of
+the same DOI until the event that records the stage.
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from paperreader.bench.servers import FakeElsevier, FakeLLM, FakeUniParser, FaultConfig
+from paperreader.config import Settings
+from paperreader.pipeline.cache import STAGES
+from paperreader.pipeline.run import run_pipeline
+from paperreader.utils.log import get_logger
+from paperreader.utils.stats import percentile
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BenchConfig:
+    docs: int = 20
+    workers: int = 4
+    paragraphs: int = 20
+    pdf_ratio: float = 0.5
+    extraction_mode: str = "separate"
+    uniparser_async: bool = False
+    uniparser_processing_time: float = 0.0
+    batch: bool = False
+    batch_time: float = 0.0
+    elsevier: FaultConfig = field(default_factory=lambda: FaultConfig(latency=0.05))
+    uniparser: FaultConfig = field(default_factory=lambda: FaultConfig(latency=0.2))
+    llm: FaultConfig = field(default_factory=lambda: FaultConfig(latency=0.3))
+    seed: int = 0
+
+
+@dataclass
+class BenchReport:
+    docs: int
+    failed: int
+    elapsed_s: float
+    stage_latency_s: Dict[str, Dict[str, Optional[float]]]
+    peak_rss_mb: Optional[float]
+    requests: Dict[str, Dict[str, int]]
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def docs_per_minute(self) -> float:
+        return (self.docs - self.failed) / self.elapsed_s * 60 if self.elapsed_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "docs": self.docs,
+            "failed": self.failed,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "docs_per_minute": round(self.docs_per_minute, 2),
+            "stage_latency_s": self.stage_latency_s,
+            "peak_rss_mb": self.peak_rss_mb,
+            "requests": self.requests,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+    def format(self) -> str:
+        def seconds(value: Optional[float]) -> str:
+            return "n/a" if value is None else f"{value:.3f}s"
+
+        lines = [
+            "Benchmark summary",
+            f"  documents: {self.docs} ({self.failed} failed) in {self.elapsed_s:.1f}s, "
+            f"{self.docs_per_minute:.1f} docs/min",
+            "  peak RSS: " + ("n/a" if self.peak_rss_mb is None else f"{self.peak_rss_mb:.0f} MB"),
+            f"  LLM: {self.llm_calls} calls, prompt {self.prompt_tokens} / completion {self.completion_tokens} tokens",
+        ]
+        for stage, stats in self.stage_latency_s.items():
+            lines.append(
+                f"  {stage:<8} n={stats['count']:<4} p50 {seconds(stats['p50'])}  "
+                f"p95 {seconds(stats['p95'])}  max {seconds(stats['max'])}"
+            )
+        for service, counts in self.requests.items():
+            lines.append(
+                f"  {service:<9} requests {counts.get('requests', 0)}, "
+                f"429 {counts.get('throttled', 0)}, 500 {counts.get('errors', 0)}"
+            )
+        return "\n".join(lines)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process plus its largest child (parse pool), in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _StageClock:
+    """Turns pipeline progress events into per-stage durations."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last: Dict[str, float] = {}
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.failed = 0
+
+    def __call__(self, event: str, data: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if event == "doi_failed":
+                self.failed += 1
+            if event != "stage":
+                return
+            doi, stage, status = data["doi"], data["stage"], data["status"]
+            previous = self._last.get(doi)
+            self._last[doi] = now
+            if status in ("done", "cached") and previous is not None:
+                self.durations[stage].append(now - previous)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        stats: Dict[str, Dict[str, Optional[float]]] = {}
+        for stage in STAGES:
+            values = self.durations.get(stage, [])
+            stats[stage] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values) if values else None,
+            }
+        return stats
+
+
+def _bench_settings(base: Settings, root: Path, config: BenchConfig, services: Dict[str, Any]) -> Settings:
+    output = root / "output"
+    return replace(
+        base,
+        data_dir=root,
+        input_doi=root / "input" / "doi.xlsx",
+        input_pdfs=root / "input" / "pdfs",
+        output_parsed=output / "parsed_json",
+        output_cleaned=output / "cleaned_json",
+        output_info=output / "info_json",
+        output_xlsx=output / "extracted_xlsx",
+        output_cache=output / "stage_cache",
+        output_metrics=output / "metrics",
+        output_ledger=output / "run_ledger.sqlite3",
+        output_catalog=output / "catalog.sqlite3",
+        openai_api_key="bench",
+        openai_base_url=f"{services['llm'].url}/v1",
+        elsevier_api_key="bench",
+        elsevier_base_url=services["elsevier"].url,
+        uniparser_host=services["uniparser"].url,
+        uniparser_token="article",
+        uniparser_async=config.uniparser_async,
+        pipeline_workers=config.workers,
+        extraction_mode=config.extraction_mode,
+        # Stub PDFs only make sense to the fake Uni-parser.
+        pdf_parser="uniparser",
+        output_format="csv",
+        llm_cache_path=None,
+        llm_requests_per_minute=None,
+        llm_tokens_per_minute=None,
+        llm_batch=config.batch,
+        llm_batch_poll_seconds=0.05,
+    )
+
+
+def run_benchmark(base: Settings, config: Optional[BenchConfig] = None) -> BenchReport:
+    """Run ``config.docs`` synthetic DOIs through ``run_pipeline`` against local fake services."""
+    config = config or BenchConfig()
+    services = {
+        "elsevier": FakeElsevier(config.elsevier, paragraphs=config.paragraphs, seed=config.seed),
+        "uniparser": FakeUniParser(
+            config.uniparser,
+            paragraphs=config.paragraphs,
+            processing_time=config.uniparser_processing_time,
+            seed=config.seed + 1,
+        ),
+        "llm": FakeLLM(config.llm, batch_time=config.batch_time, seed=config.seed + 2),
+    }
+    for service in services.values():
+        service.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="paperreader-bench-") as tmp:
+            root = Path(tmp)
+            settings = _bench_settings(base, root, config, services)
+            dois = [f"10.5555/bench.{index:05d}" for index in range(config.docs)]
+            settings.input_pdfs.mkdir(parents=True, exist_ok=True)
+            pdf_count = round(config.docs * config.pdf_ratio)
+            for doi in dois[:pdf_count]:
+                (settings.input_pdfs / f"{doi.replace('/', '_')}.pdf").write_bytes(b"%PDF-1.4\n% bench stub\n")
+
+            clock = _StageClock()
+            logger.info("Benchmarking %d DOIs (%d via Uni-parser) with %d workers", config.docs, pdf_count, config.workers)
+            started = time.perf_counter()
+            summary = run_pipeline(settings, dois=dois, on_event=clock)
+            elapsed = time.perf_counter() - started
+    finally:
+        for service in services.values():
+            service.stop()
+
+    return BenchReport(
+        docs=config.docs,
+        failed=clock.failed,
+        elapsed_s=elapsed,
+        stage_latency_s=clock.summary(),
+        peak_rss_mb=peak_rss_mb(),
+        requests={name: dict(service.counts) for name, service in services.items()},
+        llm_calls=summary.calls if summary else 0,
+        prompt_tokens=summary.prompt_tokens if summary else 0,
+        completion_tokens=summary.completion_tokens if summary else 0,
+    )
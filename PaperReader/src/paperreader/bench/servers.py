@@ -0,0 +1,424 @@
+"""Local stand-ins for Elsevier, Uni-parser and an OpenAI-compatible chat/batch API.
+
+Each fake runs a ``ThreadingHTTPServer`` on a free localhost port in a
+daemon thread and answers with synthetic but well-formed payloads, so the
+real clients and ``run_pipeline`` can be exercised end to end without
+network access or API keys. Every service takes a :class:`FaultConfig` that
+adds latency and answers a share of requests with ``500`` or ``429``.
+"""
+from __future__ import annotations
+
+import email.policy
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+from xml.sax.saxutils import escape
+
+from paperreader.llm.tokens import estimate_message_tokens, estimate_tokens
+
+_WORDS = (
+    "perovskite film layer precursor solution substrate interface grain boundary defect passivation "
+    "device efficiency stability voltage current density annealing temperature spin coating deposition "
+    "electrode electrolyte catalyst oxide polymer composite crystal structure morphology spectrum "
+    "measurement analysis sample treatment improvement mechanism transport recombination"
+).split()
+
+_HEADINGS = ("Introduction", "Experimental", "Results and discussion", "Conclusions")
+
+
+@dataclass
+class FaultConfig:
+    """Latency and failure injection for one fake service."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 0.0
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(10, 20))]
+    words.insert(rng.randrange(len(words)), f"{rng.uniform(1, 500):.1f}")
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_paper(doi: str, paragraphs: int = 20) -> Dict[str, Any]:
+    """Deterministic pseudo-paper for ``doi``: title, headed sections, a table and a figure."""
+    rng = random.Random(zlib.crc32(doi.encode("utf-8")))
+    per_section = max(1, paragraphs // len(_HEADINGS))
+    sections = []
+    for number, heading in enumerate(_HEADINGS, start=1):
+        paras = [" ".join(_sentence(rng) for _ in range(4)) for _ in range(per_section)]
+        sections.append({"label": str(number), "heading": heading, "paragraphs": paras})
+    return {
+        "doi": doi,
+        "title": _sentence(rng).rstrip("."),
+        "sections": sections,
+        "table": {"label": "Table 1", "caption": _sentence(rng), "rows": [["Sample", "PCE (%)"], ["A", "21.3"]]},
+        "figure": {"label": "Fig. 1", "caption": _sentence(rng)},
+    }
+
+
+def elsevier_xml(paper: Dict[str, Any]) -> str:
+    """Render a synthetic paper as an Elsevier ``full-text-retrieval-response``."""
+    sections = []
+    for section in paper["sections"]:
+        paras = "".join(f"<ce:para>{escape(text)}</ce:para>" for text in section["paragraphs"])
+        sections.append(
+            f"<ce:section><ce:label>{section['label']}</ce:label>"
+            f"<ce:section-title>{escape(section['heading'])}</ce:section-title>{paras}</ce:section>"
+        )
+    table, figure = paper["table"], paper["figure"]
+    rows = "".join(
+        "<row>" + "".join(f"<entry>{escape(cell)}</entry>" for cell in row) + "</row>" for row in table["rows"]
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<full-text-retrieval-response xmlns="http://www.elsevier.com/xml/svapi/article/dtd" '
+        'xmlns:ce="http://www.elsevier.com/xml/common/dtd" xmlns:dc="http://purl.org/dc/elements/1.1/" '
+        'xmlns:prism="http://prismstandard.org/namespaces/basic/2.0/">'
+        f"<coredata><prism:doi>{escape(paper['doi'])}</prism:doi><dc:title>{escape(paper['title'])}</dc:title>"
+        "<dc:creator>Bench, A.</dc:creator></coredata>"
+        f"<originalText><article><body><ce:sections>{''.join(sections)}</ce:sections>"
+        f"<ce:table><ce:label>{table['label']}</ce:label><ce:caption><ce:simple-para>{escape(table['caption'])}"
+        f"</ce:simple-para></ce:caption><tgroup><tbody>{rows}</tbody></tgroup></ce:table>"
+        f"<ce:figure><ce:label>{figure['label']}</ce:label><ce:caption><ce:simple-para>{escape(figure['caption'])}"
+        "</ce:simple-para></ce:caption></ce:figure>"
+        "</body></article></originalText></full-text-retrieval-response>"
+    )
+
+
+def uniparser_result(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a synthetic paper as a Uni-parser ``/get-result`` payload, page objects included."""
+    sections = [
+        {"heading": f"{section['label']} {section['heading']}", "text": "\n".join(section["paragraphs"])}
+        for section in paper["sections"]
+    ]
+    objects = [
+        {"page": page, "type": "text", "bbox": [0, 0, 595, 842], "text": section["text"]}
+        for page, section in enumerate(sections)
+    ]
+    return {
+        "status": "success",
+        "metadata": {"title": paper["title"], "authors": ["Bench, A."], "doi": paper["doi"]},
+        "content": {"sections": sections, "tables": [paper["table"]], "figures": [paper["figure"]]},
+        "objects": objects,
+        "pages_dict": {str(page): {"width": 595, "height": 842} for page in range(len(objects))},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_payload(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload: Any, status: int = 200) -> None:
+        self.send_payload(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _handle(self, method: str) -> None:
+        body = self._body()
+        service = self.server.service
+        if service.inject_fault(self):
+            return
+        service.handle(self, method, body)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self._handle("POST")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    service: "FakeService"
+
+
+class FakeService:
+    """Base class: a local HTTP server with fault injection and request counters."""
+
+    def __init__(self, faults: Optional[FaultConfig] = None, seed: int = 0):
+        self.faults = faults or FaultConfig()
+        self.counts: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("service is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeService":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.service = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeService":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def inject_fault(self, handler: _Handler) -> bool:
+        """Sleep for the configured latency, then maybe answer 429/500; True if a fault was sent."""
+        faults = self.faults
+        with self._lock:
+            delay = faults.latency + (self._rng.uniform(0, faults.jitter) if faults.jitter else 0.0)
+            roll = self._rng.random()
+            self.counts["requests"] += 1
+        if delay > 0:
+            time.sleep(delay)
+        if roll < faults.rate_limit_rate:
+            self.count("throttled")
+            handler.send_payload(
+                429, b'{"error": "rate limited"}', "application/json", {"Retry-After": f"{faults.retry_after:g}"}
+            )
+            return True
+        if roll < faults.rate_limit_rate + faults.error_rate:
+            self.count("errors")
+            handler.send_payload(500, b'{"error": "injected failure"}', "application/json")
+            return True
+        return False
+
+    def handle(self, handler: _Handler, method: str, body: bytes) -> None:
+        raise NotImplementedError
+
+
+class FakeElsevier(FakeService):
+    """``GET /content/article/doi/<doi>`` returning synthetic Elsevier XML."""
+
+    def __init__(self, faults: Optional[FaultConfig] = None, paragraphs: int = 20, seed: int = 0):
+        super().__init__(faults, seed)
+        self.paragraphs = paragraphs
+
+    def handle(self, handler: _Handler, method: str, body: bytes) -> None:
+        prefix = "/content/article/doi/"
+        path = urlparse(handler.path).path
+        if method != "GET" or not path.startswith(prefix):
+            handler.send_payload(404, b"not found", "text/plain")
+            return
+        doi = unquote(path[len(prefix):])
+        xml = elsevier_xml(synthetic_paper(doi, self.paragraphs)).encode("utf-8")
+        handler.send_payload(200, xml, "application/xml", {"X-RateLimit-Remaining": "10000"})
+
+
+class FakeUniParser(FakeService):
+    """``/trigger-file-async`` + ``/get-result``; jobs stay pending for ``processing_time`` seconds."""
+
+    def __init__(
+        self,
+        faults: Optional[FaultConfig] = None,
+        paragraphs: int = 20,
+        processing_time: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(faults, seed)
+        self.paragraphs = paragraphs
+        self.processing_time = processing_time
+        self._ready_at: Dict[str, float] = {}
+
+    def handle(self, handler: _Handler, method: str, body: bytes) -> None:
+        path = urlparse(handler.path).path
+        if path == "/trigger-file-async":
+            token = uuid.uuid4().hex
+            with self._lock:
+                self._ready_at[token] = time.monotonic() + self.processing_time
+            handler.send_json({"status": "success", "token": token})
+        elif path == "/get-result":
+            try:
+                token = str(json.loads(body or b"{}").get("token", ""))
+            except ValueError:
+                token = ""
+            with self._lock:
+                ready_at = self._ready_at.get(token, 0.0)
+            if time.monotonic() < ready_at:
+                handler.send_json({"status": "pending"})
+                return
+            # The file is not actually parsed; the token seeds the synthetic content.
+            handler.send_json(uniparser_result(synthetic_paper(f"10.5555/uniparser.{token}", self.paragraphs)))
+        else:
+            handler.send_payload(404, b"not found", "text/plain")
+
+
+def _multipart_file(content_type: str, body: bytes) -> bytes:
+    """Payload of the ``file`` part of a multipart/form-data upload."""
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True) or b""
+    return b""
+
+
+def _completion_content(messages: List[dict]) -> str:
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    info = {"材料体系": "钙钛矿薄膜", "工艺": "旋涂后退火", "性能": "PCE 21.3%", "创新点": "界面钝化"}
+    data = {
+        "材料": {"value": "perovskite film", "evidence": "The perovskite film was deposited."},
+        "工艺": {"value": "spin coating", "evidence": "Spin coating and annealing."},
+        "性能": {"value": "21.3%", "evidence": "PCE of 21.3%."},
+    }
+    if "输出结构" in prompt:
+        payload: Any = {"info": info, "data": data}
+    elif "来源句子" in prompt:
+        payload = data
+    elif "XML 原文" in prompt:
+        payload = {"text": "", "tables": [], "figures": []}
+    else:
+        payload = info
+    return json.dumps(payload, ensure_ascii=False)
+
+
+class FakeLLM(FakeService):
+    """OpenAI-compatible chat API answering each prompt type with valid JSON.
+
+    Besides ``POST /v1/chat/completions`` it implements the Files and Batches
+    endpoints used for batch extraction: an uploaded JSONL batch stays
+    ``in_progress`` for ``batch_time`` seconds and then completes, with every
+    line answered as the chat endpoint would.
+    """
+
+    def __init__(self, faults: Optional[FaultConfig] = None, batch_time: float = 0.0, seed: int = 0):
+        super().__init__(faults, seed)
+        self.batch_time = batch_time
+        self._files: Dict[str, bytes] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def completion(request: Dict[str, Any]) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        content = _completion_content(messages)
+        prompt_tokens = estimate_message_tokens(messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "bench"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def handle(self, handler: _Handler, method: str, body: bytes) -> None:
+        path = urlparse(handler.path).path.rstrip("/")
+        if path == "/v1/chat/completions":
+            self.count("completions")
+            handler.send_json(self.completion(json.loads(body or b"{}")))
+        elif path == "/v1/files" and method == "POST":
+            self.count("batch_files")
+            file_id = f"file-{uuid.uuid4().hex}"
+            with self._lock:
+                self._files[file_id] = _multipart_file(handler.headers.get("Content-Type", ""), body)
+            handler.send_json(
+                {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": len(self._files[file_id]),
+                    "created_at": int(time.time()),
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                }
+            )
+        elif path.startswith("/v1/files/") and path.endswith("/content"):
+            with self._lock:
+                content = self._files.get(path[len("/v1/files/") : -len("/content")])
+            if content is None:
+                handler.send_payload(404, b"not found", "text/plain")
+            else:
+                handler.send_payload(200, content, "application/jsonl")
+        elif path == "/v1/batches" and method == "POST":
+            self.count("batches")
+            request = json.loads(body or b"{}")
+            batch_id = f"batch_{uuid.uuid4().hex}"
+            batch = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": request.get("endpoint", "/v1/chat/completions"),
+                "input_file_id": request.get("input_file_id"),
+                "completion_window": request.get("completion_window", "24h"),
+                "created_at": int(time.time()),
+                "status": "in_progress",
+            }
+            with self._lock:
+                self._batches[batch_id] = {"batch": batch, "ready_at": time.monotonic() + self.batch_time}
+            handler.send_json(batch)
+        elif path.startswith("/v1/batches/") and method == "GET":
+            batch = self._poll_batch(path[len("/v1/batches/") :])
+            if batch is None:
+                handler.send_payload(404, b"not found", "text/plain")
+            else:
+                handler.send_json(batch)
+        else:
+            handler.send_payload(404, b"not found", "text/plain")
+
+    def _poll_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return None
+            batch = entry["batch"]
+            if batch["status"] != "in_progress" or time.monotonic() < entry["ready_at"]:
+                return dict(batch)
+            lines = self._files.get(batch["input_file_id"], b"").decode("utf-8").splitlines()
+        output = []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self.completion(request["body"])}
+            output.append({"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": response})
+        output_id = f"file-{uuid.uuid4().hex}"
+        with self._lock:
+            self._files[output_id] = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in output).encode("utf-8")
+            batch.update(
+                status="completed",
+                output_file_id=output_id,
+                completed_at=int(time.time()),
+                request_counts={"total": len(output), "completed": len(output), "failed": 0},
+            )
+            return dict(batch)
@@ -6,6 +6,7 @@ from typing import Any, Dict
 
 from paperreader.llm.client import LLMClient
 from paperreader.llm.prompts import build_cleaning_prompt
+from paperreader.llm.telemetry import llm_context, report_parse
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -17,17 +18,20 @@ def clean_with_llm(client: LLMClient, raw_xml: str) -> Dict[str, Any]:
         return {"text": "", "tables": [], "figures": []}
 
     prompt = build_cleaning_prompt(raw_xml)
-    response = client.chat(prompt)
-
-    try:
-        parsed = json.loads(response) if isinstance(response, str) else {}
-        if isinstance(parsed, dict):
-            return {
-                "text": parsed.get("text", ""),
-                "tables": parsed.get("tables", []),
-                "figures": parsed.get("figures", []),
-            }
-    except json.JSONDecodeError:
-        logger.warning("LLM cleaning response not JSON; using raw text fallback")
+    with llm_context(stage="clean"):
+        response = client.chat(prompt)
+
+        try:
+            parsed = json.loads(response) if isinstance(response, str) else {}
+            if isinstance(parsed, dict):
+                report_parse(True)
+                return {
+                    "text": parsed.get("text", ""),
+                    "tables": parsed.get("tables", []),
+                    "figures": parsed.get("figures", []),
+                }
+        except json.JSONDecodeError:
+            logger.warning("LLM cleaning response not JSON; using raw text fallback")
+        report_parse(False)
 
     return {"text": response or raw_xml, "tables": [], "figures": []}
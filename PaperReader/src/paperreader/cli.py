@@ -2,10 +2,22 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
+import json
+import sys
+from dataclasses import replace
+from datetime import datetime
 from pathlib import Path
 
+from paperreader.bench.runner import BenchConfig, run_benchmark
+from paperreader.bench.servers import FaultConfig
 from paperreader.config import load_settings
-from paperreader.pipeline.run import run_pipeline
+from paperreader.ingestion.local_pdf import PDF_PARSERS
+from paperreader.io.catalog import ArtifactCatalog
+from paperreader.io.sinks import OUTPUT_FORMATS
+from paperreader.pipeline.cache import STAGES
+from paperreader.pipeline.ledger import RunLedger
+from paperreader.pipeline.run import EXTRACTION_MODES, download_all, index_outputs, run_pipeline
 from paperreader.utils.log import get_logger
 
 
@@ -20,6 +32,160 @@ def parse_args() -> argparse.Namespace:
     run_parser.add_argument(
         "--env-file", type=Path, default=None, help="Path to .env file containing API keys",
     )
+    run_parser.add_argument(
+        "--workers", type=int, default=None, help="Number of DOIs processed concurrently (default: 1)",
+    )
+    run_parser.add_argument(
+        "--elsevier-concurrency", type=int, default=None, help="Max concurrent Elsevier downloads",
+    )
+    run_parser.add_argument(
+        "--uniparser-concurrency", type=int, default=None, help="Max concurrent Uni-parser jobs",
+    )
+    run_parser.add_argument(
+        "--uniparser-async",
+        action="store_true",
+        help="Submit Uni-parser jobs without blocking and poll results in batches",
+    )
+    run_parser.add_argument(
+        "--pdf-parser",
+        choices=PDF_PARSERS,
+        default=None,
+        help="uniparser: remote only; local: PyMuPDF in a process pool; auto: local when Uni-parser returns nothing",
+    )
+    run_parser.add_argument(
+        "--llm-concurrency", type=int, default=None, help="Max concurrent LLM requests",
+    )
+    run_parser.add_argument(
+        "--llm-rpm", type=int, default=None, help="LLM requests-per-minute limit",
+    )
+    run_parser.add_argument(
+        "--llm-tpm", type=int, default=None, help="LLM tokens-per-minute limit",
+    )
+    run_parser.add_argument(
+        "--extraction-mode",
+        choices=EXTRACTION_MODES,
+        default=None,
+        help="separate: info and data in two LLM calls; combined: one call with a unified JSON schema",
+    )
+    run_parser.add_argument(
+        "--max-chunk-tokens",
+        type=int,
+        default=None,
+        help="Split longer documents into section-aligned chunks of this many tokens (0 disables)",
+    )
+    run_parser.add_argument(
+        "--relevance-max-tokens",
+        type=int,
+        default=None,
+        help="Token budget for the best-matching sections and captions sent to the data prompt (0 disables)",
+    )
+    run_parser.add_argument(
+        "--pack-max-tokens",
+        type=int,
+        default=None,
+        help="Pack short papers from concurrent workers into one info/data request of this many tokens (0 disables)",
+    )
+    run_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Send LLM extraction requests through the provider batch API and wait for the results",
+    )
+    run_parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="Export format for extracted rows (default: xlsx); csv is flushed after every DOI",
+    )
+    run_parser.add_argument(
+        "--llm-cache",
+        type=Path,
+        default=None,
+        help="SQLite file for caching LLM responses across runs (overrides LLM_CACHE_PATH)",
+    )
+    run_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write per-DOI stage timings to output_metrics/timings_<run id>.jsonl",
+    )
+    run_parser.add_argument(
+        "--cprofile",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Also run cProfile over the pipeline and dump pstats to FILE (use with --workers 1)",
+    )
+    restart = run_parser.add_mutually_exclusive_group()
+    restart.add_argument(
+        "--force", action="store_true", help="Ignore the stage cache and recompute every stage",
+    )
+    restart.add_argument(
+        "--from-stage",
+        choices=STAGES,
+        default=None,
+        help="Recompute this stage and every later stage, reusing cached earlier stages",
+    )
+    restart.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        default=None,
+        help="Continue an interrupted run: finished DOIs are skipped, the rest resume at their last stage",
+    )
+
+    search_parser = subparsers.add_parser("search", help="Search the artifact catalog")
+    search_parser.add_argument(
+        "--env-file", type=Path, default=None, help="Path to .env file containing API keys",
+    )
+    search_parser.add_argument("query", nargs="?", default="", help="Full-text query over cleaned text and info")
+    search_parser.add_argument("--field", default=None, help="Only papers with a record for this field (e.g. 性能)")
+    search_parser.add_argument("--min", type=float, default=None, help="Minimum numeric value of --field")
+    search_parser.add_argument("--max", type=float, default=None, help="Maximum numeric value of --field")
+    search_parser.add_argument("--limit", type=int, default=20, help="Number of results")
+    search_parser.add_argument(
+        "--reindex", action="store_true", help="Index existing outputs from the stage cache before searching",
+    )
+
+    runs_parser = subparsers.add_parser("runs", help="List recent pipeline runs from the run ledger")
+    runs_parser.add_argument(
+        "--env-file", type=Path, default=None, help="Path to .env file containing API keys",
+    )
+    runs_parser.add_argument("--limit", type=int, default=20, help="Number of runs to show")
+
+    download_parser = subparsers.add_parser("download", help="Bulk-download Elsevier XML for all DOIs")
+    download_parser.add_argument(
+        "--env-file", type=Path, default=None, help="Path to .env file containing API keys",
+    )
+    download_parser.add_argument(
+        "--concurrency", type=int, default=None, help="Concurrent downloads (default: ELSEVIER_CONCURRENCY)",
+    )
+    download_parser.add_argument(
+        "--force", action="store_true", help="Re-download XML that is already present",
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark the pipeline offline against local fake Elsevier/Uni-parser/LLM services"
+    )
+    bench_parser.add_argument(
+        "--env-file", type=Path, default=None, help="Path to .env file (concurrency settings are kept)",
+    )
+    bench_parser.add_argument("--docs", type=int, default=20, help="Number of synthetic DOIs")
+    bench_parser.add_argument("--workers", type=int, default=4, help="Concurrent DOI workers")
+    bench_parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphs per synthetic paper")
+    bench_parser.add_argument(
+        "--pdf-ratio", type=float, default=0.5, help="Share of DOIs parsed by Uni-parser instead of local XML",
+    )
+    bench_parser.add_argument("--extraction-mode", choices=EXTRACTION_MODES, default="separate")
+    bench_parser.add_argument("--uniparser-async", action="store_true", help="Use the async Uni-parser job queue")
+    bench_parser.add_argument("--batch", action="store_true", help="Extract through the fake batch API")
+    bench_parser.add_argument("--elsevier-latency", type=float, default=0.05, help="Seconds per Elsevier request")
+    bench_parser.add_argument("--uniparser-latency", type=float, default=0.2, help="Seconds per Uni-parser request")
+    bench_parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per LLM request")
+    bench_parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of requests to every service answered with 500",
+    )
+    bench_parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Share of requests to every service answered with 429",
+    )
+    bench_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
     return parser.parse_args()
 
 
@@ -27,8 +193,99 @@ def main() -> None:
     args = parse_args()
     if args.command == "run":
         settings = load_settings(args.env_file)
+        if args.workers is not None:
+            settings = replace(settings, pipeline_workers=args.workers)
+        if args.elsevier_concurrency is not None:
+            settings = replace(settings, elsevier_concurrency=args.elsevier_concurrency)
+        if args.uniparser_concurrency is not None:
+            settings = replace(settings, uniparser_concurrency=args.uniparser_concurrency)
+        if args.uniparser_async:
+            settings = replace(settings, uniparser_async=True)
+        if args.pdf_parser is not None:
+            settings = replace(settings, pdf_parser=args.pdf_parser)
+        if args.llm_concurrency is not None:
+            settings = replace(settings, llm_concurrency=args.llm_concurrency)
+        if args.llm_rpm is not None:
+            settings = replace(settings, llm_requests_per_minute=args.llm_rpm)
+        if args.llm_tpm is not None:
+            settings = replace(settings, llm_tokens_per_minute=args.llm_tpm)
+        if args.extraction_mode is not None:
+            settings = replace(settings, extraction_mode=args.extraction_mode)
+        if args.max_chunk_tokens is not None:
+            settings = replace(settings, max_chunk_tokens=args.max_chunk_tokens)
+        if args.relevance_max_tokens is not None:
+            settings = replace(settings, relevance_max_tokens=args.relevance_max_tokens)
+        if args.pack_max_tokens is not None:
+            settings = replace(settings, pack_max_tokens=args.pack_max_tokens)
+        if args.batch:
+            settings = replace(settings, llm_batch=True)
+        if args.output_format is not None:
+            settings = replace(settings, output_format=args.output_format)
+        if args.llm_cache is not None:
+            settings = replace(settings, llm_cache_path=args.llm_cache)
+        from_stage = STAGES[0] if args.force else args.from_stage
         logger.info("Starting pipeline with settings loaded from %s", args.env_file or ".env")
-        run_pipeline(settings)
+        profile = args.profile or args.cprofile is not None
+        if args.cprofile is not None:
+            if settings.pipeline_workers > 1 and sys.version_info < (3, 12):
+                logger.warning("cProfile only sees the main thread before Python 3.12; profile with --workers 1")
+            profiler = cProfile.Profile()
+            summary = profiler.runcall(
+                run_pipeline, settings, from_stage=from_stage, resume=args.resume, profile=profile
+            )
+            profiler.dump_stats(args.cprofile)
+            logger.info("cProfile stats written to %s (inspect with `python -m pstats`)", args.cprofile)
+        else:
+            summary = run_pipeline(settings, from_stage=from_stage, resume=args.resume, profile=profile)
+        if summary is not None:
+            print(summary.format())
+    elif args.command == "download":
+        settings = load_settings(args.env_file)
+        if args.concurrency is not None:
+            settings = replace(settings, elsevier_concurrency=args.concurrency)
+        download_all(settings, force=args.force)
+    elif args.command == "search":
+        settings = load_settings(args.env_file)
+        if args.reindex:
+            index_outputs(settings)
+        catalog = ArtifactCatalog(settings.output_catalog)
+        hits = catalog.search(args.query, field_name=args.field, min_value=args.min, max_value=args.max, limit=args.limit)
+        for hit in hits:
+            print(hit.doi)
+            print(f"  {hit.snippet}")
+            for record in hit.records:
+                print(f"  {record['field']}: {record['value']}")
+        catalog.close()
+    elif args.command == "bench":
+        settings = load_settings(args.env_file)
+
+        def faults(latency: float) -> FaultConfig:
+            return FaultConfig(latency=latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+
+        config = BenchConfig(
+            docs=args.docs,
+            workers=args.workers,
+            paragraphs=args.paragraphs,
+            pdf_ratio=args.pdf_ratio,
+            extraction_mode=args.extraction_mode,
+            uniparser_async=args.uniparser_async,
+            batch=args.batch,
+            elsevier=faults(args.elsevier_latency),
+            uniparser=faults(args.uniparser_latency),
+            llm=faults(args.llm_latency),
+        )
+        report = run_benchmark(settings, config)
+        print(json.dumps(report.to_dict(), indent=2) if args.json else report.format())
+    elif args.command == "runs":
+        settings = load_settings(args.env_file)
+        ledger = RunLedger(settings.output_ledger)
+        for info in ledger.list_runs(args.limit):
+            started = datetime.fromtimestamp(info.started_at).strftime("%Y-%m-%d %H:%M:%S")
+            print(
+                f"{info.run_id}  {info.status:<9}  started {started}  "
+                f"{info.done}/{info.total} done, {info.failed} failed"
+            )
+        ledger.close()
 
 
 if __name__ == "__main__":
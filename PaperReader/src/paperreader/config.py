@@ -2,11 +2,14 @@
 from __future__ import annotations
 
 import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Set, Tuple
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+
+from paperreader.io.sinks import check_output_format
 
 
 @dataclass
@@ -21,6 +24,10 @@ class Settings:
     output_cleaned: Path
     output_info: Path
     output_xlsx: Path
+    output_cache: Path
+    output_metrics: Path
+    output_ledger: Path
+    output_catalog: Path
     openai_api_key: Optional[str]
     openai_base_url: Optional[str]
     openai_model: str
@@ -28,6 +35,50 @@ class Settings:
     uniparser_cli_path: Optional[str]
     uniparser_host: Optional[str]
     uniparser_token: Optional[str]
+    elsevier_base_url: str = "https://api.elsevier.com"
+    pipeline_workers: int = 1
+    elsevier_concurrency: int = 4
+    uniparser_concurrency: int = 1
+    uniparser_async: bool = False
+    llm_concurrency: int = 4
+    llm_cache_path: Optional[Path] = None
+    llm_cache_max_entries: int = 50_000
+    llm_cache_max_age_days: float = 30.0
+    llm_max_retries: int = 5
+    llm_requests_per_minute: Optional[int] = None
+    llm_tokens_per_minute: Optional[int] = None
+    llm_batch: bool = False
+    llm_batch_poll_seconds: float = 30.0
+    extraction_mode: str = "separate"
+    max_chunk_tokens: int = 24_000
+    relevance_max_tokens: int = 0
+    pack_max_tokens: int = 0
+    pack_wait_seconds: float = 0.5
+    output_format: str = "xlsx"
+    local_xml_parser: bool = True
+    pdf_parser: str = "auto"
+    parse_processes: int = 0
+    near_duplicate_threshold: float = 0.0
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
 
 
 def load_settings(env_path: Optional[Path] = None) -> Settings:
@@ -57,13 +108,91 @@ def load_settings(env_path: Optional[Path] = None) -> Settings:
         output_cleaned=output_dir / "cleaned_json",
         output_info=output_dir / "info_json",
         output_xlsx=output_dir / "extracted_xlsx",
+        output_cache=output_dir / "stage_cache",
+        output_metrics=output_dir / "metrics",
+        output_ledger=output_dir / "run_ledger.sqlite3",
+        output_catalog=output_dir / "catalog.sqlite3",
         openai_api_key=openai_api_key,
         openai_base_url=openai_base_url,
         openai_model=openai_model,
         elsevier_api_key=os.getenv("ELSEVIER_API_KEY"),
+        elsevier_base_url=os.getenv("ELSEVIER_BASE_URL") or "https://api.elsevier.com",
         uniparser_cli_path=os.getenv("UNIPARSER_CLI_PATH"),
         uniparser_host=os.getenv("UNIPARSER_HOST") or "http://101.126.82.63:40001",
         uniparser_token=os.getenv("UNIPARSER_TOKEN") or "article",
+        pipeline_workers=_int_env("PIPELINE_WORKERS", 1),
+        elsevier_concurrency=_int_env("ELSEVIER_CONCURRENCY", 4),
+        uniparser_concurrency=_int_env("UNIPARSER_CONCURRENCY", 1),
+        uniparser_async=(os.getenv("UNIPARSER_ASYNC") or "").lower() in {"1", "true", "yes"},
+        llm_concurrency=_int_env("LLM_CONCURRENCY", 4),
+        llm_cache_path=Path(os.environ["LLM_CACHE_PATH"]) if os.getenv("LLM_CACHE_PATH") else None,
+        llm_cache_max_entries=_int_env("LLM_CACHE_MAX_ENTRIES", 50_000),
+        llm_cache_max_age_days=_float_env("LLM_CACHE_MAX_AGE_DAYS", 30.0),
+        llm_max_retries=_int_env("LLM_MAX_RETRIES", 5),
+        llm_requests_per_minute=_int_env("LLM_REQUESTS_PER_MINUTE", 0) or None,
+        llm_tokens_per_minute=_int_env("LLM_TOKENS_PER_MINUTE", 0) or None,
+        llm_batch=(os.getenv("LLM_BATCH") or "").lower() in {"1", "true", "yes"},
+        llm_batch_poll_seconds=_float_env("LLM_BATCH_POLL_SECONDS", 30.0),
+        extraction_mode=os.getenv("EXTRACTION_MODE") or "separate",
+        max_chunk_tokens=_int_env("MAX_CHUNK_TOKENS", 24_000),
+        relevance_max_tokens=_int_env("RELEVANCE_MAX_TOKENS", 0),
+        pack_max_tokens=_int_env("PACK_MAX_TOKENS", 0),
+        pack_wait_seconds=_float_env("PACK_WAIT_SECONDS", 0.5),
+        output_format=os.getenv("OUTPUT_FORMAT") or "xlsx",
+        local_xml_parser=(os.getenv("LOCAL_XML_PARSER") or "true").lower() in {"1", "true", "yes"},
+        pdf_parser=os.getenv("PDF_PARSER") or "auto",
+        parse_processes=_int_env("PARSE_PROCESSES", 0),
+        near_duplicate_threshold=_float_env("NEAR_DUPLICATE_THRESHOLD", 0.0),
     )
+    check_output_format(settings.output_format)
 
     return settings
+
+
+# Variables of the real environment; values from ``.env`` never override them, also on reload.
+_PROCESS_ENV = frozenset(os.environ)
+_dotenv_keys: Set[str] = set()
+_settings_lock = threading.Lock()
+_cached_settings: Optional[Tuple[Optional[int], Settings]] = None
+
+
+def _apply_dotenv(path: str) -> None:
+    """Copy ``path`` into ``os.environ``, dropping variables that were removed from it since the last load."""
+    values = {key: value for key, value in dotenv_values(path).items() if value is not None}
+    for key in _dotenv_keys - values.keys():
+        os.environ.pop(key, None)
+    _dotenv_keys.clear()
+    for key, value in values.items():
+        if key not in _PROCESS_ENV:
+            os.environ[key] = value
+            _dotenv_keys.add(key)
+
+
+def get_settings() -> Settings:
+    """Process-wide settings, reloaded when ``.env`` changes.
+
+    Long-running processes such as the web server use this instead of
+    re-reading the environment per request. Each call only compares the
+    modification time of ``.env`` with the one the cached settings were
+    loaded from; :func:`reload_settings` forces a reload.
+    """
+    global _cached_settings
+    path = find_dotenv()
+    try:
+        mtime: Optional[int] = os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        mtime = None
+    with _settings_lock:
+        if _cached_settings is None or _cached_settings[0] != mtime:
+            if path:
+                _apply_dotenv(path)
+            _cached_settings = (mtime, load_settings())
+        return _cached_settings[1]
+
+
+def reload_settings() -> Settings:
+    """Drop the cached settings and load them again."""
+    global _cached_settings
+    with _settings_lock:
+        _cached_settings = None
+    return get_settings()
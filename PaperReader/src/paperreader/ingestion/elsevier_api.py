@@ -1,33 +1,152 @@
 """Elsevier API interactions for downloading article XML."""
 from __future__ import annotations
 
+import os
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterable, Mapping, Optional
 from urllib.parse import quote
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from paperreader.utils.log import get_logger
+from paperreader.utils.retry import backoff_delay, parse_retry_after
 
 logger = get_logger(__name__)
 
 
-class ElsevierClient:
-    """Lightweight Elsevier API client for fetching XML by DOI."""
+CHUNK_SIZE = 64 * 1024
+
+DEFAULT_BASE_URL = "https://api.elsevier.com"
+
+# Never park a worker longer than this on a single quota window.
+MAX_QUOTA_WAIT = 15 * 60
+
+
+def is_valid_xml(path: Path) -> bool:
+    """Cheap completeness check: the file starts with a tag and ends with a closing one."""
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return False
+    if size == 0:
+        return False
+    with path.open("rb") as fh:
+        head = fh.read(256).lstrip()
+        fh.seek(max(0, size - 256))
+        tail = fh.read().rstrip()
+    return head.startswith(b"<") and tail.endswith(b">") and b"</" in tail
+
+
+class RateLimitState:
+    """Quota tracking driven by Elsevier's ``X-RateLimit-*`` response headers.
+
+    Once ``X-RateLimit-Remaining`` reaches zero, callers block until the
+    ``X-RateLimit-Reset`` epoch instead of burning requests on 429s.
+    """
+
+    def __init__(self) -> None:
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                try:
+                    self.remaining = int(remaining)
+                except ValueError:
+                    pass
+            if reset is not None:
+                try:
+                    value = float(reset)
+                except ValueError:
+                    value = None
+                if value is not None:
+                    # Epoch seconds normally; small values are treated as a delay.
+                    self.reset_at = value if value > 1e9 else time.time() + value
+
+    def block_for(self, seconds: float) -> None:
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at or 0.0, time.time() + seconds)
+
+    def wait(self) -> None:
+        with self._lock:
+            if self.remaining is None or self.remaining > 0 or self.reset_at is None:
+                return
+            delay = self.reset_at - time.time()
+        if delay > 0:
+            delay = min(delay, MAX_QUOTA_WAIT)
+            logger.warning("Elsevier quota exhausted; waiting %.0fs for reset", delay)
+            time.sleep(delay)
+        with self._lock:
+            if self.reset_at is not None and time.time() >= self.reset_at:
+                self.remaining = None
+
 
-    def __init__(self, api_key: Optional[str] = None, max_retries: int = 3, timeout: int = 30):
+class ElsevierClient:
+    """Lightweight Elsevier API client for fetching XML by DOI.
+
+    Requests share one keep-alive session sized for ``max_connections``
+    concurrent downloads, bodies are streamed to a uniquely named ``.part``
+    file next to the destination and renamed into place once complete, and
+    failures back off exponentially (or until the server's
+    ``Retry-After``/quota reset).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_retries: int = 3,
+        timeout: int = 30,
+        max_connections: int = 4,
+        session: Optional[requests.Session] = None,
+        base_url: str = DEFAULT_BASE_URL,
+    ):
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
         self.max_retries = max_retries
         self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self.rate_limit = RateLimitState()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self._session = session
 
     def _build_url(self, doi: str) -> str:
         doi_encoded = quote(doi)
         return (
-            "https://api.elsevier.com/content/article/doi/"
+            f"{self.base_url}/content/article/doi/"
             f"{doi_encoded}?apiKey={self.api_key}&httpAccept=application/xml"
         )
 
+    def _stream_to(self, response: requests.Response, destination: Path) -> bool:
+        # A unique name per attempt, so concurrent downloads of one DOI never share a temp file.
+        fd, tmp_name = tempfile.mkstemp(dir=destination.parent, prefix=f".{destination.name}.", suffix=".part")
+        partial = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        fh.write(chunk)
+            if not is_valid_xml(partial):
+                logger.warning("Incomplete XML body received for %s", destination.name)
+                return False
+            os.replace(partial, destination)
+            return True
+        finally:
+            partial.unlink(missing_ok=True)
+
     def download_xml(self, doi: str, destination: Path) -> Optional[Path]:
         """Download article XML by DOI with retry logic."""
         destination.parent.mkdir(parents=True, exist_ok=True)
@@ -40,25 +159,57 @@ class ElsevierClient:
         headers = {"Accept": "application/xml"}
 
         for attempt in range(1, self.max_retries + 1):
+            self.rate_limit.wait()
+            retry_after = None
             try:
-                response = requests.get(url, headers=headers, timeout=self.timeout)
+                with self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    self.rate_limit.update(response.headers)
+
+                    if response.status_code == 200:
+                        if self._stream_to(response, destination):
+                            logger.info("Downloaded XML for %s", doi)
+                            return destination
+                    elif response.status_code == 404:
+                        logger.warning("Article not found or unauthorized for %s (404)", doi)
+                        return None
+                    else:
+                        logger.error("Download failed for %s | status %s", doi, response.status_code)
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if response.status_code == 429 and retry_after is not None:
+                            self.rate_limit.block_for(retry_after)
             except Exception as exc:  # pragma: no cover - network exceptions
                 logger.warning("Attempt %s errored for %s: %s", attempt, doi, exc)
-                if attempt < self.max_retries:
-                    time.sleep(3)
-                continue
 
-            if response.status_code == 200:
-                destination.write_bytes(response.content)
-                logger.info("Downloaded XML for %s", doi)
-                return destination
-
-            if response.status_code == 404:
-                logger.warning("Article not found or unauthorized for %s (404)", doi)
-                return None
-
-            logger.error("Download failed for %s | status %s", doi, response.status_code)
             if attempt < self.max_retries:
-                time.sleep(3)
+                time.sleep(backoff_delay(attempt - 1, retry_after))
 
         return None
+
+    def download_many(
+        self,
+        dois: Iterable[str],
+        destination_for: Callable[[str], Path],
+        max_workers: Optional[int] = None,
+        skip_existing: bool = True,
+    ) -> Dict[str, Optional[Path]]:
+        """Download many DOIs concurrently over the shared session.
+
+        DOIs whose destination already holds complete XML are skipped unless
+        ``skip_existing`` is False. Returns the XML path (or ``None``) per DOI.
+        """
+        results: Dict[str, Optional[Path]] = {}
+        pending = []
+        for doi in dois:
+            destination = destination_for(doi)
+            if skip_existing and is_valid_xml(destination):
+                results[doi] = destination
+            else:
+                pending.append((doi, destination))
+
+        logger.info("Downloading %d DOIs (%d already present)", len(pending), len(results))
+        workers = max(1, max_workers or self.max_connections)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="elsevier") as executor:
+            futures = {doi: executor.submit(self.download_xml, doi, destination) for doi, destination in pending}
+            for doi, future in futures.items():
+                results[doi] = future.result()
+        return results
@@ -0,0 +1,274 @@
+"""Local PDF parser producing the Uni-parser document structure.
+
+Text lines are read with PyMuPDF (``pdfminer.six`` when PyMuPDF is not
+installed) together with their font size and weight. Headings are lines
+that are short, do not end a sentence and are either set larger than the
+body font or bold and numbered / named like a standard section. Lines
+starting with "Fig. N" / "Table N" become figure and table captions,
+running headers and page numbers repeated across pages are dropped, and
+everything from the reference list on is skipped. The parser is CPU bound
+and meant to run in a process pool.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from paperreader.ingestion.uniparser_adapter import _fallback_structure
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# Bump when the output of the parser changes; it is part of the parse stage cache key.
+PDF_PARSER_VERSION = 1
+
+# uniparser: remote only; local: local first, Uni-parser if it finds no text;
+# auto: Uni-parser first, local if the remote parse comes back empty.
+PDF_PARSERS = ("uniparser", "local", "auto")
+
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[IVX]+\.|[A-H]\.)\s+\S")
+_NAMED_HEADING = re.compile(
+    r"^(\d+(\.\d+)*\.?\s+)?(abstract|introduction|background|experimental( section| details)?|"
+    r"materials and methods|methods?|methodology|results( and discussion)?|discussion|"
+    r"conclusions?|summary|outlook|supporting information|acknowledge?ments?|references|bibliography)$",
+    re.IGNORECASE,
+)
+_END_SECTIONS = re.compile(r"^(\d+(\.\d+)*\.?\s+)?(references|bibliography|acknowledge?ments?)$", re.IGNORECASE)
+_FIGURE_CAPTION = re.compile(r"^(fig\.?|figure)\s*S?\d+", re.IGNORECASE)
+_TABLE_CAPTION = re.compile(r"^table\s*S?\d+", re.IGNORECASE)
+_CAPTION_LABEL = re.compile(r"^((?:fig\.?|figure|table)\s*S?\d+[a-z]?)[.:|]?\s*", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+
+
+@dataclass
+class TextLine:
+    text: str
+    size: float
+    bold: bool
+    page: int
+    block: int
+
+
+def _pymupdf_lines(path: Path) -> Iterator[TextLine]:
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF < 1.24 only provides the ``fitz`` name
+        import fitz as pymupdf
+
+    block_id = 0
+    with pymupdf.open(str(path)) as document:
+        for page_number, page in enumerate(document):
+            for block in page.get_text("dict")["blocks"]:
+                if block.get("type") != 0:  # images
+                    continue
+                block_id += 1
+                for line in block["lines"]:
+                    spans = [span for span in line["spans"] if span["text"].strip()]
+                    if not spans:
+                        continue
+                    yield TextLine(
+                        text="".join(span["text"] for span in spans),
+                        size=round(max(span["size"] for span in spans), 1),
+                        # Bit 4 of the span flags marks a bold font.
+                        bold=all(span["flags"] & 16 or "bold" in span["font"].lower() for span in spans),
+                        page=page_number,
+                        block=block_id,
+                    )
+
+
+def _pdfminer_lines(path: Path) -> Iterator[TextLine]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTChar, LTTextContainer, LTTextLine
+
+    block_id = 0
+    for page_number, page in enumerate(extract_pages(str(path))):
+        for element in page:
+            if not isinstance(element, LTTextContainer):
+                continue
+            block_id += 1
+            for line in element:
+                if not isinstance(line, LTTextLine) or not line.get_text().strip():
+                    continue
+                chars = [char for char in line if isinstance(char, LTChar)]
+                if not chars:
+                    continue
+                yield TextLine(
+                    text=line.get_text().rstrip("\n"),
+                    size=round(max(char.size for char in chars), 1),
+                    bold=all("bold" in char.fontname.lower() for char in chars if char.get_text().strip()),
+                    page=page_number,
+                    block=block_id,
+                )
+
+
+def read_lines(path: Path) -> List[TextLine]:
+    try:
+        return list(_pymupdf_lines(path))
+    except ImportError:
+        return list(_pdfminer_lines(path))
+
+
+def _body_size(lines: List[TextLine]) -> float:
+    weights: Counter = Counter()
+    for line in lines:
+        weights[line.size] += len(line.text)
+    return weights.most_common(1)[0][0] if weights else 0.0
+
+
+def _running_lines(lines: List[TextLine]) -> set:
+    """Normalised texts that recur on many pages: journal headers, footers, page numbers."""
+    pages = {line.page for line in lines}
+    if len(pages) < 3:
+        return set()
+    seen: Dict[str, set] = {}
+    for line in lines:
+        key = _DIGITS.sub("#", line.text.strip().lower())
+        seen.setdefault(key, set()).add(line.page)
+    return {key for key, on_pages in seen.items() if len(on_pages) >= max(3, len(pages) // 2)}
+
+
+def _is_heading(line: TextLine, body_size: float) -> bool:
+    text = line.text.strip()
+    if len(text) > 120 or len(text.split()) > 15:
+        return False
+    if text.endswith((".", ",", ";")) and not _NAMED_HEADING.match(text.rstrip(".")):
+        return False
+    if _NAMED_HEADING.match(text.rstrip(".:")):
+        return True
+    if not any(char.isalpha() for char in text):
+        return False
+    larger = body_size and line.size >= body_size * 1.15
+    return bool(larger or (line.bold and _NUMBERED_HEADING.match(text)))
+
+
+def _join(parts: List[str]) -> str:
+    """Join wrapped lines, undoing end-of-line hyphenation."""
+    text = ""
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if text.endswith("-") and part[:1].islower():
+            text = text[:-1] + part
+        else:
+            text = f"{text} {part}" if text else part
+    return text
+
+
+def _caption(text: str) -> Dict[str, str]:
+    match = _CAPTION_LABEL.match(text)
+    if match is None:
+        return {"label": "", "caption": text}
+    return {"label": match.group(1), "caption": text[match.end():]}
+
+
+def _title_lines(lines: List[TextLine], body_size: float) -> List[TextLine]:
+    """Lines in the largest font of the first page, taken as the title if larger than the body."""
+    first_page = [line for line in lines if line.page == 0 and any(char.isalpha() for char in line.text)]
+    if not first_page:
+        return []
+    largest = max(line.size for line in first_page)
+    if largest <= body_size:
+        return []
+    return [line for line in first_page if line.size == largest]
+
+
+class _Assembler:
+    """Accumulates lines into paragraphs, sections and captions."""
+
+    def __init__(self, content: Dict[str, Any]):
+        self.content = content
+        self.sections: List[Dict[str, str]] = []
+        self.heading = ""
+        self.paragraphs: List[str] = []
+        self.block_lines: List[str] = []
+        self.caption: Optional[Dict[str, Any]] = None
+
+    def start_block(self, first_line: str) -> None:
+        self.end_block()
+        if _TABLE_CAPTION.match(first_line):
+            self.caption = {"label": "", "caption": "", "rows": []}
+            self.content["tables"].append(self.caption)
+        elif _FIGURE_CAPTION.match(first_line):
+            self.caption = {"label": "", "caption": ""}
+            self.content["figures"].append(self.caption)
+
+    def end_block(self) -> None:
+        if self.caption is not None:
+            self.caption.update(_caption(_join(self.block_lines)))
+        elif self.block_lines:
+            self.paragraphs.append(_join(self.block_lines))
+        self.block_lines = []
+        self.caption = None
+
+    def start_section(self, heading: str) -> None:
+        self.end_section()
+        self.heading = heading
+
+    def end_section(self) -> None:
+        self.end_block()
+        if self.heading or self.paragraphs:
+            self.sections.append({"heading": self.heading, "text": "\n".join(self.paragraphs)})
+        self.heading, self.paragraphs = "", []
+
+
+def assemble(lines: List[TextLine], doi: Optional[str] = None) -> Dict[str, Any]:
+    """Group text lines into headed sections and figure/table captions."""
+    result = _fallback_structure(doi)
+    body_size = _body_size(lines)
+    running = _running_lines(lines)
+    title = _title_lines(lines, body_size)
+    result["metadata"]["title"] = _join([line.text for line in title])
+    skipped = {id(line) for line in title}
+
+    assembler = _Assembler(result["content"])
+    block = heading_block = None
+    for line in lines:
+        text = line.text.strip()
+        if not text or id(line) in skipped or _DIGITS.sub("#", text.lower()) in running:
+            continue
+        if line.block != block:
+            block = line.block
+            assembler.start_block(text)
+        if assembler.caption is None and _is_heading(line, body_size):
+            if _END_SECTIONS.match(text.rstrip(".:")):
+                break
+            if heading_block == block and not assembler.paragraphs and not assembler.block_lines:
+                # A heading wrapped onto a second line.
+                assembler.heading = _join([assembler.heading, text])
+            else:
+                assembler.start_section(text)
+                heading_block = block
+            continue
+        assembler.block_lines.append(text)
+    assembler.end_section()
+
+    sections = assembler.sections
+    # Text before the first heading is mostly authors and affiliations; keep it only if nothing else was found.
+    if len(sections) > 1 and not sections[0]["heading"]:
+        sections = sections[1:]
+    result["content"]["sections"] = sections
+    return result
+
+
+def parse_pdf(path: Path, doi: Optional[str] = None) -> Dict[str, Any]:
+    """Parse ``path`` locally; unreadable PDFs yield the empty placeholder structure."""
+    try:
+        lines = read_lines(path)
+    except Exception as exc:  # noqa: BLE001 - corrupt or encrypted files
+        logger.warning("Could not read PDF %s: %s", path, exc)
+        return _fallback_structure(doi)
+    result = assemble(lines, doi)
+    content = result["content"]
+    logger.info(
+        "Parsed %s locally: %d sections, %d tables, %d figures",
+        path,
+        len(content["sections"]),
+        len(content["tables"]),
+        len(content["figures"]),
+    )
+    return result
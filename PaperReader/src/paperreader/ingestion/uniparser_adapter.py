@@ -1,12 +1,16 @@
 """Adapter to call Uni-parser or other parsers."""
 from __future__ import annotations
 
+import copy
 import json
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import requests
 
+from paperreader.io.atomic import atomic_open, atomic_write_text
+from paperreader.io.json_stream import read_json_fields
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -17,9 +21,50 @@ DEFAULT_PARSED_STRUCTURE = {
     "content": {"sections": [], "tables": [], "figures": []},
 }
 
+# Flags sent to /trigger-file-async; part of the stage cache key for parsed JSON.
+PARSER_OPTIONS = {
+    "textual": True,
+    "chart": True,
+    "table": True,
+    "molecule": True,
+    "equation": True,
+    "figure": True,
+    "expression": True,
+}
+
+DEFAULT_HOST = "http://101.126.82.63:40001"
+DEFAULT_TOKEN = "article"
+
+# Parts of the result requested from /get-result.
+RESULT_OPTIONS = {
+    "content": True,
+    "objects": True,
+    "pages_dict": True,
+}
+
+# Parts of a parsed document that later stages read (see ``strip_metadata``).
+PARSED_FIELDS = {"metadata": True, "content": {"sections": True, "tables": True, "figures": True}}
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# The synchronous endpoint keys results only by the request token, so two
+# parses under the same token must not overlap between trigger and get-result.
+_TOKEN_LOCKS: Dict[str, threading.Lock] = {}
+_TOKEN_LOCKS_GUARD = threading.Lock()
+
+
+def _token_lock(token: str) -> threading.Lock:
+    with _TOKEN_LOCKS_GUARD:
+        return _TOKEN_LOCKS.setdefault(token, threading.Lock())
+
+
+def read_parsed(path: Path) -> Dict[str, Any]:
+    """Load only metadata and content sections/tables/figures of a parsed JSON file."""
+    return read_json_fields(path, PARSED_FIELDS)
+
 
 def _fallback_structure(doi: Optional[str]) -> Dict[str, Any]:
-    fallback = DEFAULT_PARSED_STRUCTURE.copy()
+    fallback = copy.deepcopy(DEFAULT_PARSED_STRUCTURE)
     fallback["metadata"]["doi"] = doi or ""
     return fallback
 
@@ -30,6 +75,7 @@ def parse_document(
     doi: Optional[str] = None,
     host: Optional[str] = None,
     token: Optional[str] = None,
+    timeout: int = 300,
 ) -> Dict[str, Any]:
     """Parse a document using Uni-parser HTTP endpoint.
 
@@ -41,58 +87,61 @@ def parse_document(
     if not source.exists():
         logger.warning("Source %s not found. Writing placeholder parsed JSON.", source)
         result = _fallback_structure(doi)
-        output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        atomic_write_text(output_path, json.dumps(result, ensure_ascii=False))
         return result
 
-    base_host = host or "http://101.126.82.63:40001"
-    effective_token = token or "article"
+    base_host = host or DEFAULT_HOST
+    effective_token = token or DEFAULT_TOKEN
     trigger_url = f"{base_host}/trigger-file-async"
     result_url = f"{base_host}/get-result"
 
     data = {
         "token": effective_token,
         "sync": True,
-        "textual": True,
-        "chart": True,
-        "table": True,
-        "molecule": True,
-        "equation": True,
-        "figure": True,
-        "expression": True,
+        **PARSER_OPTIONS,
     }
 
-    try:
-        with source.open("rb") as fh:
-            response = requests.post(trigger_url, files={"file": fh}, data=data)
-        trigger_resp = response.json()
-    except Exception as exc:  # pragma: no cover - network/file errors
-        logger.error("Uni-parser trigger failed for %s: %s", source, exc)
-        result = _fallback_structure(doi)
-        output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
-        return result
-
-    if trigger_resp.get("status") != "success":
-        logger.error("Uni-parser returned non-success for %s: %s", source, trigger_resp)
-        result = _fallback_structure(doi)
-        output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
-        return result
-
-    result_req = {
-        "token": effective_token,
-        "content": True,
-        "objects": True,
-        "pages_dict": True,
-    }
-
-    try:
-        result: Dict[str, Any] = requests.post(result_url, json=result_req).json()
-    except Exception as exc:  # pragma: no cover - network errors
-        logger.error("Uni-parser result fetch failed for %s: %s", source, exc)
-        result = _fallback_structure(doi)
-    else:
-        logger.info("Parsed %s via Uni-parser", source)
-        if doi:
-            result.setdefault("metadata", {}).setdefault("doi", doi)
-
-    output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    with _token_lock(effective_token):
+        try:
+            with source.open("rb") as fh:
+                response = requests.post(trigger_url, files={"file": fh}, data=data, timeout=timeout)
+            trigger_resp = response.json()
+        except Exception as exc:  # pragma: no cover - network/file errors
+            logger.error("Uni-parser trigger failed for %s: %s", source, exc)
+            result = _fallback_structure(doi)
+            atomic_write_text(output_path, json.dumps(result, ensure_ascii=False))
+            return result
+
+        if trigger_resp.get("status") != "success":
+            logger.error("Uni-parser returned non-success for %s: %s", source, trigger_resp)
+            result = _fallback_structure(doi)
+            atomic_write_text(output_path, json.dumps(result, ensure_ascii=False))
+            return result
+
+        result_req = {
+            "token": effective_token,
+            **RESULT_OPTIONS,
+        }
+
+        # The result (with per-page objects) goes straight to disk; only the parts
+        # cleaning needs are read back, so the full document is never in memory.
+        try:
+            with requests.post(result_url, json=result_req, timeout=timeout, stream=True) as response:
+                # An error body must not replace the parsed JSON.
+                response.raise_for_status()
+                with atomic_open(output_path, "wb") as fh:
+                    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        fh.write(chunk)
+            result = read_parsed(output_path)
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.error("Uni-parser result fetch failed for %s: %s", source, exc)
+            result = _fallback_structure(doi)
+            atomic_write_text(output_path, json.dumps(result, ensure_ascii=False))
+            return result
+
+    logger.info("Parsed %s via Uni-parser", source)
+    if doi:
+        metadata = result.setdefault("metadata", {})
+        if isinstance(metadata, dict):
+            metadata.setdefault("doi", doi)
     return result
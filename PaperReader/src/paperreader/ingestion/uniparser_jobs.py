@@ -0,0 +1,320 @@
+"""Non-blocking Uni-parser job submission with batched result polling.
+
+``parse_document`` holds one connection open per document (``"sync": True``).
+:class:`UniParserJobQueue` instead submits files with ``"sync": False``, keeps
+the job token returned by ``/trigger-file-async`` and lets a single poller
+thread check every in-flight job against ``/get-result`` per round, backing
+off while nothing finishes. At most ``max_in_flight`` jobs are queued on the
+server at once, so the parser stays busy without being flooded. Like
+:func:`parse_document`, a finished result is streamed straight to its output
+file and only the fields later stages read are kept in memory.
+
+Results can only be told apart when the server issues a per-job token or
+task id. The first successful trigger response decides this for the life of
+the queue; until then, and for good if it carries no such id, jobs hold the
+request token's lock (shared with :func:`parse_document`) from trigger
+until the server reports a terminal state, i.e. run one at a time. A job
+that times out resolves to the placeholder but keeps the lock while the
+server may still be working on it.
+"""
+from __future__ import annotations
+
+import io
+import json
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from paperreader.ingestion.uniparser_adapter import (
+    DEFAULT_HOST,
+    DEFAULT_TOKEN,
+    PARSED_FIELDS,
+    PARSER_OPTIONS,
+    RESULT_OPTIONS,
+    STREAM_CHUNK_SIZE,
+    _fallback_structure,
+    _token_lock,
+)
+from paperreader.io.atomic import atomic_open, atomic_write_text
+from paperreader.io.json_stream import read_stream_fields, select_fields
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# Result statuses meaning "submitted but not finished yet".
+PENDING_STATUSES = {"pending", "queued", "running", "processing", "in_progress"}
+
+
+class _StillRunning(Exception):
+    """Aborts saving a ``/get-result`` body that only reports the job as pending."""
+
+
+@dataclass
+class _Job:
+    source: Path
+    output_path: Path
+    doi: Optional[str]
+    token: str
+    future: Future
+    # Holds the request token's lock because the server issued no per-job id.
+    exclusive: bool = False
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class UniParserJobQueue:
+    """Bounded set of asynchronous Uni-parser jobs polled by one background thread."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        token: Optional[str] = None,
+        max_in_flight: int = 4,
+        poll_interval: float = 1.0,
+        max_poll_interval: float = 15.0,
+        job_timeout: float = 900.0,
+        request_timeout: float = 120.0,
+        session: Optional[requests.Session] = None,
+    ):
+        self.host = host or DEFAULT_HOST
+        self.token = token or DEFAULT_TOKEN
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.job_timeout = job_timeout
+        self.request_timeout = request_timeout
+        self._session = session or requests.Session()
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._jobs: List[_Job] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._poller: Optional[threading.Thread] = None
+        # None until the first trigger response tells whether the server issues per-job ids.
+        self._per_job_ids: Optional[bool] = None
+
+    def submit(self, source: Path, output_path: Path, doi: Optional[str] = None) -> "Future[Dict[str, Any]]":
+        """Upload ``source`` and return a future for its parsed JSON.
+
+        The full result is written to ``output_path``; the future holds only
+        the fields later stages read. Blocks while ``max_in_flight`` jobs are
+        already on the server. Parse failures write and resolve to the
+        placeholder structure, matching :func:`parse_document`; the future
+        only raises if the poller itself fails.
+        """
+        future: Future = Future()
+        if not source.exists():
+            logger.warning("Source %s not found. Using placeholder parsed JSON.", source)
+            self._resolve_fallback(future, output_path, doi)
+            return future
+
+        self._slots.acquire()
+        token_lock = _token_lock(self.token)
+        # Every job is exclusive until the first trigger response has decided the mode.
+        exclusive = self._per_job_ids is not True
+        if exclusive:
+            token_lock.acquire()
+        job_token = self._trigger(source)
+        if job_token is not None and self._per_job_ids is None:
+            # Decided once: non-exclusive jobs submitted after this rely on it.
+            self._per_job_ids = job_token != self.token
+        if exclusive and job_token is not None and job_token != self.token:
+            # The server keys this result per job, so the lock is not needed.
+            token_lock.release()
+            exclusive = False
+        elif not exclusive and job_token == self.token:
+            # Submitted without the lock, so the result cannot be told apart from other jobs'.
+            logger.error("Uni-parser issued no job token for %s; using placeholder parsed JSON", source)
+            job_token = None
+        if job_token is None:
+            if exclusive:
+                token_lock.release()
+            self._slots.release()
+            self._resolve_fallback(future, output_path, doi)
+            return future
+
+        job = _Job(source=source, output_path=output_path, doi=doi, token=job_token, future=future, exclusive=exclusive)
+        with self._lock:
+            self._jobs.append(job)
+            self._ensure_poller()
+        self._wakeup.set()
+        return future
+
+    def _trigger(self, source: Path) -> Optional[str]:
+        """Submit ``source``; return its job token (the request token if none was issued), or ``None``."""
+        data = {"token": self.token, "sync": False, **PARSER_OPTIONS}
+        try:
+            with source.open("rb") as fh:
+                response = self._session.post(
+                    f"{self.host}/trigger-file-async",
+                    files={"file": fh},
+                    data=data,
+                    timeout=self.request_timeout,
+                )
+            trigger_resp = response.json()
+        except Exception as exc:  # pragma: no cover - network/file errors
+            logger.error("Uni-parser trigger failed for %s: %s", source, exc)
+            return None
+
+        if trigger_resp.get("status") != "success":
+            logger.error("Uni-parser returned non-success for %s: %s", source, trigger_resp)
+            return None
+        # Servers that do not issue per-job tokens key results by the request token.
+        return trigger_resp.get("token") or trigger_resp.get("task_id") or self.token
+
+    def _ensure_poller(self) -> None:
+        if self._poller is None or not self._poller.is_alive():
+            self._poller = threading.Thread(target=self._poll_loop, name="uniparser-poller", daemon=True)
+            self._poller.start()
+
+    @staticmethod
+    def _resolve_fallback(future: Future, output_path: Path, doi: Optional[str]) -> None:
+        result = _fallback_structure(doi)
+        atomic_write_text(output_path, json.dumps(result, ensure_ascii=False))
+        future.set_result(result)
+
+    @staticmethod
+    def _save_result(response: Any, fh: IO[bytes]) -> Dict[str, Any]:
+        """Stream ``response`` into ``fh`` and read back its status and parsed fields in one pass."""
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            fh.write(chunk)
+        fh.flush()
+        fh.seek(0)
+        text = io.TextIOWrapper(fh, encoding="utf-8")
+        try:
+            result = read_stream_fields(text, {"status": True, **PARSED_FIELDS})
+        finally:
+            text.detach()
+        if str(result.get("status", "")).lower() in PENDING_STATUSES:
+            raise _StillRunning
+        return select_fields(result, PARSED_FIELDS)
+
+    def _fetch(self, job: _Job) -> Optional[Dict[str, Any]]:
+        """Save the finished result to ``job.output_path`` and return its parsed fields.
+
+        Returns ``None`` while the job is still running; a pending response
+        aborts the atomic write, so it never replaces the output file.
+        """
+        try:
+            with self._session.post(
+                f"{self.host}/get-result",
+                json={"token": job.token, **RESULT_OPTIONS},
+                timeout=self.request_timeout,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                if job.future.done():
+                    # Timed out: only whether the server has finished matters; the placeholder stays.
+                    with tempfile.TemporaryFile() as fh:
+                        return self._save_result(response, fh)
+                with atomic_open(job.output_path, "w+b") as fh:
+                    return self._save_result(response, fh)
+        except _StillRunning:
+            return None
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("Uni-parser poll failed for %s: %s", job.source, exc)
+            return None
+
+    def _release(self, job: _Job) -> None:
+        with self._lock:
+            self._jobs.remove(job)
+        if job.exclusive:
+            _token_lock(self.token).release()
+        self._slots.release()
+
+    def _finish(self, job: _Job, result: Dict[str, Any]) -> None:
+        self._release(job)
+        job.future.set_result(result)
+
+    def _poll_loop(self) -> None:
+        try:
+            self._poll()
+        except BaseException as exc:
+            # Without a poller nothing would ever resolve the outstanding futures.
+            logger.exception("Uni-parser poller failed; failing %d pending jobs", len(self._jobs))
+            with self._lock:
+                jobs = list(self._jobs)
+            for job in jobs:
+                self._release(job)
+                if not job.future.done():
+                    job.future.set_exception(exc)
+
+    def _poll(self) -> None:
+        interval = self.poll_interval
+        while True:
+            with self._lock:
+                jobs = list(self._jobs)
+                if not jobs and self._closed:
+                    return
+            if not jobs:
+                self._wakeup.wait(timeout=self.max_poll_interval)
+                self._wakeup.clear()
+                interval = self.poll_interval
+                continue
+
+            completed = 0
+            for job in jobs:
+                result = self._fetch(job)
+                if job.future.done():
+                    # Timed out while holding the token lock; free it once the server has finished.
+                    if result is not None:
+                        self._release(job)
+                    continue
+                if result is not None:
+                    logger.info("Parsed %s via Uni-parser (async)", job.source)
+                    if job.doi:
+                        result.setdefault("metadata", {}).setdefault("doi", job.doi)
+                    self._finish(job, result)
+                    completed += 1
+                elif time.monotonic() - job.submitted_at > self.job_timeout:
+                    logger.error("Uni-parser job for %s timed out after %.0fs", job.source, self.job_timeout)
+                    if not job.exclusive:
+                        self._release(job)
+                    # An exclusive job keeps the lock: the server may still be processing under the
+                    # shared token, and releasing it now would let the next job read this job's result.
+                    self._resolve_fallback(job.future, job.output_path, job.doi)
+                    completed += 1
+
+            # Poll quickly while jobs are finishing, back off while the server is busy.
+            interval = self.poll_interval if completed else min(self.max_poll_interval, interval * 1.5)
+            time.sleep(interval)
+
+    def parse(self, source: Path, output_path: Path, doi: Optional[str] = None) -> Dict[str, Any]:
+        """Blocking drop-in for :func:`parse_document` that goes through the queue."""
+        return self.submit(source, output_path, doi=doi).result()
+
+    def parse_many(
+        self, items: Iterable[Tuple[Path, Path, Optional[str]]]
+    ) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+        """Submit ``(source, output_path, doi)`` triples and yield ``(source, result)`` as jobs complete."""
+        items = list(items)
+        done: "queue.Queue[Tuple[Path, Dict[str, Any]]]" = queue.Queue()
+
+        def collect(future: Future, source: Path, doi: Optional[str]) -> None:
+            error = future.exception()
+            done.put((source, _fallback_structure(doi) if error is not None else future.result()))
+
+        def feed() -> None:
+            for source, output_path, doi in items:
+                future = self.submit(source, output_path, doi=doi)
+                future.add_done_callback(lambda fut, src=source, d=doi: collect(fut, src, d))
+
+        feeder = threading.Thread(target=feed, name="uniparser-feeder", daemon=True)
+        feeder.start()
+        for _ in items:
+            yield done.get()
+        feeder.join()
+
+    def close(self) -> None:
+        """Stop the poller once every job has resolved and timed-out jobs have released the token lock."""
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._poller is not None:
+            self._poller.join()
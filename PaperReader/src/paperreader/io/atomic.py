@@ -0,0 +1,35 @@
+"""Atomic file writes: write a hidden sibling temp file, fsync, then rename into place."""
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+
+@contextmanager
+def atomic_open(
+    path: Path, mode: str = "w", encoding: Optional[str] = None, newline: Optional[str] = None
+) -> Iterator[IO]:
+    """Open a temp file next to ``path`` that replaces it only if the block succeeds.
+
+    Readers (and a resumed run) therefore see either the previous file or the
+    complete new one, never a half-written artifact.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as fh:
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    with atomic_open(path, "w", encoding=encoding) as fh:
+        fh.write(text)
@@ -0,0 +1,272 @@
+"""SQLite catalog of per-DOI artifacts with FTS5 full-text search.
+
+``run_pipeline`` upserts every finished DOI: the cleaned body text and info
+summary go into an FTS5 table ranked with BM25, and each ``DataRecord`` into
+``records`` with the first number of its value parsed into ``value_num``, so
+queries such as "perovskite with 性能 > 20" are one indexed lookup instead of
+opening thousands of JSON files.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+INFO_FIELDS = ("material_system", "process", "performance", "novelty")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    doi TEXT PRIMARY KEY,
+    content_key TEXT NOT NULL,
+    material_system TEXT,
+    process TEXT,
+    performance TEXT,
+    novelty TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    doi TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    value_num REAL,
+    evidence TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_doi ON records (doi);
+CREATE INDEX IF NOT EXISTS idx_records_field_num ON records (field, value_num);
+"""
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+# Scripts written without spaces between words; indexed as characters and bigrams.
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+
+def _first_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.search(str(value)) if value is not None else None
+    return float(match.group()) if match else None
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _short_grams(text: str) -> str:
+    """Spell out CJK runs as single characters and overlapping bigrams, one token each.
+
+    ``unicode61`` keeps a run of CJK characters as one token, so a two-character
+    term in the middle of a sentence would otherwise never match.
+    """
+
+    def grams(match: "re.Match[str]") -> str:
+        run = match.group()
+        return " " + " ".join([*run, *(run[i : i + 2] for i in range(len(run) - 1))]) + " "
+
+    return _CJK_RUN.sub(grams, text)
+
+
+@dataclass
+class SearchHit:
+    doi: str
+    snippet: str
+    info: Dict[str, Optional[str]]
+    records: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"doi": self.doi, "snippet": self.snippet, "info": self.info, "records": self.records}
+
+
+class ArtifactCatalog:
+    """Indexed store of cleaned text, info fields and extracted records per DOI.
+
+    Uses the FTS5 ``trigram`` tokenizer where SQLite provides it so Chinese
+    summaries are searchable by substring. Trigrams cannot match terms shorter
+    than three characters, so those go to ``papers_grams``, a ``unicode61``
+    table holding the same text with CJK runs spelled out as characters and
+    bigrams: short CJK terms match anywhere, short Latin terms match word
+    prefixes. Older SQLite builds get ``unicode61`` for the main table and no
+    secondary index. One lock-guarded connection is shared by all pipeline
+    threads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.tokenizer = self._create_fts()
+        if self.tokenizer == "trigram":
+            self._create_grams()
+        self._conn.commit()
+
+    def _create_fts(self) -> str:
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'papers_fts'").fetchone()
+        if row is not None:
+            return "trigram" if "trigram" in row[0] else "unicode61"
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE papers_fts USING fts5("
+                    f"doi UNINDEXED, text, {', '.join(INFO_FIELDS)}, tokenize='{tokenizer}')"
+                )
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        raise RuntimeError("SQLite was built without FTS5; the artifact catalog needs it")
+
+    def _create_grams(self) -> None:
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'papers_grams'").fetchone():
+            return
+        self._conn.execute("CREATE VIRTUAL TABLE papers_grams USING fts5(doi UNINDEXED, grams, tokenize='unicode61')")
+        # Catalogs written before the secondary index existed are backfilled once.
+        rows = self._conn.execute(f"SELECT doi, text, {', '.join(INFO_FIELDS)} FROM papers_fts").fetchall()
+        self._conn.executemany(
+            "INSERT INTO papers_grams (doi, grams) VALUES (?, ?)",
+            [(row[0], self._grams_text(row[1:])) for row in rows],
+        )
+
+    @staticmethod
+    def _grams_text(values: Iterable[Optional[str]]) -> str:
+        return _short_grams("\n".join(value for value in values if value))
+
+    def is_current(self, doi: str, content_key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT content_key FROM papers WHERE doi = ?", (doi,)).fetchone()
+        return row is not None and row[0] == content_key
+
+    def upsert(
+        self,
+        doi: str,
+        content_key: str,
+        text: str,
+        info: Mapping[str, Any],
+        records: Iterable[Mapping[str, Any]],
+    ) -> None:
+        """Replace everything stored for ``doi`` in one transaction."""
+        info_values = [_text(info.get(name)) for name in INFO_FIELDS]
+        record_rows = [
+            (
+                doi,
+                str(record.get("field", "")),
+                _text(record.get("value")),
+                _first_number(record.get("value")),
+                _text(record.get("evidence")),
+            )
+            for record in records
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM papers_fts WHERE doi = ?", (doi,))
+            self._conn.execute("DELETE FROM records WHERE doi = ?", (doi,))
+            if self.tokenizer == "trigram":
+                self._conn.execute("DELETE FROM papers_grams WHERE doi = ?", (doi,))
+                self._conn.execute(
+                    "INSERT INTO papers_grams (doi, grams) VALUES (?, ?)", (doi, self._grams_text([text, *info_values]))
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO papers (doi, content_key, material_system, process, performance, novelty, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doi, content_key, *info_values, time.time()),
+            )
+            self._conn.execute(
+                f"INSERT INTO papers_fts (doi, text, {', '.join(INFO_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                (doi, text, *info_values),
+            )
+            self._conn.executemany(
+                "INSERT INTO records (doi, field, value, value_num, evidence) VALUES (?, ?, ?, ?, ?)", record_rows
+            )
+
+    def _match_clause(self, query: str) -> Tuple[List[str], List[Any]]:
+        """Translate free text into FTS5 MATCH conditions (all terms must match)."""
+        conditions: List[str] = []
+        params: List[Any] = []
+        phrases = []
+        short_phrases = []
+        for term in query.split():
+            if self.tokenizer == "trigram" and len(term) < 3:
+                if not re.search(r"\w", term):
+                    continue  # unicode61 drops punctuation, leaving nothing to match
+                # A CJK run this short is itself an indexed character or bigram.
+                tokens = _CJK_RUN.sub(lambda match: f" {match.group()} ", term).strip()
+                phrase = '"' + tokens.replace('"', '""') + '"'
+                short_phrases.append(phrase if _CJK_RUN.search(term) else phrase + "*")
+            else:
+                phrases.append('"' + term.replace('"', '""') + '"')
+        if phrases:
+            conditions.append("papers_fts MATCH ?")
+            params.append(" ".join(phrases))
+        if short_phrases:
+            conditions.append("papers_fts.doi IN (SELECT doi FROM papers_grams WHERE papers_grams MATCH ?)")
+            params.append(" ".join(short_phrases))
+        return conditions, params
+
+    def search(
+        self,
+        query: str = "",
+        field_name: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[SearchHit]:
+        """Return DOIs matching ``query`` whose ``field_name`` record lies in the value range.
+
+        Results are ranked by BM25 when the query uses the full-text index.
+        """
+        conditions, params = self._match_clause(query)
+        ranked = conditions and conditions[0] == "papers_fts MATCH ?"
+
+        record_filter: List[str] = []
+        record_params: List[Any] = []
+        if field_name:
+            record_filter.append("field = ?")
+            record_params.append(field_name)
+        if min_value is not None:
+            record_filter.append("value_num >= ?")
+            record_params.append(min_value)
+        if max_value is not None:
+            record_filter.append("value_num <= ?")
+            record_params.append(max_value)
+        if record_filter:
+            conditions.append(f"papers_fts.doi IN (SELECT doi FROM records WHERE {' AND '.join(record_filter)})")
+            params.extend(record_params)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        snippet = "snippet(papers_fts, 1, '[', ']', '…', 16)" if ranked else "substr(papers_fts.text, 1, 200)"
+        order = "bm25(papers_fts)" if ranked else "papers_fts.doi"
+        sql = (
+            f"SELECT papers_fts.doi, {snippet}, {', '.join(f'papers_fts.{col}' for col in INFO_FIELDS)} "
+            f"FROM papers_fts {where} ORDER BY {order} LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+            hits = [SearchHit(doi=row[0], snippet=row[1] or "", info=dict(zip(INFO_FIELDS, row[2:]))) for row in rows]
+            for hit in hits:
+                record_sql = "SELECT field, value, evidence FROM records WHERE doi = ?"
+                if record_filter:
+                    record_sql += f" AND {' AND '.join(record_filter)}"
+                hit.records = [
+                    {"field": f, "value": v, "evidence": e}
+                    for f, v, e in self._conn.execute(record_sql, (hit.doi, *record_params))
+                ]
+        return hits
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,10 @@
 """Load DOI list from Excel files."""
 from __future__ import annotations
 
+import re
 from pathlib import Path
-from typing import List
+from typing import Iterable, List, Optional
+from urllib.parse import unquote
 
 import pandas as pd
 
@@ -11,8 +13,61 @@ from paperreader.utils.log import get_logger
 logger = get_logger(__name__)
 
 
+# Resolver URLs and "doi:" labels that spreadsheets merged from different sources put in front of a DOI.
+_DOI_PREFIX = re.compile(r"^(?:(?:https?://)?(?:dx\.)?doi\.org/|doi\s*[:：]\s*|doi\s+)", re.IGNORECASE)
+_DOI = re.compile(r"^10\.\d+(?:\.\d+)*/\S+$")
+
+
+def normalize_doi(value: str) -> Optional[str]:
+    """Strip resolver URLs, ``doi:`` labels, percent-encoding and trailing punctuation from ``value``.
+
+    Returns ``None`` when what is left does not look like a DOI. The case is
+    kept because artifact file names are derived from the DOI; compare with
+    :func:`doi_key`, since DOIs are case-insensitive.
+    """
+    doi = unquote(str(value)).strip()
+    doi = _DOI_PREFIX.sub("", doi).strip().rstrip(".,;")
+    return doi if _DOI.match(doi) else None
+
+
+def doi_key(doi: str) -> str:
+    """Comparison key under which two spellings of the same DOI are equal."""
+    return doi.lower()
+
+
+def dedupe_dois(values: Iterable[str]) -> List[str]:
+    """Normalise ``values`` and drop duplicates, keeping the first spelling of each DOI.
+
+    Entries that are not DOIs are kept as given (stripped) so they still show
+    up as failures in the run instead of disappearing silently.
+    """
+    dois: List[str] = []
+    seen = set()
+    duplicates = 0
+    for value in values:
+        raw = str(value).strip()
+        if not raw:
+            continue
+        doi = normalize_doi(raw)
+        if doi is None:
+            logger.warning("%r does not look like a DOI", raw)
+            doi = raw
+        key = doi_key(doi)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        dois.append(doi)
+    if duplicates:
+        logger.info("Dropped %d duplicate DOIs", duplicates)
+    return dois
+
+
 def load_doi_list(path: Path) -> List[str]:
-    """Load DOIs from an Excel file with a column named `doi` (case-insensitive)."""
+    """Load DOIs from an Excel file with a column named `doi` (case-insensitive).
+
+    DOIs are normalised and deduplicated with :func:`dedupe_dois`.
+    """
     if not path.exists():
         logger.warning("DOI file not found at %s", path)
         return []
@@ -24,7 +79,6 @@ def load_doi_list(path: Path) -> List[str]:
         logger.warning("No 'doi' column found in %s", path)
         return []
 
-    doi_series = df[doi_col].dropna().astype(str).str.strip()
-    dois = [doi for doi in doi_series if doi]
+    dois = dedupe_dois(df[doi_col].dropna().astype(str))
     logger.info("Loaded %d DOIs from %s", len(dois), path)
     return dois
@@ -7,14 +7,14 @@ from typing import Any
 
 import ujson
 
+from paperreader.io.atomic import atomic_open
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
 
 
 def save_json(data: Any, path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
+    with atomic_open(path, "w", encoding="utf-8") as f:
         ujson.dump(data, f, ensure_ascii=False, indent=2)
     logger.info("Saved JSON to %s", path)
 
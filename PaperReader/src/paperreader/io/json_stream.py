@@ -0,0 +1,186 @@
+"""Incremental, field-selective JSON reading.
+
+Parsed Uni-parser artifacts carry per-page ``objects`` and ``pages_dict``
+that can run to tens of MB, while cleaning only needs ``content``.
+:func:`read_json_fields` walks a file in fixed-size chunks and decodes only
+the requested keys; everything else is skipped by scanning for brackets and
+string delimiters, so it is never turned into Python objects and peak memory
+is bounded by the chunk size plus the selected values.
+"""
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Mapping, Union
+
+CHUNK_SIZE = 1024 * 1024
+
+# ``True`` decodes a value whole; a nested mapping selects keys of an object value.
+FieldSpec = Mapping[str, Union[bool, "FieldSpec"]]
+
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(r"[^,\]}\s]+")
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _Reader:
+    """Chunked cursor over a JSON text stream."""
+
+    def __init__(self, stream: IO[str], chunk_size: int = CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # Offsets of values being captured; refills keep the text from the earliest one.
+        self._marks: List[int] = []
+        self._eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping text before the cursor (or the earliest mark)."""
+        if self._eof:
+            return False
+        keep = min([self.pos, *self._marks])
+        if keep:
+            self.buf = self.buf[keep:]
+            self.pos -= keep
+            self._marks = [mark - keep for mark in self._marks]
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON input")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}, found {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def _skip_string_body(self) -> None:
+        """Move the cursor (just past an opening quote) past the closing quote."""
+        while True:
+            match = _STRING_END.match(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return
+            if not self.fill():
+                raise ValueError("unterminated string in JSON input")
+
+    def _capture(self, skip: Callable[[], None]) -> str:
+        self._marks.append(self.pos)
+        skip()
+        start = self._marks.pop()
+        return self.buf[start : self.pos]
+
+    def read_string(self) -> str:
+        if self.peek() != '"':
+            raise ValueError(f"expected a string at offset {self.pos}")
+        return json.loads(self._capture(self.skip_value))
+
+    def skip_value(self) -> None:
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string_body()
+        elif char in "[{":
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buf, self.pos)
+                if match is None:
+                    self.pos = len(self.buf)
+                    if not self.fill():
+                        raise ValueError("unterminated container in JSON input")
+                    continue
+                self.pos = match.end()
+                token = match.group()
+                if token == '"':
+                    self._skip_string_body()
+                elif token in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            while True:
+                match = _SCALAR.match(self.buf, self.pos)
+                if match is None:
+                    raise ValueError(f"unexpected {char!r} at offset {self.pos}")
+                # A scalar touching the end of the buffer may continue in the next chunk.
+                if match.end() < len(self.buf) or not self.fill():
+                    self.pos = match.end()
+                    return
+
+    def read_value(self) -> Any:
+        self.peek()
+        return json.loads(self._capture(self.skip_value))
+
+    def read_object(self, spec: FieldSpec, stop_early: bool = False) -> Dict[str, Any]:
+        """Decode the selected keys of the object at the cursor.
+
+        With ``stop_early`` the rest of the object is left unread once every
+        selected key was seen (only safe for the outermost object).
+        """
+        result: Dict[str, Any] = {}
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return result
+        while True:
+            key = self.read_string()
+            self.expect(":")
+            selected = spec.get(key)
+            if selected is True:
+                result[key] = self.read_value()
+            elif isinstance(selected, Mapping):
+                result[key] = self.read_object(selected) if self.peek() == "{" else self.read_value()
+            else:
+                self.skip_value()
+            if stop_early and all(name in result for name in spec):
+                return result
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return result
+            if separator != ",":
+                raise ValueError(f"expected ',' or '}}' at offset {self.pos - 1}, found {separator!r}")
+
+
+def read_json_fields(path: Path, spec: FieldSpec, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Return only the keys selected by ``spec`` from the JSON object stored at ``path``.
+
+    Raises ``ValueError`` for malformed input or a top-level value that is not an object.
+    """
+    with path.open("r", encoding="utf-8") as fh:
+        return read_stream_fields(fh, spec, chunk_size, name=str(path))
+
+
+def read_stream_fields(
+    stream: IO[str], spec: FieldSpec, chunk_size: int = CHUNK_SIZE, name: str = "stream"
+) -> Dict[str, Any]:
+    """:func:`read_json_fields` for an open text stream, read from its current position."""
+    reader = _Reader(stream, chunk_size)
+    if reader.peek() != "{":
+        raise ValueError(f"{name} does not contain a JSON object")
+    return reader.read_object(spec, stop_early=True)
+
+
+def select_fields(value: Any, spec: FieldSpec) -> Any:
+    """Apply ``spec`` to an already decoded value, as :func:`read_json_fields` does to a file."""
+    if not isinstance(value, dict):
+        return value
+    selected: Dict[str, Any] = {}
+    for key, sub_spec in spec.items():
+        if key in value:
+            selected[key] = value[key] if sub_spec is True else select_fields(value[key], sub_spec)
+    return selected
@@ -0,0 +1,162 @@
+"""Streaming result sinks that append rows as each DOI finishes."""
+from __future__ import annotations
+
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable, List, Mapping, Optional
+
+from openpyxl import Workbook
+
+from paperreader.io.atomic import atomic_open
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# ``duplicate_of`` names the near-duplicate DOI whose extraction a row reuses.
+COLUMNS = ("field", "value", "evidence", "doi", "duplicate_of")
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+
+
+def _cell(value: Any) -> Optional[str]:
+    """Flatten LLM values (numbers, lists, dicts) to something every format can store."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def check_output_format(output_format: str) -> None:
+    """Raise ``ValueError`` for an unknown format, or for parquet when pyarrow is not installed."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(OUTPUT_FORMATS)}")
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Parquet output requires pyarrow: pip install pyarrow")
+
+
+class RecordSink(ABC):
+    """Append-only writer for extraction rows; memory use does not grow with the run."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows_written = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write_rows(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        batch = [[_cell(row.get(column)) for column in COLUMNS] for row in rows]
+        if batch:
+            self._write(batch)
+            self.rows_written += len(batch)
+
+    @abstractmethod
+    def _write(self, batch: List[List[Optional[str]]]) -> None:
+        """Append ``batch`` (rows of cells in ``COLUMNS`` order)."""
+
+    def close(self) -> None:
+        logger.info("Wrote %d rows to %s", self.rows_written, self.path)
+
+    def __enter__(self) -> "RecordSink":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class CsvSink(RecordSink):
+    """UTF-8 CSV flushed after every DOI, so a crash keeps every finished row."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        # utf-8-sig so Excel opens Chinese field names correctly.
+        self._fh = path.open("w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._fh)
+        self._writer.writerow(COLUMNS)
+        self._fh.flush()
+
+    def _write(self, batch: List[List[Optional[str]]]) -> None:
+        self._writer.writerows(batch)
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+        super().close()
+
+
+class XlsxSink(RecordSink):
+    """openpyxl write-only workbook: rows stream to a temp file and are zipped on close.
+
+    The workbook replaces ``path`` atomically, so an interrupted run never
+    leaves a truncated file behind.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("records")
+        self._sheet.append(list(COLUMNS))
+
+    def _write(self, batch: List[List[Optional[str]]]) -> None:
+        for row in batch:
+            self._sheet.append(row)
+
+    def close(self) -> None:
+        with atomic_open(self.path, "wb") as fh:
+            self._workbook.save(fh)
+        super().close()
+
+
+class ParquetSink(RecordSink):
+    """Parquet file written one row group at a time (requires ``pyarrow``)."""
+
+    def __init__(self, path: Path, row_group_size: int = 5_000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Parquet output requires pyarrow: pip install pyarrow") from exc
+        super().__init__(path)
+        self._pa = pa
+        self._schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+        # Written to a unique file beside the target and renamed on close, like the xlsx sink.
+        fd, partial = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+        os.close(fd)
+        self._partial = Path(partial)
+        self._writer = pq.ParquetWriter(str(self._partial), self._schema)
+        self._row_group_size = row_group_size
+        self._buffer: List[List[Optional[str]]] = []
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=self._pa.string()) for values in columns], schema=self._schema
+        )
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def _write(self, batch: List[List[Optional[str]]]) -> None:
+        self._buffer.extend(batch)
+        if len(self._buffer) >= self._row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+        os.replace(self._partial, self.path)
+        super().close()
+
+
+def open_sink(output_format: str, path: Path) -> RecordSink:
+    check_output_format(output_format)
+    if output_format == "xlsx":
+        return XlsxSink(path)
+    if output_format == "csv":
+        return CsvSink(path)
+    return ParquetSink(path)
@@ -0,0 +1,254 @@
+"""Offline extraction through an OpenAI-compatible batch API.
+
+In batch mode the pipeline's LLM client is wrapped in a
+:class:`BatchCollector`. Instead of calling ``chat.completions`` it queues
+every uncached request and raises :class:`BatchPending`, so the DOI is put
+back for later. After the pass over the run, the queued requests are written
+as one batch JSONL file (``custom_id`` is the response-cache key of the
+request, which covers its ``response_format``) and submitted with
+:class:`BatchAPI`, which polls until the batch completes. The deferred DOIs
+are then processed again; this time ``chat`` returns the batch responses, so
+``extract_info``/``extract_data`` parse them exactly as they parse real-time
+responses.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+from openai import OpenAI
+
+from paperreader.io.atomic import atomic_write_text
+from paperreader.llm.client import LLMClient
+from paperreader.llm.response_cache import ResponseCache
+from paperreader.llm.telemetry import record_call
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# OpenAI accepts at most 50,000 requests per batch file.
+MAX_BATCH_REQUESTS = 50_000
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchPending(Exception):
+    """Raised for a request that was queued for the next batch instead of being sent."""
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    body: Dict[str, Any]
+
+    def to_line(self) -> str:
+        line = {"custom_id": self.custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": self.body}
+        return json.dumps(line, ensure_ascii=False)
+
+
+@dataclass
+class BatchResult:
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def write_batch_file(requests: List[BatchRequest], path: Path) -> Path:
+    """Write ``requests`` as a batch input JSONL file."""
+    atomic_write_text(path, "".join(request.to_line() + "\n" for request in requests))
+    return path
+
+
+def read_batch_output(text: str) -> Dict[str, BatchResult]:
+    """Map ``custom_id`` to the response of every successful line of a batch output file."""
+    results: Dict[str, BatchResult] = {}
+    failed = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        choices = body.get("choices") or []
+        if item.get("error") or response.get("status_code") != 200 or not choices:
+            failed += 1
+            continue
+        usage = body.get("usage") or {}
+        results[item["custom_id"]] = BatchResult(
+            content=choices[0].get("message", {}).get("content") or "",
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+        )
+    if failed:
+        logger.warning("%d batch requests failed; they will be sent in real time", failed)
+    return results
+
+
+class BatchAPI:
+    """Submits batch files to the Files/Batches API and waits for their output."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        poll_interval: float = 30.0,
+        max_requests: int = MAX_BATCH_REQUESTS,
+        timeout: float = 60,
+    ):
+        self.poll_interval = poll_interval
+        self.max_requests = max(1, max_requests)
+        self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=httpx.Client(timeout=timeout))
+
+    def close(self) -> None:
+        """Close the HTTP connection pool."""
+        self._client.close()
+
+    def submit(self, path: Path) -> str:
+        with path.open("rb") as fh:
+            uploaded = self._client.files.create(file=(path.name, fh), purpose="batch")
+        batch = self._client.batches.create(
+            input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window=COMPLETION_WINDOW
+        )
+        logger.info("Submitted batch %s with %s", batch.id, path)
+        return batch.id
+
+    def wait(self, batch_id: str, cancel_event: Optional[threading.Event] = None) -> Dict[str, BatchResult]:
+        """Poll ``batch_id`` until it finishes and return its successful responses.
+
+        Returns an empty mapping if ``cancel_event`` is set first; the batch
+        itself keeps running at the provider.
+        """
+        stop = cancel_event if cancel_event is not None else threading.Event()
+        while True:
+            batch = self._client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                break
+            if stop.wait(self.poll_interval):
+                logger.warning("Stopped waiting for batch %s (status %s)", batch_id, batch.status)
+                return {}
+        counts = batch.request_counts
+        logger.info(
+            "Batch %s %s: %s of %s requests completed",
+            batch_id,
+            batch.status,
+            counts.completed if counts else "?",
+            counts.total if counts else "?",
+        )
+        if not batch.output_file_id:
+            return {}
+        return read_batch_output(self._client.files.content(batch.output_file_id).text)
+
+    def run(
+        self, requests: List[BatchRequest], path: Path, cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, BatchResult]:
+        """Submit ``requests`` (split at ``max_requests`` per file) and collect every result."""
+        parts = [requests[start : start + self.max_requests] for start in range(0, len(requests), self.max_requests)]
+        batch_ids = []
+        for index, part in enumerate(parts):
+            part_path = path if len(parts) == 1 else path.with_name(f"{path.stem}_{index + 1}{path.suffix}")
+            batch_ids.append(self.submit(write_batch_file(part, part_path)))
+        results: Dict[str, BatchResult] = {}
+        for batch_id in batch_ids:
+            results.update(self.wait(batch_id, cancel_event))
+        return results
+
+
+class BatchCollector:
+    """Stand-in for :class:`LLMClient` that defers uncached requests to the batch API.
+
+    ``chat`` answers from the response cache or from a finished batch when it
+    can; otherwise it queues the request and raises :class:`BatchPending`. A
+    request that already went through a batch without a usable result (the
+    line failed or the batch expired) is sent in real time instead, so a run
+    never waits on the same request twice. Stub clients are passed through.
+    """
+
+    def __init__(self, client: LLMClient):
+        self.client = client
+        self._lock = threading.Lock()
+        self._queued: Dict[str, BatchRequest] = {}
+        self._submitted: Dict[str, BatchRequest] = {}
+        self._results: Dict[str, BatchResult] = {}
+
+    @property
+    def stub(self) -> bool:
+        return self.client.stub
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def chat(self, messages: List[dict], temperature: float = 0.2, json_mode: bool = False) -> str:
+        if self.client.stub:
+            return self.client.chat(messages, temperature, json_mode)
+        # Same key as the response cache, so JSON-mode and plain requests for one prompt stay apart.
+        custom_id = ResponseCache.make_key(
+            self.client.model,
+            messages,
+            temperature,
+            base_url=self.client.base_url,
+            response_format=self.client.response_format(json_mode),
+        )
+        with self._lock:
+            result = self._results.get(custom_id)
+            if result is not None:
+                # Kept for other DOIs sending the identical prompt, but billed only once.
+                self._results[custom_id] = replace(result, prompt_tokens=0, completion_tokens=0)
+            submitted = custom_id in self._submitted
+        if result is not None:
+            if self.client.metrics is not None:
+                record_call(
+                    self.client.metrics,
+                    model=self.client.model,
+                    prompt_tokens=result.prompt_tokens,
+                    completion_tokens=result.completion_tokens,
+                    latency_s=0.0,
+                    batch=True,
+                )
+            return result.content
+        if submitted:
+            return self.client.chat(messages, temperature, json_mode)
+        cached = self.client.cached(messages, temperature, json_mode)
+        if cached is not None:
+            return cached
+        body = self.client.completion_kwargs(messages, temperature, json_mode)
+        with self._lock:
+            self._queued.setdefault(custom_id, BatchRequest(custom_id=custom_id, body=body))
+        raise BatchPending(custom_id)
+
+    def drain(self) -> List[BatchRequest]:
+        """Take the queued requests, marking them as submitted."""
+        with self._lock:
+            requests = list(self._queued.values())
+            self._queued.clear()
+            self._submitted.update((request.custom_id, request) for request in requests)
+        return requests
+
+    def resolve(self, results: Dict[str, BatchResult]) -> None:
+        """Make batch responses available to ``chat`` and store them in the response cache."""
+        with self._lock:
+            self._results.update(results)
+            answered = [
+                (self._submitted[custom_id].body, result)
+                for custom_id, result in results.items()
+                if custom_id in self._submitted
+            ]
+        if self.client.cache is None:
+            return
+        # Paid-for responses survive a crash before the deferred DOIs are processed again.
+        for body, result in answered:
+            if result.content:
+                self.client.cache.put(
+                    self.client.model,
+                    body["messages"],
+                    body["temperature"],
+                    result.content,
+                    base_url=self.client.base_url,
+                    response_format=body.get("response_format"),
+                )
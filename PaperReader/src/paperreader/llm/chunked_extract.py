@@ -0,0 +1,123 @@
+"""Map-reduce extraction for documents too long for a single request."""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+from dataclasses import fields as dataclass_fields
+from typing import ContextManager, Dict, List, Optional
+
+from paperreader.llm.chunking import chunk_text
+from paperreader.llm.client import LLMClient
+from paperreader.llm.combined_extract import extract_combined
+from paperreader.llm.data_extract import DEFAULT_FIELDS, extract_data
+from paperreader.llm.info_extract import extract_info
+from paperreader.llm.schemas import CombinedExtraction, DataRecord, InfoExtraction
+from paperreader.llm.telemetry import llm_context
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+INFO_SEPARATOR = "；"
+
+
+def _normalize(value: object) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def reduce_info(parts: List[InfoExtraction]) -> InfoExtraction:
+    """Join each field's distinct non-empty values in chunk order."""
+    merged: Dict[str, Optional[str]] = {}
+    for item in dataclass_fields(InfoExtraction):
+        seen = set()
+        values = []
+        for part in parts:
+            value = getattr(part, item.name)
+            if value in (None, ""):
+                continue
+            key = _normalize(value)
+            if key not in seen:
+                seen.add(key)
+                values.append(str(value))
+        merged[item.name] = INFO_SEPARATOR.join(values) if values else None
+    return InfoExtraction(**merged)
+
+
+def reduce_records(parts: List[List[DataRecord]], fields: Dict[str, str]) -> List[DataRecord]:
+    """Keep one record per distinct value of each field, in field then chunk order.
+
+    A field that no chunk could fill still yields a single empty record, so
+    the output has the same shape as ``extract_data`` for short documents.
+    """
+    merged: List[DataRecord] = []
+    for field in fields:
+        seen = set()
+        found = []
+        for records in parts:
+            for record in records:
+                if record.field != field or record.value in (None, ""):
+                    continue
+                key = _normalize(record.value)
+                if key not in seen:
+                    seen.add(key)
+                    found.append(record)
+        merged.extend(found or [DataRecord(field=field, value=None, evidence=None)])
+    return merged
+
+
+def _extract_chunk(
+    client: LLMClient,
+    chunk: str,
+    fields: Dict[str, str],
+    mode: str,
+    limiter: ContextManager,
+) -> CombinedExtraction:
+    doc = {"text": chunk}
+    if mode == "combined":
+        with limiter:
+            return extract_combined(client, doc, fields=fields)
+    with limiter:
+        info = extract_info(client, doc)
+    if mode == "info":
+        return CombinedExtraction(info=info, records=[])
+    with limiter:
+        records = extract_data(client, doc, fields=fields)
+    return CombinedExtraction(info=info, records=records)
+
+
+def extract_chunked(
+    client: LLMClient,
+    cleaned_doc: Dict,
+    fields: Optional[Dict[str, str]] = None,
+    mode: str = "separate",
+    max_chunk_tokens: int = 24_000,
+    max_workers: int = 4,
+    limiter: Optional[ContextManager] = None,
+) -> CombinedExtraction:
+    """Extract each section-aligned chunk in parallel, then reduce deterministically.
+
+    ``mode`` is ``"separate"`` or ``"combined"`` as in the pipeline, or
+    ``"info"`` to run only the info summary (the records are then left empty).
+
+    ``limiter`` (e.g. a semaphore) is entered around every individual LLM
+    request, so callers should not hold it while calling this function.
+    """
+    fields = fields or DEFAULT_FIELDS
+    limiter = limiter if limiter is not None else nullcontext()
+    chunks = chunk_text(cleaned_doc.get("text", ""), max_chunk_tokens) or [""]
+    logger.info("Extracting %d chunks (budget %d tokens each)", len(chunks), max_chunk_tokens)
+
+    def run_chunk(chunk: str) -> CombinedExtraction:
+        with llm_context():
+            return _extract_chunk(client, chunk, fields, mode, limiter)
+
+    # Each chunk runs in a copy of the caller's context so telemetry keeps the DOI.
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = [executor.submit(copy_context().run, run_chunk, chunk) for chunk in chunks]
+        parts = [future.result() for future in futures]
+
+    return CombinedExtraction(
+        info=reduce_info([part.info for part in parts]),
+        records=reduce_records([part.records for part in parts], fields),
+    )
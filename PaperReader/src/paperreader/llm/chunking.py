@@ -0,0 +1,74 @@
+"""Split cleaned text into token-budgeted chunks along section boundaries."""
+from __future__ import annotations
+
+import re
+from typing import List
+
+from paperreader.llm.tokens import estimate_tokens
+
+# ``strip_metadata._concat_sections`` starts every titled section with "# heading".
+_SECTION_START = re.compile(r"(?m)^(?=# )")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def split_sections(text: str) -> List[str]:
+    """Split text produced by ``_concat_sections`` back into per-section blocks."""
+    return [block.strip() for block in _SECTION_START.split(text) if block.strip()]
+
+
+def _split_oversized(section: str, max_tokens: int) -> List[str]:
+    """Break one section that alone exceeds the budget, repeating its heading."""
+    heading = ""
+    body = section
+    if section.startswith("# "):
+        heading, _, body = section.partition("\n")
+
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(body):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        # Last resort for a single huge paragraph: cut by characters. The
+        # estimate is at most one token per character, so this always fits.
+        step = max(1, max_tokens)
+        pieces.extend(paragraph[start:start + step] for start in range(0, len(paragraph), step))
+
+    heading_tokens = estimate_tokens(heading) + 1 if heading else 0
+    chunks = _pack(pieces, max(1, max_tokens - heading_tokens), separator="\n\n")
+    return [f"{heading}\n{chunk}" if heading else chunk for chunk in chunks]
+
+
+def _pack(blocks: List[str], max_tokens: int, separator: str) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for block in blocks:
+        block_tokens = estimate_tokens(block)
+        if current and current_tokens + block_tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Greedily pack whole sections into chunks of at most ``max_tokens``.
+
+    Sections are never merged out of order, and a section is only split
+    (on paragraph boundaries) when it cannot fit into a chunk by itself.
+    """
+    if not text.strip():
+        return []
+    blocks: List[str] = []
+    for section in split_sections(text):
+        if estimate_tokens(section) > max_tokens:
+            blocks.extend(_split_oversized(section, max_tokens))
+        else:
+            blocks.append(section)
+    return _pack(blocks, max_tokens, separator="\n\n")
@@ -1,40 +1,282 @@
 """Wrapper around OpenAI-compatible chat completion API."""
 from __future__ import annotations
 
-from typing import List, Optional
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI, OpenAI
 
+from paperreader.llm.rate_limit import TokenBucket, retry_after_seconds
+from paperreader.llm.response_cache import ResponseCache
+from paperreader.llm.telemetry import MetricsRecorder, record_call
+from paperreader.llm.tokens import estimate_message_tokens
 from paperreader.utils.log import get_logger
+from paperreader.utils.retry import backoff_delay
 
 logger = get_logger(__name__)
 
 
+STUB_RESPONSE = "{\"note\": \"LLM stub response; please configure OPENAI_API_KEY.\"}"
+
+# Errors worth retrying: throttling, transient network failures and 5xx.
+RETRYABLE_ERRORS: Tuple[type, ...] = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+# Completion tokens reserved against the TPM bucket before the real usage is known.
+EXPECTED_COMPLETION_TOKENS = 512
+
+
 class LLMClient:
-    """Thin wrapper that can operate in real or stub mode."""
+    """Thin wrapper that can operate in real or stub mode.
+
+    ``chat`` is synchronous; ``achat`` is its asyncio counterpart on a pooled
+    ``AsyncOpenAI`` client that allows at most ``max_in_flight`` concurrent
+    requests. The pool and its semaphore are created lazily inside each
+    running event loop, so the client can be awaited from several loops.
+    Both paths share the same requests/tokens-per-minute buckets and retry
+    throttled or failed calls with jittered exponential backoff, honouring
+    the server's ``Retry-After`` header.
+    """
 
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        cache: Optional[ResponseCache] = None,
+        max_retries: int = 5,
+        max_in_flight: int = 8,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        timeout: float = 60,
+        metrics: Optional[MetricsRecorder] = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
+        self.cache = cache
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self._rpm = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tpm = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        # Flipped off the first time the provider rejects ``response_format``.
+        self.json_mode_supported = True
+        # One pooled client and in-flight semaphore per event loop; both are bound to the loop that created them.
+        self._async_state: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
         self.stub = api_key is None
         if self.stub:
             self._client = None
             logger.warning("LLM client initialized in stub mode (no API key provided)")
         else:
-            timeout_client = httpx.Client(timeout=60)
-            self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=timeout_client)
+            timeout_client = httpx.Client(timeout=timeout)
+            # Retries are handled here so the limiter sees every attempt.
+            self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=timeout_client, max_retries=0)
 
-    def chat(self, messages: List[dict], temperature: float = 0.2) -> str:
-        """Send chat messages and return the content string."""
-        if self.stub:
-            logger.info("Stub LLM response returned")
-            return "{\"note\": \"LLM stub response; please configure OPENAI_API_KEY.\"}"
+    def _new_async_client(self) -> AsyncOpenAI:
+        pooled = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+        )
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=pooled, max_retries=0)
+
+    def _loop_state(self) -> Tuple[AsyncOpenAI, asyncio.Semaphore]:
+        """Pooled client and in-flight semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            state = (self._new_async_client(), asyncio.Semaphore(self.max_in_flight))
+            self._async_state[loop] = state
+        return state
 
-        response = self._client.chat.completions.create(
+    def _reserved_tokens(self, messages: List[dict]) -> int:
+        return estimate_message_tokens(messages) + EXPECTED_COMPLETION_TOKENS
+
+    def _settle_usage(self, reserved: int, response: Any) -> None:
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if self._tpm is not None and total is not None:
+            self._tpm.credit(reserved - total)
+
+    def _record_call(
+        self,
+        started: float,
+        response: Any = None,
+        retries: int = 0,
+        cache_hit: bool = False,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        if self.metrics is None:
+            return
+        usage = getattr(response, "usage", None)
+        record_call(
+            self.metrics,
             model=self.model,
-            temperature=temperature,
-            messages=messages,
+            prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+            latency_s=time.perf_counter() - started,
+            retries=retries,
+            cache_hit=cache_hit,
+            error=None if error is None else f"{error.__class__.__name__}: {error}",
+        )
+
+    def response_format(self, json_mode: bool) -> Optional[Dict[str, Any]]:
+        """``response_format`` sent for a request, ``None`` for plain prompts."""
+        if json_mode and self.json_mode_supported:
+            return {"type": "json_object"}
+        return None
+
+    def completion_kwargs(self, messages: List[dict], temperature: float, json_mode: bool) -> Dict[str, Any]:
+        """Request body for ``chat.completions.create``; also the body of a batch request line."""
+        kwargs: Dict[str, Any] = {"model": self.model, "temperature": temperature, "messages": messages}
+        response_format = self.response_format(json_mode)
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        return kwargs
+
+    def _json_mode_rejected(self, exc: BaseException, json_mode: bool) -> bool:
+        """True (and JSON mode switched off) if ``exc`` is the provider refusing ``response_format``.
+
+        Other bad requests (context too long, invalid model, ...) are left to
+        the caller to raise, so one unrelated error does not disable JSON mode.
+        """
+        if not (json_mode and self.json_mode_supported and isinstance(exc, openai.BadRequestError)):
+            return False
+        body = exc.body if isinstance(exc.body, dict) else {}
+        error = body.get("error") if isinstance(body.get("error"), dict) else body
+        detail = f"{exc.message} {error.get('param') or ''} {error.get('message') or ''}".lower()
+        if "response_format" not in detail and "json_object" not in detail:
+            return False
+        logger.warning("Provider rejected JSON response_format for %s; falling back to plain prompts", self.model)
+        self.json_mode_supported = False
+        return True
+
+    def cached(self, messages: List[dict], temperature: float = 0.2, json_mode: bool = False) -> Optional[str]:
+        """Return the cached response for this request, recording the hit, or ``None``."""
+        if self.cache is None:
+            return None
+        started = time.perf_counter()
+        cached = self.cache.get(
+            self.model, messages, temperature, base_url=self.base_url, response_format=self.response_format(json_mode)
         )
-        return response.choices[0].message.content or ""
+        if cached is not None:
+            self._record_call(started, cache_hit=True)
+        return cached
+
+    def _cache_put(self, messages: List[dict], temperature: float, json_mode: bool, content: str) -> None:
+        self.cache.put(
+            self.model,
+            messages,
+            temperature,
+            content,
+            base_url=self.base_url,
+            response_format=self.response_format(json_mode),
+        )
+
+    def chat(self, messages: List[dict], temperature: float = 0.2, json_mode: bool = False) -> str:
+        """Send chat messages and return the content string.
+
+        ``json_mode`` asks for the provider's JSON output mode; providers that
+        reject it are remembered and sent the plain request instead.
+        """
+        if self.stub:
+            logger.info("Stub LLM response returned")
+            return STUB_RESPONSE
+
+        cached = self.cached(messages, temperature, json_mode)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+
+        reserved = self._reserved_tokens(messages)
+        attempt = 0
+        while True:
+            if self._rpm is not None:
+                self._rpm.acquire()
+            if self._tpm is not None:
+                self._tpm.acquire(reserved)
+            try:
+                response = self._client.chat.completions.create(
+                    **self.completion_kwargs(messages, temperature, json_mode)
+                )
+                break
+            except Exception as exc:
+                # A failed attempt used no tokens; only the successful one is settled against usage.
+                if self._tpm is not None:
+                    self._tpm.credit(reserved)
+                if isinstance(exc, openai.BadRequestError) and self._json_mode_rejected(exc, json_mode):
+                    continue
+                if not isinstance(exc, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+                    self._record_call(started, retries=attempt, error=exc)
+                    raise
+                delay = backoff_delay(attempt, retry_after_seconds(exc))
+                logger.warning("LLM call failed (%s); retry %d in %.1fs", exc.__class__.__name__, attempt + 1, delay)
+                attempt += 1
+                time.sleep(delay)
+
+        self._settle_usage(reserved, response)
+        self._record_call(started, response, retries=attempt)
+        content = response.choices[0].message.content or ""
+        if self.cache is not None and content:
+            self._cache_put(messages, temperature, json_mode, content)
+        return content
+
+    async def achat(self, messages: List[dict], temperature: float = 0.2, json_mode: bool = False) -> str:
+        """Async counterpart of :meth:`chat`."""
+        if self.stub:
+            logger.info("Stub LLM response returned")
+            return STUB_RESPONSE
+
+        cached = self.cached(messages, temperature, json_mode)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+
+        client, in_flight = self._loop_state()
+        reserved = self._reserved_tokens(messages)
+        attempt = 0
+        while True:
+            if self._rpm is not None:
+                await self._rpm.acquire_async()
+            if self._tpm is not None:
+                await self._tpm.acquire_async(reserved)
+            try:
+                async with in_flight:
+                    response = await client.chat.completions.create(
+                        **self.completion_kwargs(messages, temperature, json_mode)
+                    )
+                break
+            except Exception as exc:
+                if self._tpm is not None:
+                    self._tpm.credit(reserved)
+                if isinstance(exc, openai.BadRequestError) and self._json_mode_rejected(exc, json_mode):
+                    continue
+                if not isinstance(exc, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+                    self._record_call(started, retries=attempt, error=exc)
+                    raise
+                delay = backoff_delay(attempt, retry_after_seconds(exc))
+                logger.warning("LLM call failed (%s); retry %d in %.1fs", exc.__class__.__name__, attempt + 1, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+        self._settle_usage(reserved, response)
+        self._record_call(started, response, retries=attempt)
+        content = response.choices[0].message.content or ""
+        if self.cache is not None and content:
+            self._cache_put(messages, temperature, json_mode, content)
+        return content
+
+    async def aclose(self) -> None:
+        """Close the running loop's pooled async client; it is recreated on the next ``achat``."""
+        state = self._async_state.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].close()
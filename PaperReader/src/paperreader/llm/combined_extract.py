@@ -0,0 +1,44 @@
+"""Single-request extraction returning both the info summary and data fields."""
+from __future__ import annotations
+
+import json
+from typing import Dict, Optional
+
+from paperreader.llm.client import LLMClient
+from paperreader.llm.data_extract import DEFAULT_FIELDS, records_from_payload
+from paperreader.llm.info_extract import info_from_payload
+from paperreader.llm.prompts import build_combined_prompt
+from paperreader.llm.schemas import CombinedExtraction, DataRecord, InfoExtraction
+from paperreader.llm.telemetry import llm_context, report_parse
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def combined_from_payload(parsed: object, fields: Dict[str, str]) -> CombinedExtraction:
+    payload = parsed if isinstance(parsed, dict) else {}
+    return CombinedExtraction(
+        info=info_from_payload(payload.get("info")),
+        records=records_from_payload(payload.get("data"), fields),
+    )
+
+
+def extract_combined(
+    client: LLMClient, cleaned_doc: Dict, fields: Optional[Dict[str, str]] = None
+) -> CombinedExtraction:
+    """Extract info and field data in one request instead of two."""
+    fields = fields or DEFAULT_FIELDS
+    prompt = build_combined_prompt(cleaned_doc.get("text", ""), fields)
+    with llm_context(stage="combined"):
+        response_text = client.chat(prompt, json_mode=True)
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            report_parse(False)
+            logger.warning("Failed to parse combined extraction, returning empty result")
+            return CombinedExtraction(
+                info=InfoExtraction(),
+                records=[DataRecord(field=field, value=None, evidence=None) for field in fields],
+            )
+        report_parse(True)
+        return combined_from_payload(parsed, fields)
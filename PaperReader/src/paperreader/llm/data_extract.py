@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 import json
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from paperreader.llm.client import LLMClient
 from paperreader.llm.prompts import build_data_prompt
 from paperreader.llm.schemas import DataRecord
+from paperreader.llm.telemetry import llm_context, report_parse
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -19,21 +20,29 @@ DEFAULT_FIELDS = {
 }
 
 
+def records_from_payload(parsed: Any, fields: Dict[str, str]) -> List[DataRecord]:
+    """Map a decoded ``{field: value | {value, evidence}}`` object onto ``DataRecord``s."""
+    records = []
+    for field in fields:
+        value = parsed.get(field) if isinstance(parsed, dict) else None
+        evidence = None
+        if isinstance(value, dict):
+            evidence = value.get("evidence")
+            value = value.get("value")
+        records.append(DataRecord(field=field, value=value, evidence=evidence))
+    return records
+
+
 def extract_data(client: LLMClient, cleaned_doc: Dict, fields: Dict[str, str] | None = None) -> List[DataRecord]:
     fields = fields or DEFAULT_FIELDS
     prompt = build_data_prompt(cleaned_doc.get("text", ""), fields)
-    response_text = client.chat(prompt)
-    try:
-        parsed = json.loads(response_text)
-        records = []
-        for field, description in fields.items():
-            value = parsed.get(field) if isinstance(parsed, dict) else None
-            evidence = None
-            if isinstance(value, dict):
-                evidence = value.get("evidence")
-                value = value.get("value")
-            records.append(DataRecord(field=field, value=value, evidence=evidence))
-        return records
-    except json.JSONDecodeError:
-        logger.warning("Failed to parse structured data, returning empty list")
-        return [DataRecord(field=field, value=None, evidence=None) for field in fields]
+    with llm_context(stage="data"):
+        response_text = client.chat(prompt)
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            report_parse(False)
+            logger.warning("Failed to parse structured data, returning empty list")
+            return [DataRecord(field=field, value=None, evidence=None) for field in fields]
+        report_parse(True)
+        return records_from_payload(parsed, fields)
@@ -2,27 +2,38 @@
 from __future__ import annotations
 
 import json
-from typing import Dict
+from typing import Any, Dict
 
 from paperreader.llm.client import LLMClient
 from paperreader.llm.prompts import build_info_prompt
 from paperreader.llm.schemas import InfoExtraction
+from paperreader.llm.telemetry import llm_context, report_parse
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
 
 
+def info_from_payload(parsed: Any) -> InfoExtraction:
+    """Map a decoded LLM JSON object (Chinese or English keys) onto ``InfoExtraction``."""
+    if not isinstance(parsed, dict):
+        parsed = {}
+    return InfoExtraction(
+        material_system=parsed.get("材料体系") or parsed.get("material_system"),
+        process=parsed.get("工艺") or parsed.get("process"),
+        performance=parsed.get("性能") or parsed.get("performance"),
+        novelty=parsed.get("创新点") or parsed.get("novelty"),
+    )
+
+
 def extract_info(client: LLMClient, cleaned_doc: Dict) -> InfoExtraction:
     prompt = build_info_prompt(cleaned_doc.get("text", ""))
-    response_text = client.chat(prompt)
-    try:
-        parsed = json.loads(response_text)
-        return InfoExtraction(
-            material_system=parsed.get("材料体系") or parsed.get("material_system"),
-            process=parsed.get("工艺") or parsed.get("process"),
-            performance=parsed.get("性能") or parsed.get("performance"),
-            novelty=parsed.get("创新点") or parsed.get("novelty"),
-        )
-    except json.JSONDecodeError:
-        logger.warning("Failed to parse LLM response, returning stub info")
-        return InfoExtraction(material_system=None, process=None, performance=None, novelty=None)
+    with llm_context(stage="info"):
+        response_text = client.chat(prompt)
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            report_parse(False)
+            logger.warning("Failed to parse LLM response, returning stub info")
+            return InfoExtraction(material_system=None, process=None, performance=None, novelty=None)
+        report_parse(True)
+        return info_from_payload(parsed)
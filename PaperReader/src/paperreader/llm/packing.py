@@ -0,0 +1,171 @@
+"""Packing several short documents into one info or data request.
+
+For short letters and communications the fixed part of a prompt (system
+message, template, field list) is a large share of the tokens, and every
+paper costs one round trip. :class:`RequestPacker` sits between the DOI
+workers and the LLM client. A short document is added to an open group for
+its request type. The first document of a group waits up to
+``wait_seconds`` for others to join, or until the group reaches the token
+budget, and then sends all of them in one prompt with per-document IDs
+(``D1``, ``D2``, ...). The JSON answer is split back by ID. A document whose
+section is missing or malformed, or whose group ended up with only one
+document, is extracted on its own with the normal prompt.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from concurrent.futures import Future
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+from paperreader.llm.client import LLMClient
+from paperreader.llm.data_extract import DEFAULT_FIELDS, extract_data, records_from_payload
+from paperreader.llm.info_extract import extract_info, info_from_payload
+from paperreader.llm.prompts import build_packed_data_prompt, build_packed_info_prompt
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.llm.telemetry import llm_context, report_parse
+from paperreader.llm.tokens import estimate_tokens
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+MAX_PACKED_DOCS = 8
+
+
+@dataclass
+class _Item:
+    doc: Dict[str, Any]
+    tokens: int
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class _Group:
+    items: List[_Item] = field(default_factory=list)
+    tokens: int = 0
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class RequestPacker:
+    """Shares info/data requests for short documents across concurrent callers.
+
+    A document counts as short when it fits in half of ``max_tokens``, so
+    every packed request holds at least two documents. ``limiter`` is entered
+    around every request the packer sends, packed or not, so callers should
+    not hold it themselves.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_tokens: int,
+        wait_seconds: float = 0.5,
+        max_docs: int = MAX_PACKED_DOCS,
+        limiter: Optional[ContextManager] = None,
+    ):
+        self.client = client
+        self.max_tokens = max_tokens
+        self.wait_seconds = wait_seconds
+        self.max_docs = max(2, max_docs)
+        self.limiter = limiter if limiter is not None else nullcontext()
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[str, str], _Group] = {}
+
+    def extract_info(self, cleaned_doc: Dict) -> InfoExtraction:
+        return self._extract("info", cleaned_doc, DEFAULT_FIELDS)
+
+    def extract_data(self, cleaned_doc: Dict, fields: Optional[Dict[str, str]] = None) -> List[DataRecord]:
+        return self._extract("data", cleaned_doc, fields or DEFAULT_FIELDS)
+
+    def _extract(self, kind: str, doc: Dict, fields: Dict[str, str]) -> Any:
+        tokens = estimate_tokens(doc.get("text", ""))
+        if tokens > self.max_tokens // 2:
+            return self._single(kind, doc, fields)
+        item = _Item(doc=doc, tokens=tokens)
+        key = (kind, json.dumps(fields, ensure_ascii=False, sort_keys=True))
+        group, leader = self._join(key, item)
+        if leader:
+            group.full.wait(self.wait_seconds)
+            with self._lock:
+                if self._open.get(key) is group:
+                    del self._open[key]
+            try:
+                self._send(kind, fields, group.items)
+            except Exception:  # noqa: BLE001 - the leader falls back like its followers
+                logger.exception("Packing %d documents into one %s request failed", len(group.items), kind)
+        result = item.future.result()
+        if result is None:
+            return self._single(kind, doc, fields)
+        return result
+
+    def _join(self, key: Tuple[str, str], item: _Item) -> Tuple[_Group, bool]:
+        """Add ``item`` to the open group for ``key``; True if it starts a new group."""
+        with self._lock:
+            group = self._open.get(key)
+            if group is not None and group.tokens + item.tokens > self.max_tokens:
+                # No room: the current group is sent as it is and this document starts the next one.
+                del self._open[key]
+                group.full.set()
+                group = None
+            leader = group is None
+            if group is None:
+                group = self._open[key] = _Group()
+            group.items.append(item)
+            group.tokens += item.tokens
+            if len(group.items) >= self.max_docs:
+                del self._open[key]
+                group.full.set()
+        return group, leader
+
+    def _single(self, kind: str, doc: Dict, fields: Dict[str, str]) -> Any:
+        with self.limiter:
+            if kind == "info":
+                return extract_info(self.client, doc)
+            return extract_data(self.client, doc, fields=fields)
+
+    def _send(self, kind: str, fields: Dict[str, str], items: List[_Item]) -> None:
+        """Send ``items`` in one request and resolve each future with its result, or ``None`` to retry it alone.
+
+        Every future is resolved even if building the prompt or splitting the
+        answer raises, so followers never wait forever.
+        """
+        try:
+            if len(items) == 1:
+                items[0].future.set_result(None)
+                return
+            documents = {f"D{index}": item.doc.get("text", "") for index, item in enumerate(items, start=1)}
+            if kind == "info":
+                prompt = build_packed_info_prompt(documents)
+            else:
+                prompt = build_packed_data_prompt(documents, fields)
+            parsed: Any = None
+            try:
+                with self.limiter, llm_context(stage=f"{kind}_packed"):
+                    response_text = self.client.chat(prompt, json_mode=True)
+                    try:
+                        parsed = json.loads(response_text)
+                    except json.JSONDecodeError:
+                        parsed = None
+                    report_parse(isinstance(parsed, dict))
+            except Exception:  # noqa: BLE001 - every document is retried alone, which surfaces real errors
+                logger.warning("Packed %s request for %d documents failed; retrying them one by one", kind, len(items))
+            sections = parsed if isinstance(parsed, dict) else {}
+            missing = 0
+            for doc_id, item in zip(documents, items):
+                section = sections.get(doc_id)
+                if not isinstance(section, dict):
+                    missing += 1
+                    item.future.set_result(None)
+                elif kind == "info":
+                    item.future.set_result(info_from_payload(section))
+                else:
+                    item.future.set_result(records_from_payload(section, fields))
+            logger.info("Packed %d documents into one %s request (%d retried alone)", len(items), kind, missing)
+        finally:
+            # Followers block on their futures without a timeout; whatever went wrong, none may be left pending.
+            for item in items:
+                if not item.future.done():
+                    item.future.set_result(None)
@@ -1,9 +1,14 @@
 """Prompt templates for LLM calls."""
 from __future__ import annotations
 
+import json
 from typing import Dict, List
 
 
+# Bump whenever a template below changes so cached LLM stages are recomputed.
+PROMPT_TEMPLATE_VERSION = "1"
+
+
 INFO_EXTRACTION_TEMPLATE = """
 你是科研论文信息抽取助手。请阅读以下正文，提取并用简洁中文总结：
 - 材料体系
@@ -41,6 +46,102 @@ def build_data_prompt(content: str, fields: Dict[str, str]) -> List[dict]:
     ]
 
 
+COMBINED_EXTRACTION_TEMPLATE = """
+你是科研论文信息抽取助手。请阅读以下正文，一次性完成两项任务，并严格按给定结构输出一个 JSON 对象：
+1. info：用简洁中文总结材料体系、工艺/制备方法、性能指标与创新点；
+2. data：按字段描述抽取结构化数据，每个字段给出值和来源句子。
+无法确定的信息请填 null。
+
+字段：
+{field_lines}
+
+输出结构：
+{schema}
+
+正文：
+{content}
+"""
+
+
+def combined_schema(fields: Dict[str, str]) -> Dict[str, Dict]:
+    """JSON skeleton shared by the combined prompt and its response parser."""
+    return {
+        "info": {"材料体系": None, "工艺": None, "性能": None, "创新点": None},
+        "data": {name: {"value": None, "evidence": None} for name in fields},
+    }
+
+
+def build_combined_prompt(content: str, fields: Dict[str, str]) -> List[dict]:
+    """Single prompt returning both the info summary and field-level data."""
+    field_lines = [f"- {name}: {desc}" for name, desc in fields.items()]
+    template = COMBINED_EXTRACTION_TEMPLATE.format(
+        field_lines="\n".join(field_lines),
+        schema=json.dumps(combined_schema(fields), ensure_ascii=False, indent=2),
+        content=content,
+    )
+    return [
+        {"role": "system", "content": "你是精通材料科学的信息抽取助手，只输出 JSON"},
+        {"role": "user", "content": template},
+    ]
+
+
+PACKED_DOCUMENT_HEADER = "=== 文档 {doc_id} ==="
+
+PACKED_INFO_TEMPLATE = """
+你是科研论文信息抽取助手。下面共有 {count} 篇文档，每篇以“=== 文档 <ID> ===”开头。请分别阅读每篇正文，提取并用简洁中文总结：
+- 材料体系
+- 工艺/制备方法
+- 性能指标
+- 创新点
+
+请输出一个 JSON 对象：键为文档 ID，值为该文档的结果（键为 材料体系、工艺、性能、创新点），对缺失信息填 null。
+
+{documents}
+"""
+
+PACKED_DATA_TEMPLATE = """
+请根据以下字段描述，分别从每篇文档的正文中抽取结构化数据。每个字段需要给出值和来源句子，无法确定请填 null。
+字段：
+{field_lines}
+
+下面共有 {count} 篇文档，每篇以“=== 文档 <ID> ===”开头。请输出一个 JSON 对象，键为文档 ID，值的格式如下：
+{schema}
+
+{documents}
+"""
+
+
+def _packed_documents(documents: Dict[str, str]) -> str:
+    return "\n\n".join(
+        PACKED_DOCUMENT_HEADER.format(doc_id=doc_id) + "\n" + content for doc_id, content in documents.items()
+    )
+
+
+def build_packed_info_prompt(documents: Dict[str, str]) -> List[dict]:
+    """Info prompt for several short documents keyed by ID; the answer is keyed the same way."""
+    template = PACKED_INFO_TEMPLATE.format(count=len(documents), documents=_packed_documents(documents))
+    return [
+        {"role": "system", "content": "你是精通材料科学的中文信息抽取助手，只输出 JSON"},
+        {"role": "user", "content": template},
+    ]
+
+
+def build_packed_data_prompt(documents: Dict[str, str], fields: Dict[str, str]) -> List[dict]:
+    """Field-data prompt for several short documents keyed by ID."""
+    field_lines = [f"- {name}: {desc}" for name, desc in fields.items()]
+    schema = {name: {"value": None, "evidence": None} for name in fields}
+    template = PACKED_DATA_TEMPLATE.format(
+        field_lines="\n".join(field_lines),
+        count=len(documents),
+        schema=json.dumps(schema, ensure_ascii=False, indent=2),
+        documents=_packed_documents(documents),
+    )
+    return [
+        {"role": "system", "content": "你是善于提取数据的助手，输出 JSON"},
+        {"role": "user", "content": template},
+    ]
+
+
 def build_cleaning_prompt(raw_xml: str) -> List[dict]:
     """Ask the LLM to strip metadata/noise from XML content and return clean text."""
     user_prompt = """
@@ -0,0 +1,70 @@
+"""Rate limiting and retry helpers shared by the sync and async LLM paths."""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from paperreader.utils.retry import parse_retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` tokens per minute.
+
+    Callers reserve tokens up front; the balance may go negative, in which
+    case the reservation returns how long the caller must wait. This keeps
+    the bookkeeping lock-free of sleeps, so the same bucket can throttle
+    threads (:meth:`acquire`) and coroutines (:meth:`acquire_async`).
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, amount: float = 1) -> None:
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: float = 1) -> None:
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def credit(self, amount: float) -> None:
+        """Return over-reserved tokens (or charge more, if ``amount`` is negative)."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read ``Retry-After``/``retry-after-ms`` from an API error's response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000.0
+        except ValueError:
+            pass
+    return parse_retry_after(headers.get("retry-after"))
@@ -0,0 +1,203 @@
+"""Local BM25 pre-filter choosing which parts of a paper go into the data prompt.
+
+The requested fields (material, process, performance) are mostly stated in
+the experimental and results sections, yet the whole cleaned text used to be
+sent. :func:`select_relevant` scores every section from ``strip_metadata``,
+plus every table and figure caption, with BM25 against a query built from
+the field names, their descriptions and English keyword hints. The best
+blocks are kept up to a token budget, and the kept blocks stay in document
+order. Numbers count as a query term, so measurement-heavy passages rank
+higher.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+from paperreader.llm.chunking import chunk_text, split_sections
+from paperreader.llm.tokens import estimate_tokens
+
+# English hints for the default Chinese field names; papers are mostly in English.
+FIELD_KEYWORDS: Dict[str, Sequence[str]] = {
+    "材料": (
+        "material", "composition", "compound", "film", "layer", "crystal", "precursor", "substrate",
+        "doped", "alloy", "perovskite", "oxide", "electrode", "electrolyte", "catalyst", "polymer",
+    ),
+    "工艺": (
+        "prepared", "preparation", "synthesis", "synthesized", "fabricated", "fabrication", "deposited",
+        "deposition", "annealed", "annealing", "spin", "coating", "sintered", "calcined", "treated",
+        "temperature", "procedure", "method", "solution", "dried", "mixed", "heated",
+    ),
+    "性能": (
+        "performance", "efficiency", "pce", "conductivity", "capacity", "stability", "measured",
+        "retention", "voltage", "current", "density", "yield", "selectivity", "strength", "achieved",
+        "exhibited", "maximum", "improved",
+    ),
+}
+
+_NUMBER_TOKEN = "<num>"
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z][a-z\-]+|[\u3400-\u9fff]+")
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ed", "es", "s")
+# Headings that rarely hold field values, and ones that usually do.
+_BACKGROUND = re.compile(r"introduction|background|related work|literature|acknowledg|author", re.IGNORECASE)
+_EXPERIMENTAL = re.compile(
+    r"experiment|method|material|preparation|synthes|fabricat|characteri[sz]|result|performance",
+    re.IGNORECASE,
+)
+
+K1 = 1.2
+B = 0.75
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Stemmed lower-case words, ``<num>`` for numbers and character bigrams for Chinese runs."""
+    tokens: List[str] = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token[0].isdigit():
+            tokens.append(_NUMBER_TOKEN)
+        elif token[0].isascii():
+            tokens.append(_stem(token))
+        else:
+            tokens.extend(token[i : i + 2] for i in range(max(1, len(token) - 1)))
+    return tokens
+
+
+def field_query(fields: Mapping[str, str]) -> List[str]:
+    """Query terms for ``fields``: names, descriptions, keyword hints and the number token."""
+    terms = [_NUMBER_TOKEN]
+    for name, description in fields.items():
+        terms.extend(tokenize(f"{name} {description}"))
+        terms.extend(tokenize(" ".join(FIELD_KEYWORDS.get(name, ()))))
+    return sorted(set(terms))
+
+
+def bm25_scores(documents: Sequence[List[str]], query: Iterable[str]) -> List[float]:
+    """Okapi BM25 of every tokenized document against ``query``, with IDF over ``documents``."""
+    if not documents:
+        return []
+    counts = [Counter(document) for document in documents]
+    average = sum(len(document) for document in documents) / len(documents) or 1.0
+    scores = [0.0] * len(documents)
+    for term in set(query):
+        frequency = sum(1 for count in counts if term in count)
+        if not frequency:
+            continue
+        idf = math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+        for index, count in enumerate(counts):
+            tf = count.get(term, 0)
+            if tf:
+                norm = K1 * (1 - B + B * len(documents[index]) / average)
+                scores[index] += idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+
+def _heading_weight(block: str) -> float:
+    if not block.startswith("# "):
+        return 1.0
+    heading = block[2:].partition("\n")[0]
+    if _BACKGROUND.search(heading):
+        return 0.5
+    if _EXPERIMENTAL.search(heading):
+        return 1.5
+    return 1.0
+
+
+def _captions(items: Any) -> List[str]:
+    captions = []
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict):
+            text = " ".join(str(item.get(key) or "") for key in ("label", "caption")).strip()
+        else:
+            text = str(item).strip()
+        if text:
+            captions.append(text)
+    return captions
+
+
+@dataclass
+class Selection:
+    """Pruned text for the data prompt and how much of the document it kept."""
+
+    text: str
+    blocks_total: int
+    blocks_kept: int
+    tokens_total: int
+    tokens_kept: int
+
+    @property
+    def ratio(self) -> float:
+        return self.tokens_kept / self.tokens_total if self.tokens_total else 1.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "blocks_total": self.blocks_total,
+            "blocks_kept": self.blocks_kept,
+            "tokens_total": self.tokens_total,
+            "tokens_kept": self.tokens_kept,
+            "ratio": round(self.ratio, 4),
+        }
+
+
+def select_relevant(cleaned_doc: Dict[str, Any], fields: Mapping[str, str], max_tokens: int) -> Selection:
+    """Keep the highest-scoring sections and captions of ``cleaned_doc`` within ``max_tokens``.
+
+    A document that already fits is sent unchanged: the text is the original
+    cleaned text, not rebuilt from its blocks. Blocks that match no query
+    term are never kept, and if even the best block alone is over budget, it
+    is cut at a paragraph boundary.
+    """
+    sections = split_sections(cleaned_doc.get("text", ""))
+    captions = _captions(cleaned_doc.get("tables")) + _captions(cleaned_doc.get("figures"))
+    blocks = sections + captions
+    sizes = [estimate_tokens(block) for block in blocks]
+    total = sum(sizes)
+
+    if total <= max_tokens:
+        return Selection(
+            text=cleaned_doc.get("text", ""),
+            blocks_total=len(blocks),
+            blocks_kept=len(blocks),
+            tokens_total=total,
+            tokens_kept=total,
+        )
+
+    scores = bm25_scores([tokenize(block) for block in blocks], field_query(fields))
+    ranked = sorted(
+        (index for index, score in enumerate(scores) if score > 0),
+        key=lambda index: (-scores[index] * _heading_weight(blocks[index]), index),
+    )
+    keep, used = [], 0
+    for index in ranked:
+        if used + sizes[index] <= max_tokens:
+            keep.append(index)
+            used += sizes[index]
+    if not keep and ranked:
+        best = ranked[0]
+        blocks[best] = chunk_text(blocks[best], max_tokens)[0]
+        sizes[best] = estimate_tokens(blocks[best])
+        keep = [best]
+    keep.sort()
+
+    kept_sections = [blocks[index] for index in keep if index < len(sections)]
+    kept_captions = [blocks[index] for index in keep if index >= len(sections)]
+    parts = list(kept_sections)
+    if kept_captions:
+        parts.append("# Tables and figures\n" + "\n".join(kept_captions))
+    return Selection(
+        text="\n\n".join(parts),
+        blocks_total=len(blocks),
+        blocks_kept=len(keep),
+        tokens_total=total,
+        tokens_kept=sum(sizes[index] for index in keep),
+    )
@@ -0,0 +1,175 @@
+"""Persistent on-disk cache for LLM chat responses."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from paperreader.utils.hashing import sha256_from_iterable
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at);
+"""
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """SQLite-backed response store keyed on the request.
+
+    The key covers model, messages, temperature, the endpoint's base URL and
+    the ``response_format`` sent, so JSON-mode and plain answers, or answers
+    from different providers serving the same model name, never mix.
+
+    Entries older than ``max_age_seconds`` are treated as misses and pruned;
+    once the table holds more than ``max_entries`` rows the least recently
+    used ones are evicted. A single connection guarded by a lock is shared by
+    all threads, and WAL mode lets several processes use the same file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 50_000,
+        max_age_seconds: Optional[float] = 30 * 24 * 3600,
+        prune_every: int = 200,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.prune_every = prune_every
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.prune()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[dict],
+        temperature: float,
+        base_url: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        payload = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        parts = [model, "\x00", repr(float(temperature)), "\x00", payload]
+        # Appended only when set, so keys of plain requests to the default endpoint are unchanged.
+        if base_url:
+            parts += ["\x00base_url=", base_url.rstrip("/")]
+        if response_format:
+            parts += ["\x00response_format=", json.dumps(response_format, sort_keys=True)]
+        return sha256_from_iterable(parts)
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.max_age_seconds is not None and now - created_at > self.max_age_seconds
+
+    def get(
+        self,
+        model: str,
+        messages: List[dict],
+        temperature: float,
+        base_url: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        key = self.make_key(model, messages, temperature, base_url, response_format)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.hits += 1
+            return row[0]
+
+    def put(
+        self,
+        model: str,
+        messages: List[dict],
+        temperature: float,
+        content: str,
+        base_url: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        key = self.make_key(model, messages, temperature, base_url, response_format)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now),
+            )
+            self._conn.commit()
+            self._writes_since_prune += 1
+            should_prune = self._writes_since_prune >= self.prune_every
+        if should_prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired entries and trim to ``max_entries``; return rows removed."""
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds is not None:
+                cutoff = time.time() - self.max_age_seconds
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+                ).rowcount
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                ).rowcount
+            self._conn.commit()
+            self._writes_since_prune = 0
+            self.stats.evicted += removed
+        if removed:
+            logger.info("Evicted %d cached LLM responses from %s", removed, self.path)
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
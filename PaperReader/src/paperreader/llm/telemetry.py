@@ -0,0 +1,225 @@
+"""Per-call LLM telemetry: tokens, latency, retries, cache hits and parse outcome.
+
+The client creates one :class:`LLMCallRecord` per ``chat`` call and tags it
+with the stage and DOI from :func:`llm_context`. The record is held as
+"pending" until the caller reports whether the response parsed
+(:func:`report_parse`), the next call starts, or the context exits, and is
+then appended to the :class:`MetricsRecorder`'s JSONL file. Calls that
+failed (non-retryable error or retries exhausted) carry ``error`` and are
+written straight away.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from paperreader.utils.stats import percentile
+
+
+# USD per million (prompt, completion) tokens; used only for estimates.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-coder": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+}
+
+# Share of the list price charged for requests sent through the batch API.
+BATCH_DISCOUNT = 0.5
+
+
+@dataclass
+class LLMCallRecord:
+    stage: Optional[str]
+    doi: Optional[str]
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_s: float
+    retries: int = 0
+    cache_hit: bool = False
+    batch: bool = False
+    parse_ok: Optional[bool] = None
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def estimate_cost(model: str, prompt_tokens: float, completion_tokens: float) -> Optional[float]:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+@dataclass
+class MetricsSummary:
+    calls: int
+    cache_hits: int
+    errors: int
+    parse_failures: int
+    retries: int
+    documents: int
+    p50_latency_s: Optional[float]
+    p95_latency_s: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    cost_by_model: Dict[str, Optional[float]]
+
+    @property
+    def tokens_per_document(self) -> float:
+        if not self.documents:
+            return 0.0
+        return (self.prompt_tokens + self.completion_tokens) / self.documents
+
+    def format(self) -> str:
+        def seconds(value: Optional[float]) -> str:
+            return "n/a" if value is None else f"{value:.2f}s"
+
+        lines = [
+            "LLM usage summary",
+            f"  calls: {self.calls} (cache hits {self.cache_hits}, retries {self.retries}, "
+            f"errors {self.errors}, parse failures {self.parse_failures})",
+            f"  latency: p50 {seconds(self.p50_latency_s)}, p95 {seconds(self.p95_latency_s)}",
+            f"  tokens: prompt {self.prompt_tokens}, completion {self.completion_tokens}, "
+            f"{self.tokens_per_document:.0f} per document over {self.documents} documents",
+        ]
+        for model, cost in sorted(self.cost_by_model.items()):
+            lines.append(f"  estimated cost [{model}]: " + ("unknown price" if cost is None else f"${cost:.4f}"))
+        return "\n".join(lines)
+
+
+def summarize(records: List[LLMCallRecord]) -> MetricsSummary:
+    remote = [record for record in records if not record.cache_hit]
+    cost_by_model: Dict[str, Optional[float]] = {}
+    # Batch tokens are weighted by their discount, so the estimate reflects what is billed.
+    tokens_by_model: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for record in remote:
+        weight = BATCH_DISCOUNT if record.batch else 1.0
+        tokens_by_model[record.model][0] += record.prompt_tokens * weight
+        tokens_by_model[record.model][1] += record.completion_tokens * weight
+    for model, (prompt, completion) in tokens_by_model.items():
+        cost_by_model[model] = estimate_cost(model, prompt, completion)
+
+    latencies = [record.latency_s for record in remote]
+    return MetricsSummary(
+        calls=len(records),
+        cache_hits=len(records) - len(remote),
+        errors=sum(1 for record in records if record.error),
+        parse_failures=sum(1 for record in records if record.parse_ok is False),
+        retries=sum(record.retries for record in records),
+        documents=len({record.doi for record in records if record.doi}),
+        p50_latency_s=percentile(latencies, 50),
+        p95_latency_s=percentile(latencies, 95),
+        prompt_tokens=sum(record.prompt_tokens for record in remote),
+        completion_tokens=sum(record.completion_tokens for record in remote),
+        cost_by_model=cost_by_model,
+    )
+
+
+class MetricsRecorder:
+    """Thread-safe sink that appends call records to a JSONL file and keeps them for the summary."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.records: List[LLMCallRecord] = []
+        self._lock = threading.Lock()
+        self._fh = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = path.open("a", encoding="utf-8")
+
+    def add(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self._fh is not None:
+                self._fh.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+                self._fh.flush()
+
+    def summary(self) -> MetricsSummary:
+        with self._lock:
+            return summarize(list(self.records))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+_stage: ContextVar[Optional[str]] = ContextVar("llm_stage", default=None)
+_doi: ContextVar[Optional[str]] = ContextVar("llm_doi", default=None)
+_pending: ContextVar[Optional[Tuple[MetricsRecorder, LLMCallRecord]]] = ContextVar("llm_pending", default=None)
+
+
+def _flush_pending() -> None:
+    pending = _pending.get()
+    if pending is not None:
+        _pending.set(None)
+        recorder, record = pending
+        recorder.add(record)
+
+
+@contextmanager
+def llm_context(stage: Optional[str] = None, doi: Optional[str] = None) -> Iterator[None]:
+    """Tag LLM calls made inside the block; unset arguments inherit the outer value."""
+    stage_token = _stage.set(stage) if stage is not None else None
+    doi_token = _doi.set(doi) if doi is not None else None
+    pending_token = _pending.set(None)
+    try:
+        yield
+    finally:
+        _flush_pending()
+        _pending.reset(pending_token)
+        if doi_token is not None:
+            _doi.reset(doi_token)
+        if stage_token is not None:
+            _stage.reset(stage_token)
+
+
+def record_call(
+    recorder: MetricsRecorder,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    latency_s: float,
+    retries: int = 0,
+    cache_hit: bool = False,
+    batch: bool = False,
+    error: Optional[str] = None,
+) -> None:
+    """Record a finished call; it is written once its parse outcome is known, or at once if it failed."""
+    _flush_pending()
+    record = LLMCallRecord(
+        stage=_stage.get(),
+        doi=_doi.get(),
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_s=latency_s,
+        retries=retries,
+        cache_hit=cache_hit,
+        batch=batch,
+        error=error,
+    )
+    if error is not None:
+        recorder.add(record)
+        return
+    _pending.set((recorder, record))
+
+
+def report_parse(success: bool) -> None:
+    """Attach the parse outcome to the most recent call in this context and write it."""
+    pending = _pending.get()
+    if pending is not None:
+        pending[1].parse_ok = success
+        _flush_pending()
@@ -0,0 +1,31 @@
+"""Cheap token-count estimates for budgeting prompts without a tokenizer."""
+from __future__ import annotations
+
+from typing import List
+
+# Per-message framing overhead added by chat formats (role markers etc.).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return 0x3000 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate tokens as one per CJK character plus one per four other characters.
+
+    This errs slightly high for typical mixed Chinese/English papers, which is
+    the safe direction for rate limiting and context budgeting.
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for char in text if _is_cjk(char))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def estimate_message_tokens(messages: List[dict]) -> int:
+    return sum(
+        estimate_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS for message in messages
+    )
@@ -0,0 +1,153 @@
+"""Content-addressed stage cache so reruns skip unchanged work.
+
+Each DOI gets a small manifest under ``output_cache`` recording, per stage,
+the hash of the inputs that produced its artifact. A stage is reused when
+its key still matches and the artifact is on disk; otherwise it and every
+stage after it are recomputed. Manifests are saved after every stage, so an
+interrupted run loses at most the stage that was in progress.
+
+Runs in the same process (e.g. concurrent web jobs) may process the same
+DOI; :meth:`StageCache.locked` serialises them per manifest, so the second
+one waits and then reuses what the first recorded.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from paperreader.io.json_store import load_json, save_json
+from paperreader.utils.hashing import sha256_file, sha256_from_iterable
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+STAGES = ("download", "parse", "clean", "info", "data")
+
+# Manifest path -> (lock, number of holders and waiters); shared by every StageCache in the process.
+_MANIFEST_LOCKS: Dict[str, Tuple[threading.Lock, int]] = {}
+_MANIFEST_LOCKS_GUARD = threading.Lock()
+
+
+def stage_key(stage: str, *parts: str) -> str:
+    """Hash a stage name and its input digests into a cache key."""
+    # A separator keeps ("ab", "c") and ("a", "bc") from colliding.
+    return sha256_from_iterable(f"{part}\x00" for part in (stage, *parts))
+
+
+def digest_json(data: Any) -> str:
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return sha256_from_iterable([payload])
+
+
+def digest_source(path: Path) -> str:
+    if not path.exists():
+        return "missing"
+    return sha256_file(path)
+
+
+class StageCache:
+    """Per-DOI manifests of stage keys, with an optional ``from_stage`` override.
+
+    ``run_id`` stamps every stage this run computes, so a resumed run does not
+    force those stages again. ``on_stage(doi, stage, status)`` is called with
+    ``"done"`` when a stage is recorded and ``"cached"`` when it is reused.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        from_stage: Optional[str] = None,
+        run_id: Optional[str] = None,
+        on_stage: Optional[Callable[[str, str, str], None]] = None,
+    ):
+        if from_stage is not None and from_stage not in STAGES:
+            raise ValueError(f"Unknown stage {from_stage!r}; expected one of {', '.join(STAGES)}")
+        self.cache_dir = cache_dir
+        self.from_stage = from_stage
+        self.run_id = run_id
+        self.on_stage = on_stage
+
+    def _manifest_path(self, doi: str) -> Path:
+        safe = doi.replace("/", "_")
+        return self.cache_dir / f"{safe}.json"
+
+    @contextmanager
+    def locked(self, doi: str) -> Iterator[None]:
+        """Hold the process-wide lock for ``doi``'s manifest from ``load`` through the last ``record``."""
+        key = str(self._manifest_path(doi).resolve())
+        with _MANIFEST_LOCKS_GUARD:
+            lock, users = _MANIFEST_LOCKS.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            _MANIFEST_LOCKS[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with _MANIFEST_LOCKS_GUARD:
+                lock, users = _MANIFEST_LOCKS[key]
+                # Dropped once unused, so a long-lived server does not keep one lock per DOI ever seen.
+                if users == 1:
+                    del _MANIFEST_LOCKS[key]
+                else:
+                    _MANIFEST_LOCKS[key] = (lock, users - 1)
+
+    def load(self, doi: str) -> Dict[str, Any]:
+        path = self._manifest_path(doi)
+        if not path.exists():
+            return {"doi": doi, "keys": {}}
+        try:
+            manifest = load_json(path)
+        except ValueError:
+            logger.warning("Ignoring unreadable stage manifest %s", path)
+            return {"doi": doi, "keys": {}}
+        manifest.setdefault("keys", {})
+        return manifest
+
+    def save(self, doi: str, manifest: Dict[str, Any]) -> None:
+        save_json(manifest, self._manifest_path(doi))
+
+    def is_forced(self, stage: str, manifest: Optional[Dict[str, Any]] = None) -> bool:
+        """Return True when ``stage`` is at or after the requested ``from_stage``.
+
+        A stage already recomputed by this same run (before an interruption)
+        is not forced again.
+        """
+        if self.from_stage is None or STAGES.index(stage) < STAGES.index(self.from_stage):
+            return False
+        if manifest is not None and self.run_id is not None:
+            return manifest.get("runs", {}).get(stage) != self.run_id
+        return True
+
+    def _notify(self, manifest: Dict[str, Any], stage: str, status: str) -> None:
+        if self.on_stage is not None:
+            self.on_stage(manifest["doi"], stage, status)
+
+    def hit(self, manifest: Dict[str, Any], stage: str, key: str, *artifacts: Path) -> bool:
+        if self.is_forced(stage, manifest):
+            return False
+        if manifest["keys"].get(stage) != key:
+            return False
+        if not all(path.exists() for path in artifacts):
+            return False
+        self._notify(manifest, stage, "cached")
+        return True
+
+    def reused(self, manifest: Dict[str, Any], stage: str) -> None:
+        """Report a stage reused without a key check (e.g. XML already on disk)."""
+        self._notify(manifest, stage, "cached")
+
+    def record(self, manifest: Dict[str, Any], stage: str, key: str) -> None:
+        """Store ``key`` for a freshly computed stage and persist the manifest."""
+        manifest["keys"][stage] = key
+        if self.run_id is not None:
+            manifest.setdefault("runs", {})[stage] = self.run_id
+        self.save(manifest["doi"], manifest)
+        self._notify(manifest, stage, "done")
+
+    @staticmethod
+    def cached_rows(manifest: Dict[str, Any]) -> List[dict]:
+        return list(manifest.get("records", []))
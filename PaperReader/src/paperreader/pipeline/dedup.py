@@ -0,0 +1,166 @@
+"""Near-duplicate detection over cleaned text with MinHash and LSH.
+
+The same paper often reaches a batch twice under different DOIs (a preprint
+and its published version, a corrigendum that reprints the article). Every
+extracted DOI's cleaned body text is reduced to a MinHash signature of its
+5-shingles and stored in SQLite next to the artifact catalog, bucketed by
+LSH bands. Shingles run over words, except that CJK scripts, written without
+spaces, contribute one token per character, i.e. character 5-grams. Before paying for extraction, ``run_pipeline`` looks up DOIs
+sharing a band bucket and reuses the extraction of the most similar one
+whose estimated Jaccard similarity reaches ``NEAR_DUPLICATE_THRESHOLD``.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.5 Jaccard almost always share a bucket,
+# and every candidate is then checked against the full signature.
+BANDS = 32
+SHINGLE_WORDS = 5
+# Shorter texts (in tokens) are mostly placeholders or abstracts only; matching them would be guesswork.
+MIN_WORDS = 50
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_LOW_16 = np.uint64(0xFFFF)
+_SHIFT_16 = np.uint64(16)
+# A fixed seed keeps signatures comparable across runs and processes.
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_BATCH = 4096
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+# One CJK character, or a run of other word characters.
+_TOKEN = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    doi TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doi TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands ON minhash_bands (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands_doi ON minhash_bands (doi);
+"""
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _TOKEN.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return np.empty(0, dtype=np.uint64)
+    shingles = {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+
+
+def _permute(hashes: np.ndarray) -> np.ndarray:
+    """``(a * x + b) mod p`` for each 32-bit hash ``x`` (column) and permutation ``(a, b)``.
+
+    ``x`` is split into 16-bit halves so every product stays below 2**48 and
+    every intermediate below 2**64; nothing relies on uint64 wraparound.
+    """
+    high = (hashes >> _SHIFT_16) * _A
+    low = (hashes & _LOW_16) * _A
+    return (((high << _SHIFT_16) % _MERSENNE) + low + _B) % _MERSENNE
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (``NUM_PERM`` uint32 values) of ``text``; ``None`` if it is too short."""
+    hashes = _shingle_hashes(text)
+    if not hashes.size:
+        return None
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # Permute in batches so a long text never builds one huge shingle × permutation matrix.
+    for start in range(0, hashes.size, _BATCH):
+        batch = hashes[start : start + _BATCH, np.newaxis]
+        permuted = _permute(batch) & _MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(first == second))
+
+
+def _buckets(signature: np.ndarray) -> List[Tuple[int, int]]:
+    rows = NUM_PERM // BANDS
+    buckets = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * rows : (band + 1) * rows].tobytes(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+
+class NearDuplicateIndex:
+    """SQLite LSH index of MinHash signatures, shared by all DOI worker threads.
+
+    ``config`` identifies the extraction settings (prompt version, model,
+    fields, ...); only extractions made under the same config are reused.
+    """
+
+    def __init__(self, path: Path, threshold: float = 0.9):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def add(self, doi: str, signature: np.ndarray, config: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM minhash_bands WHERE doi = ?", (doi,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO minhash_signatures (doi, config, signature, updated_at) VALUES (?, ?, ?, ?)",
+                (doi, config, signature.astype(np.uint32).tobytes(), time.time()),
+            )
+            self._conn.executemany(
+                "INSERT INTO minhash_bands (band, bucket, doi) VALUES (?, ?, ?)",
+                [(band, bucket, doi) for band, bucket in _buckets(signature)],
+            )
+
+    def find(self, doi: str, signature: np.ndarray, config: str) -> Optional[Tuple[str, float]]:
+        """Most similar other DOI at or above the threshold, with its similarity."""
+        buckets = _buckets(signature)
+        clause = " OR ".join(["(b.band = ? AND b.bucket = ?)"] * len(buckets))
+        params = [value for bucket in buckets for value in bucket]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT s.doi, s.signature FROM minhash_bands b "
+                "JOIN minhash_signatures s ON s.doi = b.doi "
+                f"WHERE ({clause}) AND s.doi != ? AND s.config = ?",
+                (*params, doi, config),
+            ).fetchall()
+        best: Optional[Tuple[str, float]] = None
+        for other, blob in rows:
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (other, score)
+        return best
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,185 @@
+"""Crash-safe SQLite ledger of pipeline runs.
+
+Every run records its DOI list up front, then each DOI's status, attempt
+count, last error and the stages it computed or reused. A run that dies
+mid-batch can be continued with ``paperreader run --resume <run-id>``:
+finished DOIs are not touched again and the rest pick up from the last
+stage that completed. The settings that shape a run's output are stored
+with it, so the resumed run extracts the rest the same way.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    from_stage TEXT,
+    output_format TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS run_dois (
+    run_id TEXT NOT NULL,
+    doi TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, doi)
+);
+CREATE TABLE IF NOT EXISTS run_stages (
+    run_id TEXT NOT NULL,
+    doi TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, doi, stage)
+);
+"""
+
+# DOI statuses: pending → running → done | failed. A crash leaves "running",
+# and resuming reprocesses every DOI that is not "done".
+
+
+@dataclass
+class RunInfo:
+    run_id: str
+    status: str
+    from_stage: Optional[str]
+    output_format: str
+    started_at: float
+    updated_at: float
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    # Output-affecting settings the run started with (empty for runs recorded before they were stored).
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+
+class RunLedger:
+    """SQLite-backed record of runs, shared by all DOI worker threads."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "settings" not in columns:
+            # Ledgers created before run settings were recorded.
+            self._conn.execute("ALTER TABLE runs ADD COLUMN settings TEXT")
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def start_run(
+        self,
+        run_id: str,
+        dois: Iterable[str],
+        from_stage: Optional[str],
+        output_format: str,
+        settings: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, status, from_stage, output_format, started_at, updated_at, settings) "
+                "VALUES (?, 'running', ?, ?, ?, ?, ?)",
+                (run_id, from_stage, output_format, now, now, json.dumps(settings or {}, sort_keys=True)),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO run_dois (run_id, doi, position, status, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?)",
+                [(run_id, doi, position, now) for position, doi in enumerate(dois)],
+            )
+            self._conn.commit()
+
+    def get_run(self, run_id: str) -> Optional[RunInfo]:
+        runs = self._runs("WHERE r.run_id = ?", "", (run_id,))
+        return runs[0] if runs else None
+
+    def list_runs(self, limit: int = 20) -> List[RunInfo]:
+        return self._runs("", "ORDER BY r.started_at DESC LIMIT ?", (limit,))
+
+    def _runs(self, where: str, tail: str, params: tuple) -> List[RunInfo]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.run_id, r.status, r.from_stage, r.output_format, r.started_at, r.updated_at, "
+                "COUNT(d.doi), SUM(d.status = 'done'), SUM(d.status = 'failed'), r.settings "
+                "FROM runs r LEFT JOIN run_dois d ON d.run_id = r.run_id "
+                f"{where} GROUP BY r.run_id {tail}",
+                params,
+            ).fetchall()
+        return [
+            RunInfo(*row[:6], total=row[6], done=row[7] or 0, failed=row[8] or 0, settings=json.loads(row[9] or "{}"))
+            for row in rows
+        ]
+
+    def dois(self, run_id: str, status: Optional[str] = None) -> List[str]:
+        sql = "SELECT doi FROM run_dois WHERE run_id = ?"
+        params: tuple = (run_id,)
+        if status is not None:
+            sql += " AND status = ?"
+            params += (status,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY position", params).fetchall()
+        return [row[0] for row in rows]
+
+    def begin_doi(self, run_id: str, doi: str) -> None:
+        self._execute(
+            "UPDATE run_dois SET status = 'running', attempts = attempts + 1, updated_at = ? "
+            "WHERE run_id = ? AND doi = ?",
+            (time.time(), run_id, doi),
+        )
+
+    def stage_event(self, run_id: str, doi: str, stage: str, status: str) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO run_stages (run_id, doi, stage, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (run_id, doi, stage, status, time.time()),
+        )
+
+    def finish_doi(self, run_id: str, doi: str) -> None:
+        self._execute(
+            "UPDATE run_dois SET status = 'done', error = NULL, updated_at = ? WHERE run_id = ? AND doi = ?",
+            (time.time(), run_id, doi),
+        )
+
+    def fail_doi(self, run_id: str, doi: str, error: str) -> None:
+        self._execute(
+            "UPDATE run_dois SET status = 'failed', error = ?, updated_at = ? WHERE run_id = ? AND doi = ?",
+            (error, time.time(), run_id, doi),
+        )
+
+    def release_doi(self, run_id: str, doi: str) -> None:
+        """Put a DOI interrupted by cancellation back to pending."""
+        self._execute(
+            "UPDATE run_dois SET status = 'pending', updated_at = ? WHERE run_id = ? AND doi = ? AND status != 'done'",
+            (time.time(), run_id, doi),
+        )
+
+    def finish_run(self, run_id: str, status: str) -> None:
+        self._execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
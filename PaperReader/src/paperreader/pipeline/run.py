@@ -1,68 +1,256 @@
 """Main orchestrator for the end-to-end pipeline."""
 from __future__ import annotations
 
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, closing
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from paperreader.cleaning.strip_metadata import strip_metadata
 from paperreader.cleaning.llm_clean import clean_with_llm
 from paperreader.config import Settings
-from paperreader.ingestion.elsevier_api import ElsevierClient
+from paperreader.ingestion.elsevier_api import ElsevierClient, is_valid_xml
+from paperreader.ingestion.elsevier_xml import XML_PARSER_VERSION, parse_elsevier_xml
+from paperreader.ingestion.local_pdf import PDF_PARSER_VERSION, PDF_PARSERS, parse_pdf
 from paperreader.ingestion.uploader import resolve_pdf
-from paperreader.ingestion.uniparser_adapter import parse_document
-from paperreader.io.doi_loader import load_doi_list
-from paperreader.io.json_store import save_json
-from paperreader.io.xlsx_writer import write_records_to_xlsx
+from paperreader.ingestion.uniparser_adapter import PARSER_OPTIONS, parse_document, read_parsed
+from paperreader.ingestion.uniparser_jobs import UniParserJobQueue
+from paperreader.io.catalog import ArtifactCatalog
+from paperreader.io.doi_loader import dedupe_dois, load_doi_list
+from paperreader.io.json_store import load_json, save_json
+from paperreader.io.sinks import check_output_format, open_sink
+from paperreader.llm.batch import BatchAPI, BatchCollector, BatchPending
 from paperreader.llm.client import LLMClient
+from paperreader.llm.chunked_extract import extract_chunked
+from paperreader.llm.combined_extract import extract_combined
 from paperreader.llm.data_extract import DEFAULT_FIELDS, extract_data
 from paperreader.llm.info_extract import extract_info
+from paperreader.llm.packing import RequestPacker
+from paperreader.llm.prompts import PROMPT_TEMPLATE_VERSION
+from paperreader.llm.relevance import select_relevant
+from paperreader.llm.response_cache import ResponseCache
+from paperreader.llm.telemetry import MetricsRecorder, MetricsSummary, llm_context
+from paperreader.llm.tokens import estimate_tokens
+from paperreader.pipeline.cache import StageCache, digest_json, digest_source, stage_key
+from paperreader.pipeline.dedup import NearDuplicateIndex, minhash
+from paperreader.pipeline.ledger import RunLedger
+from paperreader.pipeline.tracing import Tracer
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
 
+EXTRACTION_MODES = ("separate", "combined")
+
+# Callback receiving progress events such as ("stage", {"doi": ..., "stage": ..., "status": ...}).
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class RunCancelled(Exception):
+    """Raised at a stage boundary once the run's cancel event is set."""
+
+
+@dataclass
+class StageLimits:
+    """Concurrency caps shared by all DOI workers, one semaphore per remote service."""
+
+    elsevier: threading.BoundedSemaphore
+    uniparser: threading.BoundedSemaphore
+    llm: threading.BoundedSemaphore
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "StageLimits":
+        return cls(
+            elsevier=threading.BoundedSemaphore(max(1, settings.elsevier_concurrency)),
+            uniparser=threading.BoundedSemaphore(max(1, settings.uniparser_concurrency)),
+            llm=threading.BoundedSemaphore(max(1, settings.llm_concurrency)),
+        )
+
 
 def _build_output_path(base: Path, doi: str, suffix: str) -> Path:
     safe = doi.replace("/", "_")
     return base / f"{safe}{suffix}"
 
 
-def run_pipeline(settings: Settings) -> None:
-    dois = load_doi_list(settings.input_doi)
-    if not dois:
-        logger.warning("No DOIs to process; exiting")
-        return
-
-    llm_client = LLMClient(
-        api_key=settings.openai_api_key,
-        base_url=settings.openai_base_url,
-        model=settings.openai_model,
-    )
-    elsevier = ElsevierClient(api_key=settings.elsevier_api_key)
+def artifact_paths(settings: Settings, doi: str) -> Dict[str, Path]:
+    """Parsed, cleaned and info JSON paths written for ``doi``."""
+    return {
+        "parsed": _build_output_path(settings.output_parsed, doi, ".json"),
+        "cleaned": _build_output_path(settings.output_cleaned, doi, ".json"),
+        "info": _build_output_path(settings.output_info, doi, ".json"),
+    }
+
+
+@dataclass
+class RunContext:
+    """Objects shared by every DOI worker during one pipeline run."""
+
+    settings: Settings
+    llm_client: Union[LLMClient, BatchCollector]
+    elsevier: ElsevierClient
+    limits: StageLimits
+    cache: StageCache
+    parser_queue: Optional[UniParserJobQueue] = None
+    ledger: Optional[RunLedger] = None
+    run_id: Optional[str] = None
+    catalog: Optional[ArtifactCatalog] = None
+    on_event: Optional[EventCallback] = None
+    cancel_event: Optional[threading.Event] = None
+    parse_pool: Optional[Executor] = None
+    near_duplicates: Optional[NearDuplicateIndex] = None
+    packer: Optional[RequestPacker] = None
+    tracer: Tracer = field(default_factory=Tracer)
+
+    def emit(self, event: str, **data: Any) -> None:
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def checkpoint(self, doi: str, stage: str) -> None:
+        """Announce that ``stage`` starts for ``doi``, or stop here if the run was cancelled."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise RunCancelled(f"Run cancelled before {stage} of {doi}")
+        self.emit("stage", doi=doi, stage=stage, status="running")
+
+
+def _rows_for(doi: str, record_dicts: List[dict], duplicate_of: Optional[str] = None) -> List[dict]:
+    rows = []
+    for record in record_dicts:
+        row = dict(record)
+        row.update({"doi": doi, "duplicate_of": duplicate_of})
+        rows.append(row)
+    return rows
+
 
-    structured_rows: List[dict] = []
+def _has_sections(parsed_doc: dict) -> bool:
+    content = parsed_doc.get("content") if isinstance(parsed_doc, dict) else None
+    return bool(isinstance(content, dict) and content.get("sections"))
 
-    for doi in dois:
-        logger.info("Processing DOI %s", doi)
-        xml_path = _build_output_path(settings.output_parsed, doi, ".xml")
-        json_path = _build_output_path(settings.output_parsed, doi, ".json")
-        cleaned_path = _build_output_path(settings.output_cleaned, doi, ".json")
-        info_path = _build_output_path(settings.output_info, doi, ".json")
 
-        downloaded_xml = elsevier.download_xml(doi, xml_path)
+def _parse_locally(ctx: RunContext, parser: Callable[..., dict], source: Path, doi: str) -> Optional[dict]:
+    """Run a local parser in the run's process pool (or inline); ``None`` if it found no body text."""
+    with ctx.tracer.span("parse_local", doi):
+        if ctx.parse_pool is not None:
+            parsed_doc = ctx.parse_pool.submit(parser, source, doi).result()
+        else:
+            parsed_doc = parser(source, doi)
+    if not _has_sections(parsed_doc):
+        logger.info("Local parse of %s found no body sections", source)
+        return None
+    return parsed_doc
+
+
+def _near_duplicate_extraction(
+    ctx: RunContext, doi: str, signature: Any, config: str
+) -> Optional[Tuple[str, dict, List[dict]]]:
+    """DOI, info and records of an already extracted near duplicate of ``doi``, if there is one."""
+    match = ctx.near_duplicates.find(doi, signature, config)
+    if match is None:
+        return None
+    other, score = match
+    other_manifest = ctx.cache.load(other)
+    other_info = artifact_paths(ctx.settings, other)["info"]
+    if "records" not in other_manifest or not other_info.exists():
+        return None
+    logger.info("%s is a near duplicate of %s (similarity %.2f); reusing its extraction", doi, other, score)
+    return other, load_json(other_info), ctx.cache.cached_rows(other_manifest)
+
+
+def _process_doi(doi: str, ctx: RunContext) -> List[dict]:
+    """Run download → parse → clean → extract for one DOI and return its rows."""
+    ctx.checkpoint(doi, "download")
+    if ctx.ledger is not None:
+        ctx.ledger.begin_doi(ctx.run_id, doi)
+    ctx.tracer.registry.add_gauge("paperreader_dois_in_flight", 1)
+    try:
+        # Another run in this process may be working on the same DOI's manifest and artifacts.
+        with ctx.cache.locked(doi), llm_context(doi=doi), ctx.tracer.span("process_doi", doi):
+            return _process_doi_stages(doi, ctx)
+    finally:
+        ctx.tracer.registry.add_gauge("paperreader_dois_in_flight", -1)
+
+
+def _process_doi_stages(doi: str, ctx: RunContext) -> List[dict]:
+    settings, llm_client, limits, cache, tracer = ctx.settings, ctx.llm_client, ctx.limits, ctx.cache, ctx.tracer
+    logger.info("Processing DOI %s", doi)
+    xml_path = _build_output_path(settings.output_parsed, doi, ".xml")
+    json_path = _build_output_path(settings.output_parsed, doi, ".json")
+    cleaned_path = _build_output_path(settings.output_cleaned, doi, ".json")
+    info_path = _build_output_path(settings.output_info, doi, ".json")
+    manifest = cache.load(doi)
+    llm_mode = "stub" if llm_client.stub else "live"
+
+    if not cache.is_forced("download", manifest) and is_valid_xml(xml_path):
+        logger.info("Reusing downloaded XML for %s", doi)
+        downloaded_xml: Optional[Path] = xml_path
+        cache.reused(manifest, "download")
+    else:
+        with limits.elsevier, tracer.span("download", doi):
+            downloaded_xml = ctx.elsevier.download_xml(doi, xml_path)
+        if downloaded_xml:
+            cache.record(manifest, "download", stage_key("download", doi))
+    with tracer.span("resolve_pdf", doi):
         pdf_path = resolve_pdf(doi, settings.input_pdfs)
-        source = pdf_path or (downloaded_xml if downloaded_xml else xml_path)
-
-        parsed_doc = parse_document(
-            source,
-            json_path,
-            doi=doi,
-            host=settings.uniparser_host,
-            token=settings.uniparser_token,
-        )
-        cleaned_doc = strip_metadata(parsed_doc)
+    source = pdf_path or (downloaded_xml if downloaded_xml else xml_path)
+    local_parser: Optional[Callable[..., dict]] = None
+    parse_inputs = [digest_source(source), digest_json(PARSER_OPTIONS)]
+    if pdf_path is not None:
+        if settings.pdf_parser == "local":
+            local_parser = parse_pdf
+        if settings.pdf_parser != "uniparser":
+            parse_inputs.append(f"pdf-{settings.pdf_parser}:{PDF_PARSER_VERSION}")
+    elif settings.local_xml_parser and downloaded_xml is not None:
+        local_parser = parse_elsevier_xml
+        parse_inputs.append(f"elsevier-xml:{XML_PARSER_VERSION}")
+    parse_key = stage_key("parse", *parse_inputs)
+    clean_key = stage_key("clean", parse_key, PROMPT_TEMPLATE_VERSION, settings.openai_model, llm_mode)
+    if cache.hit(manifest, "clean", clean_key, cleaned_path):
+        # Cleaned text is all later stages need, so the parsed JSON is not even loaded.
+        logger.info("Reusing cleaned JSON for %s", doi)
+        cleaned_doc = load_json(cleaned_path)
+    else:
+        ctx.checkpoint(doi, "parse")
+        if cache.hit(manifest, "parse", parse_key, json_path):
+            logger.info("Reusing parsed JSON for %s", doi)
+            parsed_doc = read_parsed(json_path)
+        else:
+            # Downloaded Elsevier XML (and PDFs with PDF_PARSER=local) are parsed locally;
+            # Uni-parser handles the rest and anything the local parser found no body in.
+            parsed_doc = _parse_locally(ctx, local_parser, source, doi) if local_parser else None
+            if parsed_doc is not None:
+                save_json(parsed_doc, json_path)
+            elif ctx.parser_queue is not None:
+                # The job queue enforces its own in-flight limit.
+                with tracer.span("parse_document", doi):
+                    parsed_doc = ctx.parser_queue.parse(source, json_path, doi=doi)
+            else:
+                with limits.uniparser, tracer.span("parse_document", doi):
+                    parsed_doc = parse_document(
+                        source,
+                        json_path,
+                        doi=doi,
+                        host=settings.uniparser_host,
+                        token=settings.uniparser_token,
+                    )
+            if pdf_path is not None and settings.pdf_parser == "auto" and not _has_sections(parsed_doc):
+                logger.warning("Uni-parser returned no body for %s; parsing the PDF locally", doi)
+                local_doc = _parse_locally(ctx, parse_pdf, source, doi)
+                if local_doc is not None:
+                    parsed_doc = local_doc
+                    save_json(parsed_doc, json_path)
 
-        if not cleaned_doc.get("text"):
+        with tracer.span("strip_metadata", doi):
+            cleaned_doc = strip_metadata(parsed_doc)
+        # Only a parse that produced body text is worth reusing; a placeholder
+        # from a failed Uni-parser call should be retried next run.
+        if cleaned_doc.get("text"):
+            cache.record(manifest, "parse", parse_key)
+        else:
             try:
                 raw_xml = xml_path.read_text(encoding="utf-8", errors="ignore")
             except FileNotFoundError:
@@ -70,20 +258,513 @@ def run_pipeline(settings: Settings) -> None:
 
             if raw_xml:
                 logger.info("Rule-based清洗为空，使用大模型辅助从 XML 提取正文")
-                cleaned_doc = clean_with_llm(llm_client, raw_xml)
-        save_json(parsed_doc, json_path)
+                with limits.llm, tracer.span("clean_with_llm", doi):
+                    cleaned_doc = clean_with_llm(llm_client, raw_xml)
         save_json(cleaned_doc, cleaned_path)
+        if cleaned_doc.get("text"):
+            cache.record(manifest, "clean", clean_key)
+
+    cleaned_digest = digest_json(cleaned_doc)
+    mode = settings.extraction_mode
+    chunked = 0 < settings.max_chunk_tokens < estimate_tokens(cleaned_doc.get("text", ""))
+    chunking = f"chunks:{settings.max_chunk_tokens}" if chunked else "whole"
+    llm_inputs = (cleaned_digest, PROMPT_TEMPLATE_VERSION, settings.openai_model, llm_mode, mode, chunking)
+    info_key = stage_key("info", *llm_inputs)
+    # The relevance pre-filter only prunes the separate data prompt, and never below the chunk size.
+    relevance_budget = settings.relevance_max_tokens if mode == "separate" else 0
+    if relevance_budget and settings.max_chunk_tokens > 0:
+        relevance_budget = min(relevance_budget, settings.max_chunk_tokens)
+    data_inputs = [digest_json(DEFAULT_FIELDS)]
+    if relevance_budget > 0:
+        data_inputs.append(f"relevance:{relevance_budget}")
+    data_key = stage_key("data", *llm_inputs, *data_inputs)
+    info_hit = cache.hit(manifest, "info", info_key, info_path)
+    data_hit = cache.hit(manifest, "data", data_key) and "records" in manifest
+
+    info_dict: Optional[dict] = None
+    if info_hit:
+        logger.info("Reusing info JSON for %s", doi)
+    if data_hit:
+        logger.info("Reusing extracted records for %s", doi)
+        record_dicts = cache.cached_rows(manifest)
+
+    signature = None
+    if ctx.near_duplicates is not None:
+        signature = minhash(cleaned_doc.get("text", ""))
+        # Chunking is left out: it follows from the text length, which near duplicates share.
+        dedup_config = stage_key(
+            "near-duplicate", PROMPT_TEMPLATE_VERSION, settings.openai_model, llm_mode, mode, digest_json(DEFAULT_FIELDS)
+        )
+    if signature is not None and not (info_hit and data_hit):
+        duplicate = _near_duplicate_extraction(ctx, doi, signature, dedup_config)
+        if duplicate is not None:
+            manifest["duplicate_of"], info_dict, record_dicts = duplicate
+            ctx.emit("duplicate", doi=doi, duplicate_of=manifest["duplicate_of"])
+            save_json(info_dict, info_path)
+            cache.record(manifest, "info", info_key)
+            manifest["records"] = record_dicts
+            cache.record(manifest, "data", data_key)
+            info_hit = data_hit = True
+
+    if not (info_hit and data_hit):
+        manifest.pop("duplicate_of", None)
+        ctx.checkpoint(doi, "info")
+    if (mode == "combined" or (chunked and relevance_budget <= 0)) and not (info_hit and data_hit):
+        if chunked:
+            # The chunked extractor takes an LLM permit per request itself.
+            with tracer.span("extract_chunked", doi):
+                combined = extract_chunked(
+                    llm_client,
+                    cleaned_doc,
+                    fields=DEFAULT_FIELDS,
+                    mode=mode,
+                    max_chunk_tokens=settings.max_chunk_tokens,
+                    max_workers=settings.llm_concurrency,
+                    limiter=limits.llm,
+                )
+        else:
+            with limits.llm, tracer.span("extract_combined", doi):
+                combined = extract_combined(llm_client, cleaned_doc, fields=DEFAULT_FIELDS)
+        info_dict = combined.info.to_dict()
+        save_json(info_dict, info_path)
+        cache.record(manifest, "info", info_key)
+        record_dicts = [record.to_dict() for record in combined.records]
+        manifest["records"] = record_dicts
+        cache.record(manifest, "data", data_key)
+    else:
+        batch_pending: Optional[BatchPending] = None
+        if not info_hit:
+            try:
+                if chunked:
+                    # The summary still reads the whole paper; only the data prompt is pruned.
+                    with tracer.span("extract_info", doi):
+                        info = extract_chunked(
+                            llm_client,
+                            cleaned_doc,
+                            mode="info",
+                            max_chunk_tokens=settings.max_chunk_tokens,
+                            max_workers=settings.llm_concurrency,
+                            limiter=limits.llm,
+                        ).info
+                elif ctx.packer is not None:
+                    # Short papers share a request with other workers' papers; the packer takes the permit.
+                    with tracer.span("extract_info", doi):
+                        info = ctx.packer.extract_info(cleaned_doc)
+                else:
+                    with limits.llm, tracer.span("extract_info", doi):
+                        info = extract_info(llm_client, cleaned_doc)
+            except BatchPending as exc:
+                # Queue the data request too, so both land in the same batch.
+                batch_pending = exc
+            else:
+                info_dict = info.to_dict()
+                save_json(info_dict, info_path)
+                cache.record(manifest, "info", info_key)
+        if not data_hit:
+            data_doc = cleaned_doc
+            if relevance_budget > 0:
+                selection = select_relevant(cleaned_doc, DEFAULT_FIELDS, relevance_budget)
+                logger.info(
+                    "Data prompt for %s keeps %d of %d blocks, %d of %d tokens (%.0f%%)",
+                    doi,
+                    selection.blocks_kept,
+                    selection.blocks_total,
+                    selection.tokens_kept,
+                    selection.tokens_total,
+                    selection.ratio * 100,
+                )
+                manifest["relevance"] = selection.to_dict()
+                ctx.emit("relevance", doi=doi, **selection.to_dict())
+                data_doc = {**cleaned_doc, "text": selection.text}
+            if ctx.packer is not None:
+                with tracer.span("extract_data", doi):
+                    records = ctx.packer.extract_data(data_doc, fields=DEFAULT_FIELDS)
+            else:
+                with limits.llm, tracer.span("extract_data", doi):
+                    records = extract_data(llm_client, data_doc, fields=DEFAULT_FIELDS)
+            record_dicts = [record.to_dict() for record in records]
+            manifest["records"] = record_dicts
+            cache.record(manifest, "data", data_key)
+        if batch_pending is not None:
+            raise batch_pending
+
+    if signature is not None and "duplicate_of" not in manifest:
+        ctx.near_duplicates.add(doi, signature, dedup_config)
+
+    if ctx.catalog is not None:
+        catalog_key = stage_key("catalog", info_key, data_key)
+        if not ctx.catalog.is_current(doi, catalog_key):
+            if info_dict is None:
+                info_dict = load_json(info_path)
+            ctx.catalog.upsert(doi, catalog_key, cleaned_doc.get("text", ""), info_dict, record_dicts)
+
+    return _rows_for(doi, record_dicts, manifest.get("duplicate_of"))
+
 
-        info = extract_info(llm_client, cleaned_doc)
-        save_json(info.to_dict(), info_path)
+def download_all(settings: Settings, force: bool = False) -> Dict[str, Optional[Path]]:
+    """Bulk-download XML for every DOI, skipping ones already on disk unless ``force``."""
+    dois = load_doi_list(settings.input_doi)
+    elsevier = ElsevierClient(
+        api_key=settings.elsevier_api_key,
+        max_connections=settings.elsevier_concurrency,
+        base_url=settings.elsevier_base_url,
+    )
+    results = elsevier.download_many(
+        dois,
+        lambda doi: _build_output_path(settings.output_parsed, doi, ".xml"),
+        skip_existing=not force,
+    )
+    downloaded = sum(1 for path in results.values() if path is not None)
+    logger.info("XML available for %d of %d DOIs", downloaded, len(dois))
+    return results
+
+
+def index_outputs(settings: Settings) -> int:
+    """Backfill the artifact catalog from existing stage manifests; return DOIs indexed."""
+    catalog = ArtifactCatalog(settings.output_catalog)
+    indexed = 0
+    for manifest_path in sorted(settings.output_cache.glob("*.json")):
+        try:
+            manifest = load_json(manifest_path)
+        except ValueError:
+            continue
+        doi, keys = manifest.get("doi"), manifest.get("keys", {})
+        cleaned_path = _build_output_path(settings.output_cleaned, doi or "", ".json")
+        info_path = _build_output_path(settings.output_info, doi or "", ".json")
+        if not doi or "records" not in manifest or not cleaned_path.exists() or not info_path.exists():
+            continue
+        catalog_key = stage_key("catalog", keys.get("info", ""), keys.get("data", ""))
+        if not catalog.is_current(doi, catalog_key):
+            text = load_json(cleaned_path).get("text", "")
+            catalog.upsert(doi, catalog_key, text, load_json(info_path), manifest["records"])
+        indexed += 1
+    catalog.close()
+    logger.info("Catalog %s holds %d indexed DOIs", settings.output_catalog, indexed)
+    return indexed
+
+
+# Settings that change what a run extracts; stored with the run and restored by ``resume``.
+RUN_SETTINGS = (
+    "openai_model",
+    "openai_base_url",
+    "extraction_mode",
+    "max_chunk_tokens",
+    "relevance_max_tokens",
+    "pack_max_tokens",
+    "llm_batch",
+    "local_xml_parser",
+    "pdf_parser",
+    "near_duplicate_threshold",
+)
+
+
+def _restore_run_settings(settings: Settings, stored: Dict[str, Any]) -> Settings:
+    """``settings`` with the values a resumed run started with."""
+    restored = {name: stored[name] for name in RUN_SETTINGS if name in stored}
+    changed = sorted(name for name, value in restored.items() if getattr(settings, name) != value)
+    if changed:
+        logger.warning("Resuming with the run's original settings for %s", ", ".join(changed))
+    return replace(settings, **restored)
+
+
+def _new_run_id() -> str:
+    # The random suffix keeps runs started in the same second (e.g. two web jobs) apart without a lookup.
+    return f"{datetime.utcnow():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+
+def run_pipeline(
+    settings: Settings,
+    from_stage: Optional[str] = None,
+    resume: Optional[str] = None,
+    dois: Optional[List[str]] = None,
+    on_event: Optional[EventCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    profile: bool = False,
+) -> Optional[MetricsSummary]:
+    """Run the pipeline over every DOI in ``settings.input_doi``.
+
+    Stages whose inputs are unchanged since the last run are reused from the
+    stage cache; ``from_stage`` forces that stage and everything after it to
+    be recomputed (``"download"`` recomputes everything). Progress is kept in
+    the run ledger, and ``resume`` continues an earlier run by id with its
+    original DOI list, ``from_stage``, output format and ``RUN_SETTINGS``
+    (model, extraction mode, chunking, relevance, packing, batch, parsers):
+    finished DOIs are only re-exported from the stage cache. Every LLM call
+    is logged to ``output_metrics/llm_calls_<run id>.jsonl`` and the
+    aggregated usage summary is returned.
+
+    ``dois`` replaces the DOI list from ``settings.input_doi``. ``on_event``
+    receives run/DOI/stage progress events, and setting ``cancel_event`` stops
+    the run at the next stage boundary; unfinished DOIs stay resumable. An
+    exception escaping the run (e.g. Ctrl-C) still closes the output with the
+    rows written so far and marks the run cancelled or failed.
+    With ``settings.llm_batch`` uncached LLM requests go through the provider's
+    batch API: DOIs wait in rounds until the batch holding their requests is
+    back. With ``profile`` the seconds each DOI spent per stage span are written to
+    ``output_metrics/timings_<run id>.jsonl``.
+    """
+    if settings.extraction_mode not in EXTRACTION_MODES:
+        raise ValueError(
+            f"Unknown extraction mode {settings.extraction_mode!r}; expected one of {', '.join(EXTRACTION_MODES)}"
+        )
+    if settings.pdf_parser not in PDF_PARSERS:
+        raise ValueError(f"Unknown PDF parser {settings.pdf_parser!r}; expected one of {', '.join(PDF_PARSERS)}")
+    check_output_format(settings.output_format)
+
+    ledger = RunLedger(settings.output_ledger)
+    if resume is not None:
+        run_info = ledger.get_run(resume)
+        if run_info is None:
+            ledger.close()
+            raise ValueError(f"Unknown run id {resume!r}")
+        run_id = resume
+        from_stage = run_info.from_stage
+        settings = _restore_run_settings(replace(settings, output_format=run_info.output_format), run_info.settings)
+        dois = ledger.dois(run_id)
+        finished = set(ledger.dois(run_id, status="done"))
+        logger.info("Resuming run %s: %d of %d DOIs already done", run_id, len(finished), len(dois))
+    else:
+        dois = dedupe_dois(dois) if dois is not None else load_doi_list(settings.input_doi)
+        if not dois:
+            logger.warning("No DOIs to process; exiting")
+            ledger.close()
+            return None
+        run_id = _new_run_id()
+        run_settings = {name: getattr(settings, name) for name in RUN_SETTINGS}
+        ledger.start_run(run_id, dois, from_stage, settings.output_format, run_settings)
+        finished = set()
+        logger.info("Started run %s (continue with `paperreader run --resume %s` if interrupted)", run_id, run_id)
+
+    def emit(event: str, **data: Any) -> None:
+        if on_event is not None:
+            on_event(event, {"run_id": run_id, **data})
+
+    def on_stage(doi: str, stage: str, status: str) -> None:
+        ledger.stage_event(run_id, doi, stage, status)
+        emit("stage", doi=doi, stage=stage, status=status)
+
+    status = "failed"
+
+    def close_run(exc_type: Optional[type], exc: Optional[BaseException], tb: Any) -> None:
+        # An exception escaping the run marks it cancelled (Ctrl-C) or failed; unfinished DOIs stay resumable.
+        if exc_type is None:
+            final = status
+        else:
+            final = "cancelled" if issubclass(exc_type, (KeyboardInterrupt, RunCancelled)) else "failed"
+        ledger.finish_run(run_id, final)
+        ledger.close()
+
+    # Every resource is registered as soon as it exists, so an exception anywhere
+    # below (Ctrl-C, a batch API error) still flushes the sink and closes the rest.
+    stack = ExitStack()
+    stack.push(close_run)
+    with stack:
+        emit("run_started", total=len(dois), done=len(finished))
+        cache = StageCache(settings.output_cache, from_stage=from_stage, run_id=run_id, on_stage=on_stage)
+        metrics = stack.enter_context(closing(MetricsRecorder(settings.output_metrics / f"llm_calls_{run_id}.jsonl")))
+
+        response_cache = None
+        if settings.llm_cache_path:
+            response_cache = ResponseCache(
+                settings.llm_cache_path,
+                max_entries=settings.llm_cache_max_entries,
+                max_age_seconds=settings.llm_cache_max_age_days * 24 * 3600,
+            )
+            stack.callback(response_cache.close)
+        llm_client = LLMClient(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            model=settings.openai_model,
+            cache=response_cache,
+            max_retries=settings.llm_max_retries,
+            max_in_flight=settings.llm_concurrency,
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            metrics=metrics,
+        )
+        elsevier = ElsevierClient(
+            api_key=settings.elsevier_api_key,
+            max_connections=settings.elsevier_concurrency,
+            base_url=settings.elsevier_base_url,
+        )
+        parser_queue = None
+        if settings.uniparser_async:
+            parser_queue = UniParserJobQueue(
+                host=settings.uniparser_host,
+                token=settings.uniparser_token,
+                max_in_flight=settings.uniparser_concurrency,
+            )
+            stack.callback(parser_queue.close)
+        # In batch mode uncached LLM requests are queued and their DOIs deferred until the batch is back.
+        collector = BatchCollector(llm_client) if settings.llm_batch and not llm_client.stub else None
+        ctx = RunContext(
+            settings=settings,
+            llm_client=collector or llm_client,
+            elsevier=elsevier,
+            limits=StageLimits.from_settings(settings),
+            cache=cache,
+            parser_queue=parser_queue,
+            ledger=ledger,
+            run_id=run_id,
+            catalog=stack.enter_context(closing(ArtifactCatalog(settings.output_catalog))),
+            on_event=lambda event, data: emit(event, **data),
+            cancel_event=cancel_event,
+            tracer=Tracer(
+                per_doi=profile,
+                outcomes={BatchPending: "deferred", RunCancelled: "cancelled", CancelledError: "cancelled"},
+            ),
+        )
+        if settings.near_duplicate_threshold > 0:
+            ctx.near_duplicates = NearDuplicateIndex(
+                settings.output_catalog, threshold=settings.near_duplicate_threshold
+            )
+            stack.callback(ctx.near_duplicates.close)
+        workers = max(1, settings.pipeline_workers)
+        # Packing needs concurrent workers to group with, and the batch collector defers instead of answering.
+        packable = settings.extraction_mode == "separate" and workers > 1 and collector is None
+        if settings.pack_max_tokens > 0 and packable:
+            ctx.packer = RequestPacker(
+                llm_client,
+                max_tokens=settings.pack_max_tokens,
+                wait_seconds=settings.pack_wait_seconds,
+                limiter=ctx.limits.llm,
+            )
+        # CPU-bound local XML/PDF parsing runs in processes so concurrent workers are not serialised by the GIL.
+        parse_processes = settings.parse_processes or min(workers, os.cpu_count() or 1)
+        if parse_processes > 1:
+            # "spawn" because forking a process that already runs threads is unsafe.
+            ctx.parse_pool = ProcessPoolExecutor(
+                max_workers=parse_processes, mp_context=multiprocessing.get_context("spawn")
+            )
+            stack.callback(ctx.parse_pool.shutdown, cancel_futures=True)
+
+        # Rows go to the sink as soon as each DOI finishes (in completion order),
+        # so memory stays flat and a crash keeps everything written so far.
+        # A DOI is marked done only once its rows are in the sink.
+        output_path = settings.output_xlsx / f"extracted_{run_id}.{settings.output_format}"
+        sink = stack.enter_context(open_sink(settings.output_format, output_path))
+        pending = [doi for doi in dois if doi not in finished]
+        failed: List[str] = []
+        cancelled: List[str] = []
+        deferred: List[str] = []
+        timings = None
+        if profile:
+            settings.output_metrics.mkdir(parents=True, exist_ok=True)
+            timings_path = settings.output_metrics / f"timings_{run_id}.jsonl"
+            timings = stack.enter_context(timings_path.open("w", encoding="utf-8"))
+
+        for doi in dois:
+            if doi in finished:
+                # Rows of DOIs finished before the interruption come straight from their manifests.
+                manifest = cache.load(doi)
+                sink.write_rows(_rows_for(doi, cache.cached_rows(manifest), manifest.get("duplicate_of")))
+
+        def complete(doi: str, result: Callable[[], List[dict]]) -> None:
+            ctx.tracer.registry.add_gauge("paperreader_dois_pending", -1)
+            try:
+                rows = result()
+                with ctx.tracer.span("export", doi):
+                    sink.write_rows(rows)
+            except (RunCancelled, CancelledError):
+                ledger.release_doi(run_id, doi)
+                cancelled.append(doi)
+                outcome = "cancelled"
+            except BatchPending:
+                ledger.release_doi(run_id, doi)
+                deferred.append(doi)
+                outcome = "deferred"
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Processing failed for %s; continuing with remaining DOIs", doi)
+                error = f"{exc.__class__.__name__}: {exc}"
+                ledger.fail_doi(run_id, doi, error)
+                failed.append(doi)
+                emit("doi_failed", doi=doi, error=error)
+                outcome = "failed"
+            else:
+                ledger.finish_doi(run_id, doi)
+                emit("doi_done", doi=doi, rows=len(rows))
+                outcome = "done"
+            if outcome != "deferred":
+                ctx.tracer.registry.count_doi(outcome)
+            if timings is not None:
+                line = {"doi": doi, "status": outcome, "stages": ctx.tracer.take(doi)}
+                timings.write(json.dumps(line, ensure_ascii=False) + "\n")
+                timings.flush()
+
+        def process(batch: List[str]) -> None:
+            ctx.tracer.registry.add_gauge("paperreader_dois_pending", len(batch))
+            if workers == 1:
+                for doi in batch:
+                    complete(doi, lambda: _process_doi(doi, ctx))
+                return
+            logger.info("Processing %d DOIs with %d workers", len(batch), workers)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="paperreader") as executor:
+                futures = {executor.submit(_process_doi, doi, ctx): doi for doi in batch}
+                for future in as_completed(futures):
+                    complete(futures.pop(future), future.result)
+                    if cancelled:
+                        # DOIs that have not started yet are dropped right away.
+                        for queued in futures:
+                            queued.cancel()
+
+        process(pending)
+        batch_api = None
+        if collector is not None and deferred:
+            batch_api = BatchAPI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                poll_interval=settings.llm_batch_poll_seconds,
+            )
+            stack.callback(batch_api.close)
+        batch_round = 0
+        while collector is not None and deferred and not cancelled:
+            batch_round += 1
+            requests = collector.drain()
+            logger.info(
+                "Batch round %d: %d LLM requests from %d deferred DOIs", batch_round, len(requests), len(deferred)
+            )
+            emit("batch_submitted", round=batch_round, requests=len(requests), dois=len(deferred))
+            batch_path = settings.output_metrics / f"llm_batch_{run_id}_{batch_round}.jsonl"
+            results = batch_api.run(requests, batch_path, cancel_event=cancel_event)
+            collector.resolve(results)
+            emit("batch_finished", round=batch_round, results=len(results))
+            if cancel_event is not None and cancel_event.is_set():
+                # Deferred DOIs were already released in the ledger, so --resume picks them up.
+                cancelled.extend(deferred)
+                break
+            # Deferred DOIs resume at the stage that queued the request, now answered from the batch
+            # (or in real time for requests the batch did not answer).
+            retry = list(deferred)
+            deferred.clear()
+            process(retry)
+        status = "cancelled" if cancelled else "failed" if failed else "completed"
+
+    if timings is not None:
+        logger.info("Per-DOI stage timings written to %s", timings.name)
+    if cancelled:
+        logger.warning(
+            "Run %s cancelled; %d DOIs left for `paperreader run --resume %s`", run_id, len(cancelled), run_id
+        )
+    if response_cache is not None:
+        stats = response_cache.stats
+        logger.info(
+            "LLM response cache: %d hits, %d misses (%.0f%% hit rate)",
+            stats.hits,
+            stats.misses,
+            stats.hit_rate * 100,
+        )
+    if failed:
+        logger.warning(
+            "%d of %d DOIs failed: %s (retry with `paperreader run --resume %s`)",
+            len(failed),
+            len(dois),
+            ", ".join(failed),
+            run_id,
+        )
 
-        records = extract_data(llm_client, cleaned_doc, fields=DEFAULT_FIELDS)
-        for record in records:
-            row = record.to_dict()
-            row.update({"doi": doi})
-            structured_rows.append(row)
+    logger.info("Pipeline complete. Results written to %s", output_path)
+    emit("run_finished", status=status, output=str(output_path), failed=len(failed), cancelled=len(cancelled))
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    xlsx_path = settings.output_xlsx / f"extracted_{timestamp}.xlsx"
-    write_records_to_xlsx(structured_rows, xlsx_path)
-    logger.info("Pipeline complete. Results written to %s", xlsx_path)
+    summary = metrics.summary()
+    logger.info("LLM call metrics written to %s", metrics.path)
+    return summary
@@ -0,0 +1,203 @@
+"""Stage spans for ``run_pipeline`` and their Prometheus exposition.
+
+Every pipeline step (download, resolve_pdf, parse_document, strip_metadata,
+clean_with_llm, extract_info, extract_data, export, ...) runs inside
+:meth:`Tracer.span`. Its duration lands in a process-wide histogram and,
+if it raises, in an error counter. Exceptions the caller registers as
+control flow (a request deferred to a batch, a cancelled run) are counted
+by outcome instead, so they neither inflate the error rate nor add their
+near-zero durations to the histogram. The web server renders these as
+Prometheus text at ``/metrics``, together with queue gauges. With
+``per_doi`` the tracer also adds up each DOI's time per span for the
+``--profile`` timing report.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
+
+SPANS = (
+    "process_doi",
+    "download",
+    "resolve_pdf",
+    "parse_document",
+    "parse_local",
+    "strip_metadata",
+    "clean_with_llm",
+    "extract_info",
+    "extract_data",
+    "extract_combined",
+    "extract_chunked",
+    "export",
+)
+
+# Seconds; remote stages take from milliseconds (cache-warm XML) to minutes (Uni-parser).
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms, error and DOI counters, and gauges."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations: Dict[str, Histogram] = {}
+        self.errors: Counter = Counter()
+        self.interrupted: Counter = Counter()
+        self.dois: Counter = Counter()
+        self.gauges: Dict[str, float] = defaultdict(float)
+
+    def observe(self, span: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            histogram = self.durations.get(span)
+            if histogram is None:
+                histogram = self.durations[span] = Histogram()
+            histogram.observe(seconds)
+            if not ok:
+                self.errors[span] += 1
+
+    def count_interrupted(self, span: str, outcome: str) -> None:
+        with self._lock:
+            self.interrupted[(span, outcome)] += 1
+
+    def count_doi(self, status: str) -> None:
+        with self._lock:
+            self.dois[status] += 1
+
+    def add_gauge(self, name: str, delta: float) -> None:
+        with self._lock:
+            self.gauges[name] += delta
+
+    def render(self, extra_gauges: Optional[Mapping[str, Mapping[Labels, float]]] = None) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP paperreader_stage_duration_seconds Time spent in each pipeline stage.",
+                "# TYPE paperreader_stage_duration_seconds histogram",
+            ]
+            for span in sorted(self.durations):
+                histogram = self.durations[span]
+                for bound, count in zip((*histogram.buckets, math.inf), (*histogram.counts, histogram.count)):
+                    labels = _labels((("stage", span), ("le", _number(bound))))
+                    lines.append(f"paperreader_stage_duration_seconds_bucket{labels} {count}")
+                labels = _labels((("stage", span),))
+                lines.append(f"paperreader_stage_duration_seconds_sum{labels} {_number(histogram.sum)}")
+                lines.append(f"paperreader_stage_duration_seconds_count{labels} {histogram.count}")
+            lines += [
+                "# HELP paperreader_stage_errors_total Pipeline stages that raised.",
+                "# TYPE paperreader_stage_errors_total counter",
+            ]
+            for span, count in sorted(self.errors.items()):
+                lines.append(f"paperreader_stage_errors_total{_labels((('stage', span),))} {count}")
+            lines += [
+                "# HELP paperreader_stage_interrupted_total Pipeline stages left early by design, by outcome.",
+                "# TYPE paperreader_stage_interrupted_total counter",
+            ]
+            for (span, outcome), count in sorted(self.interrupted.items()):
+                labels = _labels((("stage", span), ("outcome", outcome)))
+                lines.append(f"paperreader_stage_interrupted_total{labels} {count}")
+            lines += [
+                "# HELP paperreader_dois_total DOIs finished by the pipeline, by outcome.",
+                "# TYPE paperreader_dois_total counter",
+            ]
+            for status, count in sorted(self.dois.items()):
+                lines.append(f"paperreader_dois_total{_labels((('status', status),))} {count}")
+            gauges = {name: {(): value} for name, value in self.gauges.items()}
+        for name, values in (extra_gauges or {}).items():
+            gauges.setdefault(name, {}).update(values)
+        for name in sorted(gauges):
+            lines.append(f"# TYPE {name} gauge")
+            lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in sorted(gauges[name].items())]
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every run in the process, so the web server's /metrics covers all jobs.
+REGISTRY = MetricsRegistry()
+
+
+class Tracer:
+    """Times spans into ``registry``; with ``per_doi`` also sums them per DOI.
+
+    ``outcomes`` maps exception types that end a span without it failing to
+    the outcome label they are counted under, e.g. ``{BatchPending:
+    "deferred"}``. The pipeline passes its own types here, so this module
+    imports none of them.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        per_doi: bool = False,
+        outcomes: Optional[Mapping[Type[BaseException], str]] = None,
+    ):
+        self.registry = registry
+        self.per_doi = per_doi
+        self.outcomes = dict(outcomes or {})
+        self._lock = threading.Lock()
+        self._timings: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    @contextmanager
+    def span(self, name: str, doi: Optional[str] = None) -> Iterator[None]:
+        started = time.perf_counter()
+        ok = False
+        outcome: Optional[str] = None
+        try:
+            yield
+            ok = True
+        except BaseException as exc:
+            outcome = next((label for kind, label in self.outcomes.items() if isinstance(exc, kind)), None)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if outcome is not None:
+                self.registry.count_interrupted(name, outcome)
+            else:
+                self.registry.observe(name, elapsed, ok)
+            if self.per_doi and doi is not None:
+                with self._lock:
+                    self._timings[doi][name] += elapsed
+
+    def take(self, doi: str) -> Dict[str, float]:
+        """Remove and return the per-span seconds collected for ``doi``."""
+        with self._lock:
+            timings = self._timings.pop(doi, {})
+        return {name: round(seconds, 6) for name, seconds in timings.items()}
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import hashlib
 from pathlib import Path
-from typing import Iterable, Union
+from typing import Iterable, Iterator, Union
 
 
 Hashable = Union[str, bytes, Path]
@@ -19,3 +19,17 @@ def sha256_from_iterable(values: Iterable[Hashable]) -> str:
             value = value.encode("utf-8")
         digest.update(value)
     return digest.hexdigest()
+
+
+def _iter_file_chunks(path: Path, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    with path.open("rb") as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def sha256_file(path: Path) -> str:
+    """Hash a file's bytes in chunks so large PDFs are never fully loaded."""
+    return sha256_from_iterable(_iter_file_chunks(path))
@@ -0,0 +1,14 @@
+"""Small statistics helpers for run summaries."""
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (``pct`` in 0–100); ``None`` for no data."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,180 @@
+"""File downloads for the web UI: single files with Range/ETag, and streamed zip bundles.
+
+Single files are answered with ``304 Not Modified`` when the browser's
+validators still match and with ``206 Partial Content`` for a byte range, so
+interrupted downloads of large exports resume instead of restarting. A run
+bundle is compressed while it is sent: ``zipfile`` writes into a small
+buffer that is drained after every chunk, so neither the archive nor any
+member is ever held in memory or written to disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import re
+import zipfile
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve_data_path(path: str, data_dir: Path) -> Path:
+    """Resolve ``path`` and make sure it is a file inside ``data_dir``.
+
+    Raises ``PermissionError`` for anything outside (including via ``..`` or
+    symlinks) and ``FileNotFoundError`` for a missing file.
+    """
+    root = data_dir.resolve()
+    candidate = Path(path)
+    if not candidate.is_absolute():
+        candidate = root / candidate
+    resolved = candidate.resolve()
+    if not resolved.is_relative_to(root):
+        raise PermissionError(path)
+    if not resolved.is_file():
+        raise FileNotFoundError(path)
+    return resolved
+
+
+def _etag(stat: os.stat_result) -> str:
+    digest = hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive offsets; ``None`` if it cannot be satisfied.
+
+    Raises ``ValueError`` for headers that are not a single byte range, which
+    callers answer with the whole file.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError(header)
+    start, end = match.groups()
+    if start == "":
+        length = int(end)
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        return None
+    return first, last
+
+
+def _read_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with path.open("rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request: Request, path: Path) -> Response:
+    """Serve ``path`` honouring ``If-None-Match``/``If-Modified-Since``, ``Range`` and ``If-Range``."""
+    stat = path.stat()
+    etag = _etag(stat)
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(path.name)}",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    size = stat.st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, headers["Last-Modified"])):
+        try:
+            byte_range = _byte_range(range_header, size)
+        except ValueError:
+            pass  # not a single byte range: send the whole file
+        else:
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _read_file(path, start, end - start + 1), status_code=206, media_type=media_type, headers=headers
+            )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_read_file(path, 0, size), media_type=media_type, headers=headers)
+
+
+class _ZipBuffer:
+    """Write-only, non-seekable sink; ``zipfile`` then emits data descriptors."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(members: Iterable[Tuple[str, Path]]) -> Iterator[bytes]:
+    """Yield a deflated zip of ``(archive name, file)`` pairs; missing files are skipped."""
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, path in members:
+            try:
+                source = path.open("rb")
+            except FileNotFoundError:
+                continue
+            with source, archive.open(arcname, "w", force_zip64=True) as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+    # Remaining member trailers and the central directory.
+    yield buffer.drain()
@@ -0,0 +1,240 @@
+"""Queued pipeline jobs for the web server, with progress pushed to subscribers.
+
+Each job carries its own settings and optional DOI list and runs
+:func:`run_pipeline` on a dedicated worker pool, separate from the
+server's request threadpool. Progress events from the pipeline update a
+per-job snapshot and are fanned out to asyncio queues, which the
+Server-Sent Events endpoint drains. Cancelling a queued job drops it;
+cancelling a running job stops it at the next stage boundary, and its run
+can later be resumed from the ledger. Finished jobs drop their settings
+(which hold the API keys), and only the most recent ``max_finished`` of
+them are kept.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from paperreader.config import Settings
+from paperreader.pipeline.run import run_pipeline
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+# Events kept per job for subscribers that connect (or reconnect) late.
+EVENT_HISTORY = 2_000
+
+# Finished jobs kept for the job list and late event-stream subscribers.
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class Job:
+    job_id: str
+    settings: Optional[Settings]
+    dois: Optional[List[str]] = None
+    label: str = ""
+    status: str = "queued"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    run_id: Optional[str] = None
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    stages: Dict[str, str] = field(default_factory=dict)
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    events: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=EVENT_HISTORY))
+    future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "label": self.label,
+            "status": self.status,
+            "run_id": self.run_id,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            # Only DOIs currently in flight; finished ones are summarised by the counters.
+            "stages": dict(self.stages),
+            "output_path": self.output_path,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """Queue of pipeline jobs executed by ``max_workers`` background threads."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        runner: Callable[..., Any] = run_pipeline,
+        max_finished: int = MAX_FINISHED_JOBS,
+    ):
+        self._runner = runner
+        self.max_finished = max(0, max_finished)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="paperreader-job")
+        self._jobs: Dict[str, Job] = {}
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._ids = itertools.count(1)
+
+    def submit(self, settings: Settings, dois: Optional[List[str]] = None, label: str = "") -> Job:
+        job_id = f"{datetime.utcnow():%Y%m%d%H%M%S}-{next(self._ids)}"
+        job = Job(job_id=job_id, settings=settings, dois=dois, label=label)
+        with self._lock:
+            self._jobs[job_id] = job
+        self._publish(job, "job_queued", {})
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of jobs per status, for the ``/metrics`` queue gauges."""
+        with self._lock:
+            return dict(Counter(job.status for job in self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; return False if it already finished."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, "cancelled")
+        else:
+            self._publish(job, "job_cancelling", {})
+        return True
+
+    def _run(self, job: Job) -> None:
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+        with self._lock:
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+        self._publish(job, "job_started", {})
+        try:
+            self._runner(
+                job.settings,
+                dois=job.dois,
+                on_event=lambda event, data: self._on_event(job, event, data),
+                cancel_event=job.cancel_event,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Job %s failed", job.job_id)
+            job.error = str(exc)
+            self._finish(job, "failed")
+            return
+        if job.finished:
+            return
+        # run_pipeline returns early (without run events) when there is nothing to do.
+        self._finish(job, "cancelled" if job.cancel_event.is_set() else "completed")
+
+    def _on_event(self, job: Job, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if event == "run_started":
+                job.run_id = data.get("run_id")
+                job.total = data.get("total", 0)
+                job.done = data.get("done", 0)
+            elif event == "stage":
+                job.stages[data["doi"]] = f"{data['stage']}:{data['status']}"
+            elif event == "doi_done":
+                job.done += 1
+                job.stages.pop(data["doi"], None)
+            elif event == "doi_failed":
+                job.failed += 1
+                job.stages.pop(data["doi"], None)
+            elif event == "run_finished":
+                job.output_path = data.get("output")
+        self._publish(job, event, data)
+        if event == "run_finished":
+            # A run in which some DOIs failed still completed; ``failed`` counts them.
+            status = data.get("status", "completed")
+            self._finish(job, "cancelled" if status == "cancelled" else "completed")
+
+    def _finish(self, job: Job, status: str) -> None:
+        with self._lock:
+            if job.finished:
+                return
+            job.status = status
+            job.finished_at = datetime.utcnow()
+            job.stages.clear()
+            # The runner already holds what it needs; the job must not keep the API keys around.
+            job.settings = None
+            job.dois = None
+        self._publish(job, "job_finished", {})
+        self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        """Forget the oldest finished jobs beyond ``max_finished``."""
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+            for job in finished[: max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job.job_id]
+                self._subscribers.pop(job.job_id, None)
+
+    def _publish(self, job: Job, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            message = {"seq": next(self._seq), "event": event, "data": data, "job": job.snapshot()}
+            job.events.append(message)
+            subscribers = list(self._subscribers.get(job.job_id, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:  # the subscriber's event loop has shut down
+                continue
+
+    def subscribe(self, job_id: str, after: int = 0) -> "asyncio.Queue[Dict[str, Any]]":
+        """Return a queue pre-filled with events newer than ``after`` that receives new ones."""
+        queue: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            job = self._jobs[job_id]
+            for message in job.events:
+                if message["seq"] > after:
+                    queue.put_nowait(message)
+            self._subscribers.setdefault(job_id, []).append((loop, queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            remaining = [
+                (loop, subscribed) for loop, subscribed in self._subscribers.get(job_id, []) if subscribed is not queue
+            ]
+            if remaining:
+                self._subscribers[job_id] = remaining
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def shutdown(self) -> None:
+        for job in self.list():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
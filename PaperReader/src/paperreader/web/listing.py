@@ -0,0 +1,79 @@
+"""Cached directory listings for the web UI.
+
+Adding, removing or renaming a file (every artifact is written by rename)
+bumps the directory's mtime, so a single ``stat`` per request tells whether
+a cached listing is still valid; the directory is only rescanned after it
+changed.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Listing:
+    directory: Path
+    names: Tuple[str, ...]
+    newest: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def page(self, offset: int = 0, limit: int = 50) -> List[Path]:
+        return [self.directory / name for name in self.names[offset : offset + limit]]
+
+    @property
+    def newest_path(self) -> Optional[Path]:
+        return self.directory / self.newest if self.newest else None
+
+
+class DirectoryIndex:
+    """Per-directory listings keyed on the directory mtime, shared across requests."""
+
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[Path, Tuple[str, ...], bool], Tuple[int, Listing]] = {}
+        self._lock = threading.Lock()
+
+    def listing(self, directory: Path, suffixes: Tuple[str, ...], track_newest: bool = False) -> Listing:
+        """Return files in ``directory`` ending with ``suffixes``, sorted by name.
+
+        ``track_newest`` also records the most recently modified file; it costs
+        one ``stat`` per file, so only use it on small directories.
+        """
+        try:
+            stamp = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return Listing(directory, ())
+        key = (directory, suffixes, track_newest)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        names = []
+        newest: Optional[Tuple[int, str]] = None
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Hidden names are in-progress atomic writes.
+                if entry.name.startswith(".") or not entry.name.lower().endswith(suffixes):
+                    continue
+                if not entry.is_file():
+                    continue
+                names.append(entry.name)
+                if track_newest:
+                    mtime = entry.stat().st_mtime_ns
+                    if newest is None or mtime > newest[0]:
+                        newest = (mtime, entry.name)
+        listing = Listing(directory, tuple(sorted(names)), newest[1] if newest else None)
+        with self._lock:
+            # Keep the stamp read before scanning: a file added meanwhile forces a rescan next time.
+            self._cache[key] = (stamp, listing)
+        return listing
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -1,58 +1,51 @@
 """FastAPI web UI for PaperReader pipeline."""
 from __future__ import annotations
 
-import threading
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
 from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-
-from paperreader.config import Settings, load_settings
-from paperreader.pipeline.run import run_pipeline
+from starlette.concurrency import run_in_threadpool
+
+from paperreader.config import Settings, get_settings
+from paperreader.ingestion.local_pdf import PDF_PARSERS
+from paperreader.io.catalog import ArtifactCatalog
+from paperreader.io.sinks import OUTPUT_FORMATS
+from paperreader.pipeline.ledger import RunInfo, RunLedger
+from paperreader.pipeline.run import artifact_paths
+from paperreader.pipeline.tracing import REGISTRY
+from paperreader.web.downloads import file_response, resolve_data_path, stream_zip
+from paperreader.web.jobs import JobManager
+from paperreader.web.listing import DirectoryIndex, Listing
+from paperreader.web.uploads import UploadTooLarge, extract_pdfs, is_archive, save_stream
 from paperreader.utils.log import get_logger
 
 logger = get_logger(__name__)
 
-app = FastAPI(title="PaperReader Web UI", version="0.1.0")
-
-templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
-app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
+jobs = JobManager(max_workers=int(os.getenv("WEB_JOB_WORKERS") or 2))
 
 
-class PipelineState:
-    """In-memory pipeline status tracker."""
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Running jobs stop at their next stage boundary and stay resumable.
+    jobs.shutdown()
 
-    def __init__(self) -> None:
-        self.running: bool = False
-        self.last_start: Optional[datetime] = None
-        self.last_finish: Optional[datetime] = None
-        self.last_error: Optional[str] = None
-        self.last_output: Optional[Path] = None
-        self.lock = threading.Lock()
 
-    def start(self) -> bool:
-        with self.lock:
-            if self.running:
-                return False
-            self.running = True
-            self.last_start = datetime.utcnow()
-            self.last_error = None
-            return True
+app = FastAPI(title="PaperReader Web UI", version="0.1.0", lifespan=_lifespan)
 
-    def finish(self, output_path: Optional[Path] = None, error: Optional[str] = None) -> None:
-        with self.lock:
-            self.running = False
-            self.last_finish = datetime.utcnow()
-            self.last_output = output_path
-            self.last_error = error
-
-
-state = PipelineState()
+templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
+app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
 
 def ensure_directories(settings: Settings) -> None:
@@ -67,90 +60,143 @@ def ensure_directories(settings: Settings) -> None:
         path.mkdir(parents=True, exist_ok=True)
 
 
-def latest_output(xlsx_dir: Path) -> Optional[Path]:
-    files = list(xlsx_dir.glob("*.xlsx"))
-    if not files:
-        return None
-    return max(files, key=lambda p: p.stat().st_mtime)
+_ensured_settings: Optional[Settings] = None
 
 
-def _run_pipeline_background(settings: Settings) -> None:
-    logger.info("Pipeline background task started")
-    try:
-        run_pipeline(settings)
-        state.finish(output_path=latest_output(settings.output_xlsx))
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("Pipeline failed: %s", exc)
-        state.finish(error=str(exc))
+def current_settings() -> Settings:
+    """Process-wide settings (reloaded when ``.env`` changes); directories are created once per load."""
+    global _ensured_settings
+    settings = get_settings()
+    if settings is not _ensured_settings:
+        ensure_directories(settings)
+        _ensured_settings = settings
+    return settings
 
 
-@app.get("/", response_class=HTMLResponse)
-async def index(request: Request) -> HTMLResponse:
-    settings = load_settings()
-    ensure_directories(settings)
-    pdfs = sorted(settings.input_pdfs.glob("*.pdf"))
-    parsed_files = sorted(settings.output_parsed.glob("*.json"))
-    cleaned_files = sorted(settings.output_cleaned.glob("*.json"))
-    info_files = sorted(settings.output_info.glob("*.json"))
-    xlsx_files = sorted(settings.output_xlsx.glob("*.xlsx"))
+PAGE_SIZE = 50
+# Per-upload limit; for archives it bounds the total size of the unpacked PDFs.
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB") or 1024)
+SSE_KEEPALIVE_SECONDS = 15
+EXPORT_SUFFIXES = tuple(f".{fmt}" for fmt in OUTPUT_FORMATS)
+
+# Listing kind -> (Settings attribute, file suffixes).
+LISTINGS = {
+    "pdfs": ("input_pdfs", (".pdf",)),
+    "parsed": ("output_parsed", (".json",)),
+    "cleaned": ("output_cleaned", (".json",)),
+    "info": ("output_info", (".json",)),
+    "exports": ("output_xlsx", EXPORT_SUFFIXES),
+}
 
+directory_index = DirectoryIndex()
+
+
+def listing(settings: Settings, kind: str) -> Listing:
+    attribute, suffixes = LISTINGS[kind]
+    return directory_index.listing(getattr(settings, attribute), suffixes, track_newest=kind == "exports")
+
+
+def latest_output(xlsx_dir: Path) -> Optional[Path]:
+    return directory_index.listing(xlsx_dir, EXPORT_SUFFIXES, track_newest=True).newest_path
+
+
+@app.get("/", response_class=HTMLResponse)
+def index(request: Request) -> HTMLResponse:
+    # A plain ``def`` runs in the threadpool, so directory scans never block the event loop.
+    settings = current_settings()
     context: Dict[str, object] = {
         "request": request,
-        "state": state,
+        "jobs": [job.snapshot() for job in jobs.list()],
+        "latest_output": latest_output(settings.output_xlsx),
         "settings": settings,
-        "pdfs": pdfs,
-        "parsed_files": parsed_files,
-        "cleaned_files": cleaned_files,
-        "info_files": info_files,
-        "xlsx_files": xlsx_files,
+        "listings": {kind: listing(settings, kind) for kind in LISTINGS},
+        "page_size": PAGE_SIZE,
+        "upload_max_mb": UPLOAD_MAX_MB,
     }
-    return templates.TemplateResponse("index.html", context)
+    return templates.TemplateResponse(request, "index.html", context)
+
+
+@app.get("/files/{kind}")
+def list_files(
+    kind: str, offset: int = Query(0, ge=0), limit: int = Query(PAGE_SIZE, ge=1, le=1000)
+) -> JSONResponse:
+    """One page of a cached directory listing, for lazy loading in the index page."""
+    if kind not in LISTINGS:
+        raise HTTPException(status_code=404, detail="未知的文件类别")
+    files = listing(current_settings(), kind)
+    items = [{"name": path.name, "path": str(path)} for path in files.page(offset, limit)]
+    return JSONResponse({"kind": kind, "total": len(files), "offset": offset, "items": items})
+
+
+async def _store(upload: UploadFile, target: Path) -> int:
+    """Copy a spooled upload to ``target`` on a worker thread, keeping the event loop free."""
+    try:
+        return await run_in_threadpool(save_stream, upload.file, target, UPLOAD_MAX_MB * 1024 * 1024)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"{upload.filename} 超过 {UPLOAD_MAX_MB} MB 上传上限")
+    finally:
+        await upload.close()
 
 
 @app.post("/upload/doi")
 async def upload_doi(file: UploadFile = File(...)) -> RedirectResponse:
-    settings = load_settings()
-    ensure_directories(settings)
+    settings = current_settings()
     if not file.filename.endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="请上传 .xlsx 格式的 DOI 文件")
 
     dest = settings.input_doi
-    content = await file.read()
-    dest.write_bytes(content)
+    await _store(file, dest)
     logger.info("Uploaded DOI list to %s", dest)
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.post("/upload/pdfs")
 async def upload_pdfs(files: List[UploadFile] = File(...)) -> RedirectResponse:
-    settings = load_settings()
-    ensure_directories(settings)
+    settings = current_settings()
     saved = 0
     for upload in files:
-        if not upload.filename.lower().endswith(".pdf"):
-            continue
-        target = settings.input_pdfs / Path(upload.filename).name
-        target.write_bytes(await upload.read())
-        saved += 1
+        filename = upload.filename or ""
+        if is_archive(filename):
+            try:
+                unpacked = await run_in_threadpool(
+                    extract_pdfs, upload.file, filename, settings.input_pdfs, UPLOAD_MAX_MB * 1024 * 1024
+                )
+            except UploadTooLarge:
+                raise HTTPException(status_code=413, detail=f"{filename} 解压后超过 {UPLOAD_MAX_MB} MB 上传上限")
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{filename} 不是有效的压缩包")
+            finally:
+                await upload.close()
+            saved += len(unpacked)
+        elif filename.lower().endswith(".pdf"):
+            await _store(upload, settings.input_pdfs / Path(filename).name)
+            saved += 1
     if saved == 0:
         raise HTTPException(status_code=400, detail="没有有效的 PDF 被上传")
     logger.info("Saved %s PDFs to %s", saved, settings.input_pdfs)
     return RedirectResponse(url="/", status_code=303)
 
 
+def _parse_dois(text: Optional[str]) -> Optional[List[str]]:
+    """Split a pasted DOI list on newlines, commas or whitespace; ``None`` means use doi.xlsx."""
+    if not text:
+        return None
+    dois = [doi.strip() for doi in re.split(r"[\s,;]+", text) if doi.strip()]
+    return dois or None
+
+
 @app.post("/run")
-async def run_endpoint(
-    background_tasks: BackgroundTasks,
+def run_endpoint(
     openai_api_key: Optional[str] = Form(None),
     openai_base_url: Optional[str] = Form(None),
     openai_model: Optional[str] = Form(None),
     elsevier_api_key: Optional[str] = Form(None),
+    dois: Optional[str] = Form(None),
+    label: Optional[str] = Form(None),
+    pdf_parser: Optional[str] = Form(None),
 ) -> RedirectResponse:
-    if not state.start():
-        raise HTTPException(status_code=409, detail="流水线正在运行中")
-
-    settings = load_settings()
-    ensure_directories(settings)
+    """Queue a pipeline job with its own settings and optional DOI list."""
+    settings = current_settings()
 
     if openai_api_key:
         settings = replace(settings, openai_api_key=openai_api_key.strip())
@@ -160,14 +206,136 @@ async def run_endpoint(
         settings = replace(settings, openai_model=openai_model.strip())
     if elsevier_api_key:
         settings = replace(settings, elsevier_api_key=elsevier_api_key.strip())
+    if pdf_parser:
+        if pdf_parser not in PDF_PARSERS:
+            raise HTTPException(status_code=400, detail="未知的 PDF 解析方式")
+        settings = replace(settings, pdf_parser=pdf_parser)
+
+    job = jobs.submit(settings, dois=_parse_dois(dois), label=(label or "").strip())
+    logger.info("Queued pipeline job %s", job.job_id)
+    return RedirectResponse(url=f"/#job-{job.job_id}", status_code=303)
+
+
+@app.get("/jobs")
+def list_jobs() -> JSONResponse:
+    return JSONResponse({"jobs": [job.snapshot() for job in jobs.list()]})
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus scrape endpoint: stage histograms, error counters and queue gauges."""
+    queue = {(("status", status),): count for status, count in jobs.status_counts().items()}
+    return Response(REGISTRY.render({"paperreader_web_jobs": queue}), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> JSONResponse:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return JSONResponse(job.snapshot())
 
-    background_tasks.add_task(_run_pipeline_background, settings)
-    return RedirectResponse(url="/", status_code=303)
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str) -> JSONResponse:
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return JSONResponse({"job_id": job_id, "cancelled": jobs.cancel(job_id)})
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> StreamingResponse:
+    """Server-Sent Events stream of a job's progress; honours ``Last-Event-ID`` on reconnect."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    try:
+        after = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        after = 0
+    queue = jobs.subscribe(job_id, after=after)
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = json.dumps({"data": message["data"], "job": message["job"]}, ensure_ascii=False)
+                yield f"id: {message['seq']}\nevent: {message['event']}\ndata: {payload}\n\n"
+                if message["event"] == "job_finished":
+                    return
+        finally:
+            jobs.unsubscribe(job_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/search")
+def search(
+    q: str = "",
+    field: Optional[str] = None,
+    min_value: Optional[str] = None,
+    max_value: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+) -> JSONResponse:
+    """Full-text + record-value search over the artifact catalog."""
+    # The HTML form submits empty strings for unused bounds.
+    try:
+        low = float(min_value) if min_value else None
+        high = float(max_value) if max_value else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="数值范围需为数字")
+    settings = current_settings()
+    catalog = ArtifactCatalog(settings.output_catalog)
+    try:
+        hits = catalog.search(
+            q, field_name=field or None, min_value=low, max_value=high, limit=limit, offset=offset
+        )
+    finally:
+        catalog.close()
+    return JSONResponse({"query": q, "count": len(hits), "results": [hit.to_dict() for hit in hits]})
 
 
 @app.get("/download")
-async def download(path: str) -> FileResponse:
-    file_path = Path(path)
-    if not file_path.exists():
+def download(path: str, request: Request) -> Response:
+    """Serve a file from the data directory with conditional and Range request support."""
+    try:
+        file_path = resolve_data_path(path, current_settings().data_dir)
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="只能下载数据目录中的文件")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="文件不存在")
-    return FileResponse(file_path)
+    return file_response(request, file_path)
+
+
+def _bundle_members(settings: Settings, run: RunInfo, dois: List[str]) -> Iterator[Tuple[str, Path]]:
+    export = settings.output_xlsx / f"extracted_{run.run_id}.{run.output_format}"
+    yield export.name, export
+    for doi in dois:
+        for kind, path in artifact_paths(settings, doi).items():
+            yield f"{kind}/{path.name}", path
+
+
+@app.get("/runs/{run_id}/bundle.zip")
+def download_bundle(run_id: str) -> StreamingResponse:
+    """Zip of a run's export plus the parsed, cleaned and info JSON of its DOIs, compressed while streaming."""
+    settings = current_settings()
+    ledger = RunLedger(settings.output_ledger)
+    try:
+        run = ledger.get_run(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="运行记录不存在")
+        dois = ledger.dois(run_id)
+    finally:
+        ledger.close()
+    return StreamingResponse(
+        stream_zip(_bundle_members(settings, run, dois)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="paperreader_{run_id}.zip"'},
+    )
@@ -0,0 +1,138 @@
+"""Streaming storage of uploaded files and PDF archives.
+
+Starlette already spools multipart uploads to temporary files, so the
+handlers hand the spooled file object to these helpers on a worker thread:
+data is copied in fixed-size chunks into a hidden temp file next to the
+target and renamed into place, and zip/tar archives are unpacked member by
+member without being read into memory. Every copy counts bytes against a
+limit so an oversized upload (or a decompression bomb) is rejected part way.
+"""
+from __future__ import annotations
+
+import os
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterable, List, Optional, Set, Tuple
+
+from paperreader.io.atomic import atomic_open
+from paperreader.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+CHUNK_SIZE = 1024 * 1024
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload, or the files unpacked from it, exceed the size limit."""
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class _Budget:
+    """Byte allowance shared by everything unpacked from one upload."""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.used = 0
+
+    def take(self, size: int) -> None:
+        self.used += size
+        if self.limit is not None and self.used > self.limit:
+            raise UploadTooLarge(f"upload exceeds the limit of {self.limit} bytes")
+
+
+def _copy(source: BinaryIO, target: Path, budget: _Budget) -> int:
+    written = 0
+    with atomic_open(target, "wb") as fh:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            budget.take(len(chunk))
+            fh.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def save_stream(source: BinaryIO, target: Path, max_bytes: Optional[int] = None) -> int:
+    """Copy ``source`` to ``target`` in chunks and return the number of bytes written.
+
+    ``target`` is replaced only once the whole stream has been copied.
+    """
+    return _copy(source, target, _Budget(max_bytes))
+
+
+def _pdf_name(member_name: str) -> Optional[str]:
+    """Base name of a PDF archive member; ``None`` for anything else (including hidden files)."""
+    name = PurePosixPath(member_name.replace("\\", "/")).name
+    if not name or name.startswith(".") or not name.lower().endswith(".pdf"):
+        return None
+    return name
+
+
+def _unique_name(name: str, used: Set[str]) -> str:
+    """``name``, or ``stem_2.pdf``, ``stem_3.pdf``, ... if a flattened member already took it."""
+    path = PurePosixPath(name)
+    candidate, counter = name, 1
+    while candidate.lower() in used:
+        counter += 1
+        candidate = f"{path.stem}_{counter}{path.suffix}"
+    used.add(candidate.lower())
+    return candidate
+
+
+def _zip_members(source: BinaryIO) -> Iterable[Tuple[str, BinaryIO]]:
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            name = None if info.is_dir() else _pdf_name(info.filename)
+            if name is None:
+                continue
+            with archive.open(info) as member:
+                yield name, member
+
+
+def _tar_members(source: BinaryIO) -> Iterable[Tuple[str, BinaryIO]]:
+    # ``r|*`` reads the archive strictly sequentially and detects the compression.
+    with tarfile.open(fileobj=source, mode="r|*") as archive:
+        for info in archive:
+            name = _pdf_name(info.name) if info.isfile() else None
+            if name is None:
+                continue
+            member = archive.extractfile(info)
+            if member is not None:
+                yield name, member
+
+
+def extract_pdfs(source: BinaryIO, filename: str, target_dir: Path, max_bytes: Optional[int] = None) -> List[Path]:
+    """Unpack the PDFs of a zip or tar archive into ``target_dir``.
+
+    Directory structure inside the archive is flattened (members whose
+    flattened names collide are renamed ``stem_2.pdf``, ...) and other files
+    are skipped. ``max_bytes`` bounds the total uncompressed size. Nothing is
+    written to ``target_dir`` unless the whole archive unpacks.
+    """
+    members = _zip_members(source) if filename.lower().endswith(".zip") else _tar_members(source)
+    budget = _Budget(max_bytes)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    used: Set[str] = set()
+    names: List[str] = []
+    with tempfile.TemporaryDirectory(dir=target_dir, prefix=".unpack-") as staging:
+        try:
+            for name, member in members:
+                name = _unique_name(name, used)
+                _copy(member, Path(staging) / name, budget)
+                names.append(name)
+        except (zipfile.BadZipFile, tarfile.TarError) as exc:
+            raise ValueError(f"{filename} is not a readable archive: {exc}") from exc
+        saved = [target_dir / name for name in names]
+        for name, target in zip(names, saved):
+            os.replace(Path(staging) / name, target)
+    logger.info("Unpacked %s PDFs from %s", len(saved), filename)
+    return saved
@@ -0,0 +1,29 @@
+import pytest
+
+from paperreader.config import Settings
+
+
+@pytest.fixture
+def settings(tmp_path):
+    output = tmp_path / "output"
+    return Settings(
+        base_dir=tmp_path,
+        data_dir=tmp_path,
+        input_doi=tmp_path / "input" / "doi.xlsx",
+        input_pdfs=tmp_path / "input" / "pdfs",
+        output_parsed=output / "parsed_json",
+        output_cleaned=output / "cleaned_json",
+        output_info=output / "info_json",
+        output_xlsx=output / "extracted_xlsx",
+        output_cache=output / "stage_cache",
+        output_metrics=output / "metrics",
+        output_ledger=output / "run_ledger.sqlite3",
+        output_catalog=output / "catalog.sqlite3",
+        openai_api_key="test-key",
+        openai_base_url=None,
+        openai_model="gpt-4o-mini",
+        elsevier_api_key="test-key",
+        uniparser_cli_path=None,
+        uniparser_host=None,
+        uniparser_token=None,
+    )
@@ -0,0 +1,16 @@
+import pytest
+
+from paperreader.io.atomic import atomic_open, atomic_write_text
+
+
+def test_failed_write_keeps_previous_file_and_no_temp(tmp_path):
+    path = tmp_path / "doc.json"
+    atomic_write_text(path, '{"ok": true}')
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(path, "w", encoding="utf-8") as fh:
+            fh.write('{"trunc')
+            raise RuntimeError("crash mid-write")
+
+    assert path.read_text(encoding="utf-8") == '{"ok": true}'
+    assert [p.name for p in tmp_path.iterdir()] == ["doc.json"]
@@ -0,0 +1,77 @@
+import json
+
+import requests
+
+from paperreader.bench.runner import BenchConfig, run_benchmark
+from paperreader.bench.servers import FakeElsevier, FakeLLM, FakeUniParser, FaultConfig
+from paperreader.ingestion.elsevier_api import is_valid_xml
+from paperreader.ingestion.elsevier_xml import parse_elsevier_xml
+from paperreader.pipeline.cache import STAGES
+
+
+def test_fake_elsevier_serves_parseable_xml(tmp_path):
+    with FakeElsevier(paragraphs=8) as service:
+        response = requests.get(f"{service.url}/content/article/doi/10.5555%2Fx", timeout=5)
+    path = tmp_path / "x.xml"
+    path.write_bytes(response.content)
+    assert response.status_code == 200 and is_valid_xml(path)
+    parsed = parse_elsevier_xml(path)
+    assert parsed["metadata"]["doi"] == "10.5555/x"
+    assert [section["heading"] for section in parsed["content"]["sections"]][1] == "2 Experimental"
+    assert parsed["content"]["tables"][0]["rows"][1] == ["A", "21.3"]
+
+
+def test_fault_injection_answers_429_and_500():
+    with FakeLLM(FaultConfig(rate_limit_rate=1.0, retry_after=2)) as service:
+        response = requests.post(f"{service.url}/v1/chat/completions", json={"messages": []}, timeout=5)
+        assert response.status_code == 429 and response.headers["Retry-After"] == "2"
+    with FakeElsevier(FaultConfig(error_rate=1.0)) as service:
+        assert requests.get(f"{service.url}/content/article/doi/x", timeout=5).status_code == 500
+        assert service.counts == {"requests": 1, "errors": 1}
+
+
+def test_fake_uniparser_keeps_jobs_pending_until_processed():
+    with FakeUniParser(processing_time=60) as service:
+        token = requests.post(f"{service.url}/trigger-file-async", files={"file": b"%PDF"}, timeout=5).json()["token"]
+        pending = requests.post(f"{service.url}/get-result", json={"token": token}, timeout=5).json()
+        # The synchronous adapter polls with its own token and gets a finished result.
+        done = requests.post(f"{service.url}/get-result", json={"token": "article"}, timeout=5).json()
+    assert pending == {"status": "pending"}
+    assert done["status"] == "success" and done["content"]["sections"] and done["objects"]
+
+
+def test_fake_llm_answers_each_prompt_type_with_json():
+    with FakeLLM() as service:
+        def ask(prompt):
+            body = {"model": "m", "messages": [{"role": "user", "content": prompt}]}
+            response = requests.post(f"{service.url}/v1/chat/completions", json=body, timeout=5).json()
+            assert response["usage"]["prompt_tokens"] > 0
+            return json.loads(response["choices"][0]["message"]["content"])
+
+        assert "创新点" in ask("请总结创新点")
+        assert ask("每个字段需要给出值和来源句子")["性能"]["value"] == "21.3%"
+        assert set(ask("输出结构：")) == {"info", "data"}
+
+
+def test_run_benchmark_reports_throughput_stage_latency_and_rss(settings):
+    config = BenchConfig(
+        docs=4,
+        workers=2,
+        paragraphs=8,
+        elsevier=FaultConfig(),
+        uniparser=FaultConfig(),
+        llm=FaultConfig(latency=0.01),
+    )
+    report = run_benchmark(settings, config)
+
+    assert report.docs == 4 and report.failed == 0
+    assert report.docs_per_minute > 0
+    assert set(report.stage_latency_s) == set(STAGES)
+    assert all(report.stage_latency_s[stage]["count"] == 4 for stage in STAGES)
+    assert report.requests["uniparser"]["requests"] == 4  # two PDFs: trigger + result each
+    assert report.llm_calls == report.requests["llm"]["requests"] == 8
+    assert report.prompt_tokens > 0
+    assert report.peak_rss_mb is None or report.peak_rss_mb > 0
+    assert "docs/min" in report.format()
+    # Nothing is written outside the temporary benchmark directory.
+    assert not settings.output_ledger.exists()
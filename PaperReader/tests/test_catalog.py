@@ -0,0 +1,92 @@
+from fastapi.testclient import TestClient
+
+from paperreader.io.catalog import ArtifactCatalog
+from paperreader.web import server
+
+
+def _fill(catalog):
+    catalog.upsert(
+        "10.1/a",
+        "k1",
+        "# Results\nThe perovskite cell reached a PCE of 21.4%.",
+        {"material_system": "钙钛矿太阳能电池", "performance": "效率 21.4%"},
+        [{"field": "性能", "value": "PCE 21.4%", "evidence": "reached a PCE of 21.4%"}],
+    )
+    catalog.upsert(
+        "10.1/b",
+        "k2",
+        "# Results\nA perovskite LED with EQE of 12%.",
+        {"material_system": "钙钛矿发光二极管"},
+        [{"field": "性能", "value": "12%", "evidence": None}, {"field": "材料", "value": "CsPbBr3"}],
+    )
+    catalog.upsert("10.1/c", "k3", "Silicon wafers annealed at 900 C.", {}, [])
+
+
+def test_fulltext_and_numeric_record_filters(tmp_path):
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite3")
+    _fill(catalog)
+
+    assert {hit.doi for hit in catalog.search("perovskite")} == {"10.1/a", "10.1/b"}
+    (hit,) = catalog.search("perovskite", field_name="性能", min_value=20)
+    assert hit.doi == "10.1/a"
+    assert hit.records == [{"field": "性能", "value": "PCE 21.4%", "evidence": "reached a PCE of 21.4%"}]
+    assert [h.doi for h in catalog.search("电池")] == ["10.1/a"]
+    assert [h.doi for h in catalog.search(field_name="材料")] == ["10.1/b"]
+
+
+def test_upsert_replaces_previous_rows(tmp_path):
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite3")
+    _fill(catalog)
+    assert catalog.is_current("10.1/a", "k1")
+
+    catalog.upsert("10.1/a", "k1b", "organic photovoltaics", {}, [{"field": "性能", "value": "9%"}])
+
+    assert not catalog.is_current("10.1/a", "k1")
+    assert len(catalog) == 3
+    assert [h.doi for h in catalog.search("perovskite")] == ["10.1/b"]
+    assert catalog.search(field_name="性能", min_value=20) == []
+
+
+def test_search_endpoint(settings, monkeypatch):
+    catalog = ArtifactCatalog(settings.output_catalog)
+    _fill(catalog)
+    catalog.close()
+    monkeypatch.setattr(server, "current_settings", lambda: settings)
+
+    response = TestClient(server.app).get(
+        "/search", params={"q": "perovskite", "field": "性能", "min_value": "20", "max_value": ""}
+    )
+
+    assert response.status_code == 200
+    assert [result["doi"] for result in response.json()["results"]] == ["10.1/a"]
+
+
+def test_short_terms_use_the_secondary_index(tmp_path):
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite3")
+    _fill(catalog)
+    if catalog.tokenizer != "trigram":
+        return
+
+    assert {h.doi for h in catalog.search("钛矿")} == {"10.1/a", "10.1/b"}
+    assert [h.doi for h in catalog.search("perovskite 电")] == ["10.1/a"]
+    assert [h.doi for h in catalog.search("LE")] == ["10.1/b"]
+    assert catalog.search("二 电池") == []
+
+    plan = catalog._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT doi FROM papers_grams WHERE papers_grams MATCH ?", ('"钛矿"',)
+    ).fetchall()
+    assert any("VIRTUAL TABLE INDEX" in str(row) for row in plan)
+
+
+def test_existing_trigram_catalog_is_backfilled(tmp_path):
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite3")
+    _fill(catalog)
+    if catalog.tokenizer != "trigram":
+        return
+    catalog._conn.execute("DROP TABLE papers_grams")
+    catalog._conn.commit()
+    catalog.close()
+
+    reopened = ArtifactCatalog(tmp_path / "catalog.sqlite3")
+    assert [h.doi for h in reopened.search("电池")] == ["10.1/a"]
+    assert [h.doi for h in reopened.search("二极")] == ["10.1/b"]
@@ -0,0 +1,64 @@
+from paperreader.cleaning.strip_metadata import strip_metadata
+from paperreader.llm.chunked_extract import extract_chunked, reduce_records
+from paperreader.llm.chunking import chunk_text
+from paperreader.llm.schemas import DataRecord
+from paperreader.llm.tokens import estimate_tokens
+
+
+def _long_text() -> str:
+    sections = [
+        {"heading": f"Section {i}", "text": " ".join(f"sentence {i}.{j}" for j in range(60))}
+        for i in range(6)
+    ]
+    return strip_metadata({"content": {"sections": sections}})["text"]
+
+
+def test_chunk_text_respects_budget_and_section_boundaries():
+    text = _long_text()
+    chunks = chunk_text(text, max_tokens=400)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 400 for chunk in chunks)
+    assert all(chunk.startswith("# Section") for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+
+def test_chunk_text_splits_oversized_section_and_repeats_heading():
+    paragraphs = "\n\n".join("word " * 200 for _ in range(4))
+    chunks = chunk_text(f"# Results\n{paragraphs}", max_tokens=300)
+
+    assert len(chunks) >= 4
+    assert all(chunk.startswith("# Results\n") for chunk in chunks)
+
+
+def test_reduce_records_is_deterministic_and_dedupes():
+    parts = [
+        [DataRecord("材料", "TiO2", "e1"), DataRecord("性能", None)],
+        [DataRecord("材料", "tio2 ", "e2"), DataRecord("性能", "21%", "e3")],
+    ]
+    merged = reduce_records(parts, {"材料": "", "工艺": "", "性能": ""})
+    assert [(r.field, r.value, r.evidence) for r in merged] == [
+        ("材料", "TiO2", "e1"),
+        ("工艺", None, None),
+        ("性能", "21%", "e3"),
+    ]
+
+
+class _EchoClient:
+    """Answers every data prompt with the section heading found in it."""
+
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        prompt = messages[-1]["content"]
+        heading = next(line for line in prompt.splitlines() if line.startswith("# Section"))
+        if "字段" in prompt:
+            return '{"材料": {"value": "%s", "evidence": null}}' % heading
+        return '{"材料体系": "%s"}' % heading
+
+
+def test_extract_chunked_merges_every_chunk_in_order():
+    result = extract_chunked(_EchoClient(), {"text": _long_text()}, fields={"材料": "材料"}, max_chunk_tokens=400)
+
+    values = [record.value for record in result.records]
+    assert values == sorted(values, key=lambda v: int(v.split()[-1]))
+    assert values[0] == "# Section 0"
+    assert result.info.material_system.startswith("# Section 0；")
@@ -0,0 +1,44 @@
+import json
+
+from paperreader.llm.combined_extract import extract_combined
+from paperreader.llm.data_extract import DEFAULT_FIELDS
+
+
+class _RecordingClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        self.calls.append({"messages": messages, "json_mode": json_mode})
+        return self.response
+
+
+def test_extract_combined_uses_one_json_mode_call():
+    response = json.dumps(
+        {
+            "info": {"材料体系": "钙钛矿", "创新点": "界面钝化"},
+            "data": {"性能": {"value": "PCE 21%", "evidence": "效率达到 21%"}, "材料": "FAPbI3"},
+        },
+        ensure_ascii=False,
+    )
+    client = _RecordingClient(response)
+
+    result = extract_combined(client, {"text": "正文"}, fields=DEFAULT_FIELDS)
+
+    assert len(client.calls) == 1
+    assert client.calls[0]["json_mode"] is True
+    assert result.info.material_system == "钙钛矿"
+    assert result.info.novelty == "界面钝化"
+    by_field = {record.field: record for record in result.records}
+    assert set(by_field) == set(DEFAULT_FIELDS)
+    assert by_field["性能"].value == "PCE 21%"
+    assert by_field["性能"].evidence == "效率达到 21%"
+    assert by_field["材料"].value == "FAPbI3"
+    assert by_field["工艺"].value is None
+
+
+def test_extract_combined_tolerates_invalid_json():
+    result = extract_combined(_RecordingClient("not json"), {"text": "正文"}, fields=DEFAULT_FIELDS)
+    assert result.info.material_system is None
+    assert [record.value for record in result.records] == [None, None, None]
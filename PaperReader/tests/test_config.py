@@ -0,0 +1,24 @@
+import os
+
+from paperreader import config
+
+
+def test_settings_reload_when_env_file_changes(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("PIPELINE_WORKERS=3\n", encoding="utf-8")
+    monkeypatch.setattr(os, "environ", {k: v for k, v in os.environ.items() if k != "PIPELINE_WORKERS"})
+    monkeypatch.setattr(config, "find_dotenv", lambda: str(env_file))
+    monkeypatch.setattr(config, "_dotenv_keys", set())
+    monkeypatch.setattr(config, "_cached_settings", None)
+
+    first = config.get_settings()
+    assert first.pipeline_workers == 3
+    assert config.get_settings() is first
+
+    env_file.write_text("PIPELINE_WORKERS=5\n", encoding="utf-8")
+    os.utime(env_file, ns=(0, env_file.stat().st_mtime_ns + 1_000_000_000))
+    assert config.get_settings().pipeline_workers == 5
+
+    # Removing the line falls back to the default rather than the stale value.
+    env_file.write_text("", encoding="utf-8")
+    assert config.reload_settings().pipeline_workers == 1
@@ -0,0 +1,115 @@
+import csv
+import random
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from paperreader.io.doi_loader import dedupe_dois, normalize_doi
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.dedup import _A, _B, NearDuplicateIndex, _permute, minhash, similarity
+
+
+def _text(seed, words=400):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "10.1016/J.Joule.2024.01.002",
+        "https://doi.org/10.1016/J.Joule.2024.01.002",
+        "http://dx.doi.org/10.1016/J.Joule.2024.01.002",
+        "doi:10.1016/J.Joule.2024.01.002",
+        "DOI: 10.1016/J.Joule.2024.01.002.",
+        " https://doi.org/10.1016%2FJ.Joule.2024.01.002 ",
+    ],
+)
+def test_normalize_doi_strips_resolvers_and_labels(value):
+    assert normalize_doi(value) == "10.1016/J.Joule.2024.01.002"
+
+
+def test_dedupe_keeps_first_spelling_and_non_dois():
+    values = ["https://doi.org/10.1/ABC", "doi:10.1/abc", "10.1/abc", "", "not a doi", "10.2/x"]
+    assert dedupe_dois(values) == ["10.1/ABC", "not a doi", "10.2/x"]
+
+
+def test_minhash_similarity_tracks_overlap():
+    base = _text(1)
+    edited = base.replace("word1 ", "changed ", 3)
+    assert minhash("too short") is None
+    assert similarity(minhash(base), minhash(base)) == 1.0
+    assert similarity(minhash(base), minhash(edited)) > 0.9
+    assert similarity(minhash(base), minhash(_text(2))) < 0.1
+
+
+def test_cjk_text_is_shingled_by_character():
+    rng = random.Random(5)
+    base = "".join(rng.choice("钙钛矿太阳能电池效率稳定性薄膜界面缺陷钝化载流子迁移率") for _ in range(600))
+    edited = base[:300] + "新增" + base[300:]
+    # Without spaces the whole text used to be a single \w+ "word", far below MIN_WORDS.
+    assert minhash(base) is not None
+    assert similarity(minhash(base), minhash(edited)) > 0.9
+    assert similarity(minhash(base), minhash(base[::-1])) < 0.5
+
+
+def test_permutations_match_exact_integer_arithmetic():
+    hashes = np.array([0, 1, 2**31, 2**32 - 1, 3_735_928_559], dtype=np.uint64)
+    expected = [[(int(a) * int(x) + int(b)) % ((1 << 61) - 1) for a, b in zip(_A, _B)] for x in hashes]
+    assert _permute(hashes[:, np.newaxis]).tolist() == expected
+
+
+def test_index_finds_near_duplicates_under_the_same_config(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "catalog.sqlite3", threshold=0.8)
+    base = _text(1)
+    index.add("10.1/a", minhash(base), "cfg")
+    index.add("10.1/b", minhash(_text(2)), "cfg")
+
+    near = minhash(base + " one more sentence at the end")
+    other, score = index.find("10.1/c", near, "cfg")
+    assert other == "10.1/a" and score >= 0.8
+    assert index.find("10.1/c", near, "other-cfg") is None
+    assert index.find("10.1/a", minhash(base), "cfg") is None  # never matches itself
+    assert index.find("10.1/c", minhash(_text(3)), "cfg") is None
+    index.close()
+
+
+def test_pipeline_reuses_extraction_of_near_duplicate(settings, monkeypatch):
+    settings = replace(settings, output_format="csv", near_duplicate_threshold=0.9)
+    body = _text(7)
+    texts = {"10.1/preprint": body, "10.1/published": body + " Published version.", "10.1/other": _text(8)}
+    extracted = []
+
+    class _FakeElsevier:
+        def __init__(self, **kwargs):
+            pass
+
+        def download_xml(self, doi, destination):
+            return None
+
+    def fake_parse(source, output_path, doi=None, **kwargs):
+        return {"content": {"sections": [{"heading": "Results", "text": texts[doi]}]}}
+
+    def fake_data(client, cleaned_doc, fields=None):
+        extracted.append(cleaned_doc["text"][:20])
+        return [DataRecord(field="性能", value=str(len(extracted)))]
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="x"))
+    monkeypatch.setattr(run, "extract_data", fake_data)
+
+    run.run_pipeline(settings, dois=["10.1/preprint", "doi:10.1/PREPRINT", "10.1/published", "10.1/other"])
+
+    # The duplicate spelling is dropped and the published version costs no extraction.
+    assert len(extracted) == 2
+    (output,) = settings.output_xlsx.glob("extracted_*.csv")
+    with output.open(encoding="utf-8-sig", newline="") as fh:
+        rows = {row["doi"]: (row["value"], row["duplicate_of"]) for row in csv.DictReader(fh)}
+    # Reused rows name the DOI whose extraction they copy.
+    assert rows == {"10.1/preprint": ("1", ""), "10.1/published": ("1", "10.1/preprint"), "10.1/other": ("2", "")}
+    manifest = run.StageCache(settings.output_cache).load("10.1/published")
+    assert manifest["duplicate_of"] == "10.1/preprint"
@@ -0,0 +1,69 @@
+import time
+
+from paperreader.ingestion.elsevier_api import ElsevierClient, RateLimitState, is_valid_xml
+
+XML = b"<?xml version='1.0'?><full-text-retrieval-response>body</full-text-retrieval-response>"
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 16):
+            yield self.body[start:start + 16]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        assert kwargs["stream"] is True
+        self.requested.append(url)
+        return self.responses.pop(0)
+
+
+def test_download_many_skips_valid_files_and_streams_new_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr("paperreader.ingestion.elsevier_api.time.sleep", lambda seconds: None)
+    existing = tmp_path / "10.1_old.xml"
+    existing.write_bytes(XML)
+    truncated = tmp_path / "10.1_cut.xml"
+    truncated.write_bytes(XML[:40])
+
+    session = _FakeSession(
+        [
+            _FakeResponse(429, headers={"Retry-After": "0"}),
+            _FakeResponse(200, XML, headers={"X-RateLimit-Remaining": "5"}),
+        ]
+    )
+    client = ElsevierClient(api_key="key", session=session, max_connections=1)
+
+    results = client.download_many(["10.1/old", "10.1/cut"], lambda doi: tmp_path / f"{doi.replace('/', '_')}.xml")
+
+    assert results["10.1/old"] == existing
+    assert results["10.1/cut"] == truncated
+    assert len(session.requested) == 2
+    assert is_valid_xml(truncated)
+    assert not list(tmp_path.glob("*.part"))
+    assert client.rate_limit.remaining == 5
+
+
+def test_rate_limit_state_blocks_until_reset(monkeypatch):
+    slept = []
+    monkeypatch.setattr("paperreader.ingestion.elsevier_api.time.sleep", slept.append)
+    state = RateLimitState()
+    state.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 30)})
+
+    state.wait()
+
+    assert slept and 25 < slept[0] <= 30
@@ -0,0 +1,132 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from paperreader.cleaning.strip_metadata import strip_metadata
+from paperreader.ingestion.elsevier_xml import parse_elsevier_xml, parse_many
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.cache import StageCache
+
+ARTICLE = """<?xml version="1.0" encoding="UTF-8"?>
+<full-text-retrieval-response xmlns="http://www.elsevier.com/xml/svapi/article/dtd"
+    xmlns:ce="http://www.elsevier.com/xml/common/dtd" xmlns:dc="http://purl.org/dc/elements/1.1/"
+    xmlns:prism="http://prismstandard.org/namespaces/basic/2.0/">
+  <coredata>
+    <prism:doi>10.1016/j.x.2024.1</prism:doi>
+    <dc:title>Stable perovskite cells</dc:title>
+    <dc:creator>Li, Wei</dc:creator>
+    <dc:creator>Chen, Yu</dc:creator>
+  </coredata>
+  <originalText><article><head>
+    <ce:abstract class="author"><ce:section-title>Abstract</ce:section-title>
+      <ce:abstract-sec><ce:simple-para>We report <ce:italic>stable</ce:italic> cells.</ce:simple-para></ce:abstract-sec>
+    </ce:abstract>
+    <ce:abstract class="author-highlights"><ce:section-title>Highlights</ce:section-title>
+      <ce:abstract-sec><ce:simple-para><ce:list>
+        <ce:list-item><ce:label>•</ce:label><ce:para>PCE of 21%.</ce:para></ce:list-item>
+      </ce:list></ce:simple-para></ce:abstract-sec>
+    </ce:abstract>
+    <ce:abstract class="graphical"><ce:section-title>Graphical abstract</ce:section-title>
+      <ce:abstract-sec><ce:simple-para><ce:display><ce:figure><ce:link locator="ga1"/></ce:figure></ce:display></ce:simple-para></ce:abstract-sec>
+    </ce:abstract>
+    <ce:keywords><ce:keyword><ce:text>perovskite</ce:text></ce:keyword></ce:keywords>
+  </head><body><ce:sections>
+    <ce:section><ce:label>1</ce:label><ce:section-title>Introduction</ce:section-title>
+      <ce:para>Perovskites <ce:cross-ref refid="b1">[1]</ce:cross-ref> are promising.</ce:para>
+    </ce:section>
+    <ce:section><ce:label>2</ce:label><ce:section-title>Results</ce:section-title>
+      <ce:section><ce:label>2.1</ce:label><ce:section-title>Efficiency</ce:section-title>
+        <ce:para>The champion cell reached 21.3%
+          <ce:table><ce:label>Table 1</ce:label><ce:caption><ce:simple-para>Device metrics.</ce:simple-para></ce:caption>
+            <tgroup><thead><row><entry>Device</entry><entry>PCE (%)</entry></row></thead>
+            <tbody><row><entry>A</entry><entry>21.3</entry></row></tbody></tgroup>
+          </ce:table> under AM1.5G.</ce:para>
+        <ce:para>See <ce:float-anchor refid="f1"/>Fig. 1.</ce:para>
+      </ce:section>
+    </ce:section>
+  </ce:sections></body>
+  <ce:floats><ce:figure id="f1"><ce:label>Fig. 1</ce:label>
+    <ce:caption><ce:simple-para>J–V curves.</ce:simple-para></ce:caption></ce:figure></ce:floats>
+  <tail><ce:bibliography><ce:section-title>References</ce:section-title>
+    <ce:bibliography-sec><ce:bib-reference><ce:label>[1]</ce:label><ce:other-ref><ce:textref>Ref one</ce:textref></ce:other-ref></ce:bib-reference></ce:bibliography-sec>
+  </ce:bibliography></tail>
+  </article></originalText>
+</full-text-retrieval-response>
+"""
+
+
+def _write(tmp_path, name="10.1_x.xml", text=ARTICLE):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_parse_maps_sections_tables_and_figures(tmp_path):
+    doc = parse_elsevier_xml(_write(tmp_path), doi="10.1/x")
+
+    assert doc["metadata"] == {"title": "Stable perovskite cells", "authors": ["Li, Wei", "Chen, Yu"], "doi": "10.1/x"}
+    assert doc["content"]["sections"] == [
+        {"heading": "Abstract", "text": "We report stable cells."},
+        {"heading": "Highlights", "text": "• PCE of 21%."},
+        {"heading": "1 Introduction", "text": "Perovskites [1] are promising."},
+        {"heading": "2 Results", "text": ""},
+        {"heading": "2.1 Efficiency", "text": "The champion cell reached 21.3% under AM1.5G.\nSee Fig. 1."},
+    ]
+    (table,) = doc["content"]["tables"]
+    assert table == {
+        "label": "Table 1",
+        "caption": "Device metrics.",
+        "rows": [["Device", "PCE (%)"], ["A", "21.3"]],
+        "footnotes": [],
+    }
+    assert {"label": "Fig. 1", "caption": "J–V curves."} in doc["content"]["figures"]
+    text = strip_metadata(doc)["text"]
+    assert "Ref one" not in text and "perovskite\n" not in text
+    assert text.startswith("# Abstract\nWe report stable cells.")
+
+
+def test_malformed_xml_yields_placeholder(tmp_path):
+    doc = parse_elsevier_xml(_write(tmp_path, text="<article><ce:para>cut"), doi="10.1/x")
+    assert doc["content"]["sections"] == []
+    assert doc["metadata"]["doi"] == "10.1/x"
+
+
+def test_parse_many_in_process_pool(tmp_path):
+    paths = [_write(tmp_path, f"{i}.xml") for i in range(3)]
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        docs = parse_many(paths, pool)
+    assert [len(doc["content"]["sections"]) for doc in docs] == [5, 5, 5]
+
+
+class _XmlElsevier:
+    def download_xml(self, doi, destination):
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text(ARTICLE, encoding="utf-8")
+        return destination
+
+
+class _FakeLLM:
+    stub = False
+
+
+def test_pipeline_parses_downloaded_xml_without_uniparser(settings, monkeypatch):
+    def no_remote(*args, **kwargs):
+        raise AssertionError("Uni-parser should not be called for parseable XML")
+
+    monkeypatch.setattr(run, "parse_document", no_remote)
+    monkeypatch.setattr(run, "clean_with_llm", no_remote)
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="perovskite"))
+    monkeypatch.setattr(run, "extract_data", lambda client, doc, fields=None: [DataRecord(field="性能", value="21.3%")])
+
+    ctx = run.RunContext(
+        settings=settings,
+        llm_client=_FakeLLM(),
+        elsevier=_XmlElsevier(),
+        limits=run.StageLimits.from_settings(settings),
+        cache=StageCache(settings.output_cache, from_stage=None),
+    )
+    rows = run._process_doi("10.1/x", ctx)
+
+    assert rows[0]["value"] == "21.3%"
+    cleaned = run.load_json(settings.output_cleaned / "10.1_x.json")
+    assert "# 2.1 Efficiency" in cleaned["text"]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from paperreader.ingestion import uniparser_adapter
+from paperreader.io.json_stream import read_json_fields, select_fields
+
+SPEC = {"metadata": True, "content": {"sections": True, "tables": True, "figures": True}}
+
+DOCUMENT = {
+    "objects": [{"text": 'quote " and } ] { [ \\ inside', "bbox": [1, 2.5, -3e2], "ok": True, "n": None}] * 500,
+    "content": {
+        "pages": ["page text"] * 50,
+        "sections": [{"heading": "结果", "text": "PCE 21%\n\"quoted\""}],
+        "tables": [],
+        "figures": [{"caption": "Fig. 1"}],
+    },
+    "metadata": {"doi": "10.1/x"},
+    "pages_dict": {str(i): {"w": 595} for i in range(200)},
+}
+EXPECTED = {
+    "metadata": {"doi": "10.1/x"},
+    "content": {k: DOCUMENT["content"][k] for k in ("sections", "tables", "figures")},
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("chunk_size", [5, 97, 1 << 20])
+def test_reads_only_selected_fields_across_chunk_boundaries(tmp_path, indent, chunk_size):
+    path = tmp_path / "parsed.json"
+    path.write_text(json.dumps(DOCUMENT, ensure_ascii=False, indent=indent), encoding="utf-8")
+
+    assert read_json_fields(path, SPEC, chunk_size=chunk_size) == EXPECTED
+    assert select_fields(DOCUMENT, SPEC) == EXPECTED
+
+
+def test_stops_reading_once_selected_fields_are_found(tmp_path):
+    path = tmp_path / "parsed.json"
+    # Everything after the selected keys is never looked at, even if it is cut off.
+    path.write_text('{"content": {"sections": [], "tables": [], "figures": []}, "metadata": {}, "objects": [1, 2', "utf-8")
+    assert read_json_fields(path, SPEC) == {"content": {"sections": [], "tables": [], "figures": []}, "metadata": {}}
+
+
+def test_malformed_input_raises_value_error(tmp_path):
+    path = tmp_path / "parsed.json"
+    path.write_text('{"objects": [1, 2', encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_json_fields(path, SPEC)
+    path.write_text("[1, 2]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_json_fields(path, SPEC)
+
+
+class _Response:
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode()
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        return None
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_parse_document_streams_result_to_disk_and_returns_content_only(tmp_path, monkeypatch):
+    source = tmp_path / "paper.pdf"
+    source.write_bytes(b"%PDF")
+    output = tmp_path / "parsed" / "paper.json"
+
+    def fake_post(url, **kwargs):
+        if url.endswith("/trigger-file-async"):
+            return _Response({"status": "success"})
+        assert kwargs["stream"] is True
+        return _Response(DOCUMENT)
+
+    monkeypatch.setattr(uniparser_adapter.requests, "post", fake_post)
+    monkeypatch.setattr(uniparser_adapter, "STREAM_CHUNK_SIZE", 1000)
+
+    result = uniparser_adapter.parse_document(source, output, doi="10.1/x", host="http://parser")
+
+    assert result == EXPECTED
+    # The artifact on disk keeps the full response, written once.
+    assert json.loads(output.read_text(encoding="utf-8")) == DOCUMENT
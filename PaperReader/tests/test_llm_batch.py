@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from paperreader.bench.runner import BenchConfig, run_benchmark
+from paperreader.bench.servers import FakeLLM, FaultConfig
+from paperreader.llm.batch import BatchAPI, BatchCollector, BatchPending, read_batch_output
+from paperreader.llm.client import LLMClient
+from paperreader.llm.data_extract import DEFAULT_FIELDS, extract_data
+from paperreader.llm.info_extract import extract_info
+from paperreader.llm.telemetry import MetricsRecorder, llm_context
+from paperreader.pipeline.tracing import REGISTRY
+
+
+def test_collector_defers_then_maps_batch_results_through_the_parsers(tmp_path):
+    doc = {"text": "The perovskite film reached a PCE of 21.3%."}
+    with FakeLLM() as service:
+        metrics = MetricsRecorder()
+        client = LLMClient(api_key="k", base_url=f"{service.url}/v1", model="gpt-4o-mini", metrics=metrics)
+        collector = BatchCollector(client)
+
+        with pytest.raises(BatchPending):
+            extract_info(collector, doc)
+        with pytest.raises(BatchPending):
+            extract_data(collector, doc, fields=DEFAULT_FIELDS)
+        requests = collector.drain()
+        assert len(requests) == 2 and collector.drain() == []
+
+        batch_api = BatchAPI(api_key="k", base_url=f"{service.url}/v1", poll_interval=0.01)
+        results = batch_api.run(requests, tmp_path / "batch.jsonl")
+        batch_api.close()
+        collector.resolve(results)
+        with llm_context(doi="10.1/a"):
+            info = extract_info(collector, doc)
+            records = extract_data(collector, doc, fields=DEFAULT_FIELDS)
+
+    assert info.novelty == "界面钝化"
+    assert {record.field: record.value for record in records}["性能"] == "21.3%"
+    # Nothing went through the real-time endpoint; the batch tokens are billed at the discount.
+    assert service.counts["batches"] == 1 and "completions" not in service.counts
+    lines = [json.loads(line) for line in (tmp_path / "batch.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert {line["url"] for line in lines} == {"/v1/chat/completions"}
+    assert all(record.batch and record.prompt_tokens > 0 for record in metrics.records)
+
+
+def test_custom_id_distinguishes_json_mode():
+    collector = BatchCollector(LLMClient(api_key="k", base_url="http://llm/v1"))
+    messages = [{"role": "user", "content": "请总结创新点"}]
+    for json_mode in (False, True):
+        with pytest.raises(BatchPending):
+            collector.chat(messages, json_mode=json_mode)
+
+    requests = collector.drain()
+    assert len({request.custom_id for request in requests}) == 2
+    assert [request.body.get("response_format") for request in requests] == [None, {"type": "json_object"}]
+
+
+def test_failed_batch_lines_are_sent_in_real_time():
+    ok = {"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "{}"}}]}}}
+    failed = {"custom_id": "b", "response": {"status_code": 500, "body": {}}, "error": None}
+    assert set(read_batch_output("\n".join(json.dumps(line) for line in (ok, failed)))) == {"a"}
+
+    with FakeLLM() as service:
+        collector = BatchCollector(LLMClient(api_key="k", base_url=f"{service.url}/v1"))
+        messages = [{"role": "user", "content": "请总结创新点"}]
+        with pytest.raises(BatchPending):
+            collector.chat(messages)
+        collector.drain()
+        collector.resolve({})
+        # The batch did not answer it, so the second attempt is a normal chat call.
+        assert "创新点" in json.loads(collector.chat(messages))
+        assert service.counts["requests"] == 1
+
+
+def test_pipeline_batch_mode_extracts_every_doi_in_one_batch(settings):
+    config = BenchConfig(
+        docs=4,
+        workers=2,
+        paragraphs=8,
+        batch=True,
+        batch_time=0.1,
+        elsevier=FaultConfig(),
+        uniparser=FaultConfig(),
+        llm=FaultConfig(),
+    )
+    errors = REGISTRY.errors.copy()
+    deferred = REGISTRY.interrupted[("extract_info", "deferred")]
+    report = run_benchmark(settings, config)
+
+    assert report.failed == 0
+    # Deferring to the batch is counted as such, not as a failed stage.
+    assert REGISTRY.errors == errors
+    assert REGISTRY.interrupted[("extract_info", "deferred")] == deferred + 4
+    assert report.requests["llm"]["batches"] == 1
+    # Info and data requests of all four papers travel in that single batch.
+    assert report.llm_calls == 8 and report.prompt_tokens > 0
+    assert all(report.stage_latency_s[stage]["count"] == 4 for stage in ("info", "data"))
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from paperreader.llm.client import LLMClient
+from paperreader.llm.rate_limit import TokenBucket, retry_after_seconds
+from paperreader.utils.retry import backoff_delay
+
+
+def _rate_limit_error(retry_after: str) -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://example.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_throttles_after_burst():
+    bucket = TokenBucket(per_minute=600, capacity=2)  # 10 tokens/s
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.08
+
+
+def test_backoff_honours_retry_after():
+    assert retry_after_seconds(_rate_limit_error("3")) == 3.0
+    assert 3.0 <= backoff_delay(0, retry_after=3.0, base=0.5) <= 3.5
+    assert 0 <= backoff_delay(4, base=1.0, cap=5.0) <= 5.0
+
+
+def test_chat_retries_on_429_and_refunds_failed_reservations(monkeypatch):
+    client = LLMClient(api_key="test-key", max_retries=2, tokens_per_minute=100_000)
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1:
+            raise _rate_limit_error("0")
+        message = SimpleNamespace(content='{"ok": true}')
+        usage = SimpleNamespace(total_tokens=10)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr("paperreader.llm.client.time.sleep", lambda delay: None)
+
+    assert client.chat([{"role": "user", "content": "hi"}]) == '{"ok": true}'
+    assert len(attempts) == 2
+    # Only the successful attempt's 10 tokens are charged against the bucket.
+    assert client._tpm._tokens > client._tpm.capacity - 11
+
+
+def _bad_request(message: str, param=None) -> openai.BadRequestError:
+    request = httpx.Request("POST", "https://example.com/v1/chat/completions")
+    response = httpx.Response(400, request=request)
+    body = {"error": {"message": message, "param": param}}
+    return openai.BadRequestError(message, response=response, body=body)
+
+
+def test_json_mode_is_disabled_only_when_response_format_is_rejected():
+    client = LLMClient(api_key="test-key")
+    errors = [_bad_request("maximum context length exceeded", param="messages")]
+
+    def create(**kwargs):
+        if errors:
+            raise errors.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))], usage=None)
+
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    with pytest.raises(openai.BadRequestError):
+        client.chat([{"role": "user", "content": "hi"}], json_mode=True)
+    assert client.json_mode_supported
+
+    errors.append(_bad_request("'response_format' of type 'json_object' is not supported", param="response_format"))
+    assert client.chat([{"role": "user", "content": "hi"}], json_mode=True) == "{}"
+    assert not client.json_mode_supported
+
+
+def test_achat_under_gather_retries_429_and_bounds_in_flight(monkeypatch):
+    client = LLMClient(api_key="test-key", max_retries=2, max_in_flight=2, tokens_per_minute=100_000)
+    attempts = []
+    in_flight = {"now": 0, "peak": 0}
+
+    async def create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        attempts.append(prompt)
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(0)
+            if attempts.count(prompt) == 1:
+                raise _rate_limit_error("0")
+            message = SimpleNamespace(content=prompt)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=SimpleNamespace(total_tokens=10))
+        finally:
+            in_flight["now"] -= 1
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(client, "_new_async_client", lambda: fake)
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr("paperreader.llm.client.asyncio.sleep", lambda delay: real_sleep(0))
+
+    async def run():
+        return await asyncio.gather(*(client.achat([{"role": "user", "content": f"p{i}"}]) for i in range(5)))
+
+    # Each asyncio.run is a fresh loop; the limiter must not be bound to the first one.
+    for _ in range(2):
+        attempts.clear()
+        assert asyncio.run(run()) == [f"p{i}" for i in range(5)]
+        assert len(attempts) == 10
+    assert in_flight["peak"] <= 2
+    assert client._tpm._tokens > client._tpm.capacity - 10 * 11
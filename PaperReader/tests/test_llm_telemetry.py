@@ -0,0 +1,66 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from paperreader.llm.client import LLMClient
+from paperreader.llm.data_extract import extract_data
+from paperreader.llm.info_extract import extract_info
+from paperreader.llm.telemetry import MetricsRecorder, record_call, llm_context
+
+
+class _MeteredClient:
+    def __init__(self, recorder, responses):
+        self.recorder = recorder
+        self.responses = list(responses)
+
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        record_call(self.recorder, model="gpt-4o-mini", prompt_tokens=1000, completion_tokens=200, latency_s=0.5)
+        return self.responses.pop(0)
+
+
+def test_calls_are_tagged_with_stage_doi_and_parse_outcome(tmp_path):
+    recorder = MetricsRecorder(tmp_path / "calls.jsonl")
+    client = _MeteredClient(recorder, ['{"材料体系": "TiO2"}', "not json"])
+
+    with llm_context(doi="10.1/abc"):
+        extract_info(client, {"text": "正文"})
+        extract_data(client, {"text": "正文"}, fields={"材料": "材料"})
+    recorder.close()
+
+    lines = [json.loads(line) for line in (tmp_path / "calls.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [(line["stage"], line["doi"], line["parse_ok"]) for line in lines] == [
+        ("info", "10.1/abc", True),
+        ("data", "10.1/abc", False),
+    ]
+
+    summary = recorder.summary()
+    assert summary.calls == 2
+    assert summary.parse_failures == 1
+    assert summary.documents == 1
+    assert summary.tokens_per_document == 2400
+    assert summary.p95_latency_s == 0.5
+    assert round(summary.cost_by_model["gpt-4o-mini"], 6) == round((2000 * 0.15 + 400 * 0.60) / 1e6, 6)
+    assert "p50 0.50s" in summary.format()
+
+
+def test_failed_calls_are_recorded_with_their_error(monkeypatch):
+    recorder = MetricsRecorder()
+    client = LLMClient(api_key="test-key", max_retries=1, metrics=recorder)
+    request = httpx.Request("POST", "https://example.com/v1/chat/completions")
+
+    def create(**kwargs):
+        raise openai.APIConnectionError(request=request)
+
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr("paperreader.llm.client.time.sleep", lambda delay: None)
+
+    with llm_context(stage="info", doi="10.1/abc"), pytest.raises(openai.APIConnectionError):
+        client.chat([{"role": "user", "content": "hi"}])
+
+    (record,) = recorder.records
+    assert (record.stage, record.doi, record.retries) == ("info", "10.1/abc", 1)
+    assert record.error.startswith("APIConnectionError")
+    assert recorder.summary().errors == 1
@@ -0,0 +1,116 @@
+from dataclasses import replace
+
+import pytest
+
+from paperreader.ingestion import local_pdf
+from paperreader.ingestion.local_pdf import assemble, parse_pdf
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.cache import StageCache
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+def _build_pdf(path):
+    document = pymupdf.open()
+    pages = [
+        [
+            ("Stable perovskite solar cells", 18, "hebo"),
+            ("Wei Li, Yu Chen", 10, "helv"),
+            ("Abstract", 12, "hebo"),
+            ("We report stable cells.", 10, "helv"),
+            ("1. Introduction", 12, "hebo"),
+            ("Perovskites are promising absorbers.", 10, "helv"),
+        ],
+        [
+            ("2. Results", 12, "hebo"),
+            ("The champion cell reached 21.3% PCE.", 10, "helv"),
+            ("Fig. 1. J-V curves of the champion device.", 9, "helv"),
+            ("Table 1 Device metrics.", 9, "helv"),
+        ],
+        [
+            ("3. Conclusions", 12, "hebo"),
+            ("Cells are stable.", 10, "helv"),
+            ("References", 12, "hebo"),
+            ("[1] Someone, Journal 2020.", 10, "helv"),
+        ],
+    ]
+    for number, lines in enumerate(pages, start=1):
+        page = document.new_page()
+        page.insert_text((50, 40), "Journal of Testing 12 (2024)", fontsize=8)
+        y = 80
+        for text, size, font in lines:
+            page.insert_text((50, y), text, fontsize=size, fontname=font)
+            y += 40
+        page.insert_text((300, 800), f"Page {number}", fontsize=8)
+    document.save(str(path))
+    return path
+
+
+EXPECTED_SECTIONS = [
+    {"heading": "Abstract", "text": "We report stable cells."},
+    {"heading": "1. Introduction", "text": "Perovskites are promising absorbers."},
+    {"heading": "2. Results", "text": "The champion cell reached 21.3% PCE."},
+    {"heading": "3. Conclusions", "text": "Cells are stable."},
+]
+
+
+def test_parse_pdf_detects_headings_and_captions(tmp_path):
+    doc = parse_pdf(_build_pdf(tmp_path / "paper.pdf"), doi="10.1/x")
+
+    assert doc["metadata"]["title"] == "Stable perovskite solar cells"
+    assert doc["metadata"]["doi"] == "10.1/x"
+    # Running header, page numbers, author line and references are dropped.
+    assert doc["content"]["sections"] == EXPECTED_SECTIONS
+    assert doc["content"]["figures"] == [{"label": "Fig. 1", "caption": "J-V curves of the champion device."}]
+    assert doc["content"]["tables"] == [{"label": "Table 1", "caption": "Device metrics.", "rows": []}]
+
+
+def test_pdfminer_backend_gives_same_structure(tmp_path):
+    path = _build_pdf(tmp_path / "paper.pdf")
+    doc = assemble(list(local_pdf._pdfminer_lines(path)))
+    assert doc["content"]["sections"] == EXPECTED_SECTIONS
+
+
+def test_unreadable_pdf_yields_placeholder(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    assert parse_pdf(broken, doi="10.1/x")["content"]["sections"] == []
+
+
+class _NoXml:
+    def download_xml(self, doi, destination):
+        return None
+
+
+class _FakeLLM:
+    stub = False
+
+
+@pytest.mark.parametrize("mode, remote_calls", [("local", 0), ("auto", 1)])
+def test_pipeline_uses_local_pdf_parser(settings, monkeypatch, mode, remote_calls):
+    settings = replace(settings, pdf_parser=mode)
+    settings.input_pdfs.mkdir(parents=True)
+    _build_pdf(settings.input_pdfs / "10.1_x.pdf")
+    calls = []
+
+    def unavailable_uniparser(source, output_path, doi=None, **kwargs):
+        calls.append(doi)
+        return {"metadata": {"doi": doi}, "content": {"sections": [], "tables": [], "figures": []}}
+
+    monkeypatch.setattr(run, "parse_document", unavailable_uniparser)
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="perovskite"))
+    monkeypatch.setattr(run, "extract_data", lambda client, doc, fields=None: [DataRecord(field="性能", value="21.3%")])
+    ctx = run.RunContext(
+        settings=settings,
+        llm_client=_FakeLLM(),
+        elsevier=_NoXml(),
+        limits=run.StageLimits.from_settings(settings),
+        cache=StageCache(settings.output_cache, from_stage=None),
+    )
+
+    run._process_doi("10.1/x", ctx)
+
+    assert len(calls) == remote_calls
+    cleaned = run.load_json(settings.output_cleaned / "10.1_x.json")
+    assert "# 2. Results\nThe champion cell reached 21.3% PCE." in cleaned["text"]
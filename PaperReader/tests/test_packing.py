@@ -0,0 +1,123 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from paperreader.llm.data_extract import DEFAULT_FIELDS
+from paperreader.llm import packing
+from paperreader.llm.packing import RequestPacker
+from paperreader.pipeline import run
+
+
+class _FakeLLM:
+    """Answers packed prompts per document ID; documents mentioning "garbled" get no section."""
+
+    stub = False
+    model = "fake"
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        prompt = messages[-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+        data = "来源句子" in prompt
+        if "=== 文档" not in prompt:
+            return json.dumps(self._answer(prompt, data), ensure_ascii=False)
+        blocks = re.split(r"=== 文档 (D\d+) ===\n", prompt)[1:]
+        answer = {
+            doc_id: self._answer(text, data) for doc_id, text in zip(blocks[::2], blocks[1::2]) if "garbled" not in text
+        }
+        return json.dumps(answer, ensure_ascii=False)
+
+    @staticmethod
+    def _answer(text, data):
+        name = re.search(r"paper (\w+)", text).group(1)
+        if data:
+            return {field: {"value": name, "evidence": text.strip()[:20]} for field in DEFAULT_FIELDS}
+        return {"材料体系": name, "工艺": None, "性能": None, "创新点": None}
+
+
+def _run_concurrently(packer, texts, kind="info"):
+    def extract(text):
+        doc = {"text": text}
+        return packer.extract_info(doc) if kind == "info" else packer.extract_data(doc)
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        return list(executor.map(extract, texts))
+
+
+def test_short_documents_share_one_request_and_split_back():
+    client = _FakeLLM()
+    packer = RequestPacker(client, max_tokens=2000, wait_seconds=1.0, max_docs=3)
+
+    infos = _run_concurrently(packer, ["paper alpha is short.", "paper beta is short.", "paper gamma is short."])
+
+    assert [info.material_system for info in infos] == ["alpha", "beta", "gamma"]
+    assert len(client.prompts) == 1
+
+    records = _run_concurrently(packer, ["paper delta text.", "paper eps text.", "paper zeta text."], kind="data")
+    assert [[record.value for record in doc] for doc in records] == [["delta"] * 3, ["eps"] * 3, ["zeta"] * 3]
+    assert len(client.prompts) == 2
+
+
+def test_unparsed_section_and_long_documents_are_sent_alone():
+    client = _FakeLLM()
+    packer = RequestPacker(client, max_tokens=200, wait_seconds=1.0, max_docs=2)
+
+    infos = _run_concurrently(packer, ["paper alpha is short.", "paper garbled is short."])
+    assert [info.material_system for info in infos] == ["alpha", "garbled"]
+    # One packed request, then the garbled document on its own with the normal prompt.
+    assert len(client.prompts) == 2 and "=== 文档" not in client.prompts[1]
+
+    long_info = packer.extract_info({"text": "paper long " + "words " * 400})
+    assert long_info.material_system == "long"
+    assert "=== 文档" not in client.prompts[-1]
+
+
+def test_pipeline_packs_short_papers_across_workers(settings, monkeypatch):
+    settings = replace(
+        settings, pipeline_workers=3, pack_max_tokens=2000, pack_wait_seconds=1.0, near_duplicate_threshold=0
+    )
+    dois = ["10.1/alpha", "10.1/beta", "10.1/gamma"]
+    client = _FakeLLM()
+
+    class _FakeElsevier:
+        def __init__(self, **kwargs):
+            pass
+
+        def download_xml(self, doi, destination):
+            return None
+
+    def fake_parse(source, output_path, doi=None, **kwargs):
+        name = doi.split("/")[1]
+        return {"content": {"sections": [{"heading": "Results", "text": f"The paper {name} reports 21%."}]}}
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(run, "LLMClient", lambda **kwargs: client)
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+
+    run.run_pipeline(replace(settings, output_format="csv"), dois=dois)
+
+    packed = [prompt for prompt in client.prompts if "=== 文档" in prompt]
+    assert len(packed) >= 2 and len(client.prompts) < 2 * len(dois)
+    for doi in dois:
+        records = run.StageCache(settings.output_cache).load(doi)["records"]
+        assert {record["value"] for record in records} == {doi.split("/")[1]}
+
+
+def test_documents_fall_back_to_single_requests_when_packing_breaks(monkeypatch):
+    def broken_prompt(documents):
+        raise RuntimeError("template bug")
+
+    monkeypatch.setattr(packing, "build_packed_info_prompt", broken_prompt)
+    client = _FakeLLM()
+    packer = RequestPacker(client, max_tokens=2000, wait_seconds=1.0, max_docs=2)
+
+    infos = _run_concurrently(packer, ["paper alpha is short.", "paper beta is short."])
+
+    assert [info.material_system for info in infos] == ["alpha", "beta"]
+    assert len(client.prompts) == 2 and all("=== 文档" not in prompt for prompt in client.prompts)
@@ -0,0 +1,27 @@
+import csv
+import time
+from dataclasses import replace
+
+from paperreader.pipeline import run
+
+
+def test_concurrent_run_streams_rows_and_isolates_failures(settings, monkeypatch):
+    dois = ["10.1/slow", "10.1/broken", "10.1/fast"]
+
+    def fake_process(doi, *args, **kwargs):
+        if doi == "10.1/broken":
+            raise RuntimeError("boom")
+        if doi == "10.1/slow":
+            time.sleep(0.05)
+        return [{"field": "材料", "value": doi, "evidence": None, "doi": doi}]
+
+    monkeypatch.setattr(run, "load_doi_list", lambda path: dois)
+    monkeypatch.setattr(run, "_process_doi", fake_process)
+
+    run.run_pipeline(replace(settings, pipeline_workers=3, output_format="csv"))
+
+    (output,) = settings.output_xlsx.glob("extracted_*.csv")
+    with output.open(encoding="utf-8-sig", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    # The fast DOI is written first because rows are appended on completion.
+    assert [row["doi"] for row in rows] == ["10.1/fast", "10.1/slow"]
@@ -0,0 +1,106 @@
+from dataclasses import replace
+
+from paperreader.cleaning.strip_metadata import strip_metadata
+from paperreader.llm.data_extract import DEFAULT_FIELDS
+from paperreader.llm.relevance import bm25_scores, select_relevant, tokenize
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.llm.tokens import estimate_tokens
+from paperreader.pipeline import run
+
+INTRODUCTION = "Solar energy is an important topic and many groups have studied it over the past decades. " * 20
+RELATED = "Previous reviews summarised the history of the field and open questions for the community. " * 20
+EXPERIMENTAL = (
+    "The perovskite film was deposited by spin coating the precursor solution at 4000 rpm "
+    "and annealed at 100 °C for 10 min. "
+) * 8
+RESULTS = "The device achieved a power conversion efficiency (PCE) of 23.1% with improved stability. " * 8
+
+
+def _document():
+    return strip_metadata(
+        {
+            "content": {
+                "sections": [
+                    {"heading": "1. Introduction", "text": INTRODUCTION},
+                    {"heading": "2. Related work", "text": RELATED},
+                    {"heading": "3. Experimental", "text": EXPERIMENTAL},
+                    {"heading": "4. Results and discussion", "text": RESULTS},
+                ],
+                "tables": [{"label": "Table 1", "caption": "Photovoltaic parameters of the devices", "rows": []}],
+                "figures": [{"label": "Fig. 1", "caption": "Photograph of the laboratory"}],
+            }
+        }
+    )
+
+
+def test_tokenize_stems_words_and_marks_numbers():
+    assert tokenize("Films annealed at 100 °C") == ["film", "anneal", "at", "<num>"]
+    assert tokenize("材料体系") == ["材料", "料体", "体系"]
+
+
+def test_bm25_prefers_documents_with_query_terms():
+    scores = bm25_scores([["film", "anneal"], ["history", "review"], ["film", "history"]], ["film", "anneal"])
+    assert scores[0] > scores[2] > scores[1] == 0
+
+
+def test_select_relevant_keeps_experimental_and_results_within_budget():
+    doc = _document()
+    budget = estimate_tokens(EXPERIMENTAL) + estimate_tokens(RESULTS) + 40
+    selection = select_relevant(doc, DEFAULT_FIELDS, budget)
+
+    assert "# 3. Experimental" in selection.text and "# 4. Results and discussion" in selection.text
+    assert "Introduction" not in selection.text and "Related work" not in selection.text
+    # Kept blocks stay in document order.
+    assert selection.text.index("Experimental") < selection.text.index("Results")
+    assert selection.tokens_kept <= budget
+    assert selection.ratio < 0.5
+    assert selection.blocks_total == 6
+
+
+def test_select_relevant_keeps_short_documents_whole_and_cuts_an_oversized_best_block():
+    doc = _document()
+    whole = select_relevant(doc, DEFAULT_FIELDS, 100_000)
+    assert whole.ratio == 1.0 and whole.blocks_kept == whole.blocks_total
+    assert whole.text == doc["text"]
+
+    tiny = select_relevant({"text": "# Results\n" + "\n\n".join([RESULTS] * 4)}, DEFAULT_FIELDS, 200)
+    assert tiny.blocks_kept == 1 and 0 < tiny.tokens_kept <= 200
+
+
+def test_pipeline_sends_pruned_text_to_data_prompt(settings, monkeypatch):
+    settings = replace(settings, output_format="csv", relevance_max_tokens=estimate_tokens(EXPERIMENTAL + RESULTS) + 40)
+    prompts = {}
+
+    class _FakeElsevier:
+        def __init__(self, **kwargs):
+            pass
+
+        def download_xml(self, doi, destination):
+            return None
+
+    def fake_parse(source, output_path, doi=None, **kwargs):
+        return {"content": {"sections": [
+            {"heading": "1. Introduction", "text": INTRODUCTION},
+            {"heading": "3. Experimental", "text": EXPERIMENTAL},
+            {"heading": "4. Results", "text": RESULTS},
+        ]}}
+
+    def fake_info(client, doc):
+        prompts["info"] = doc["text"]
+        return InfoExtraction(material_system="x")
+
+    def fake_data(client, doc, fields=None):
+        prompts["data"] = doc["text"]
+        return [DataRecord(field="性能", value="23.1%")]
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+    monkeypatch.setattr(run, "extract_info", fake_info)
+    monkeypatch.setattr(run, "extract_data", fake_data)
+
+    run.run_pipeline(settings, dois=["10.1/a"])
+
+    assert "Introduction" in prompts["info"]
+    assert "Introduction" not in prompts["data"] and "Experimental" in prompts["data"]
+    manifest = run.StageCache(settings.output_cache).load("10.1/a")
+    assert manifest["relevance"]["blocks_kept"] == 2 and manifest["relevance"]["ratio"] < 1
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from paperreader.llm.response_cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "提取材料"}]
+
+
+def test_cache_hits_misses_and_keying(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.sqlite3")
+    assert cache.get("m", MESSAGES, 0.2) is None
+    cache.put("m", MESSAGES, 0.2, '{"材料": "TiO2"}')
+
+    assert cache.get("m", MESSAGES, 0.2) == '{"材料": "TiO2"}'
+    assert cache.get("m", MESSAGES, 0.7) is None
+    assert cache.get("other", MESSAGES, 0.2) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+
+    json_format = {"type": "json_object"}
+    assert cache.get("m", MESSAGES, 0.2, response_format=json_format) is None
+    assert cache.get("m", MESSAGES, 0.2, base_url="http://other/v1") is None
+    cache.put("m", MESSAGES, 0.2, '{"json": 1}', base_url="http://other/v1", response_format=json_format)
+    assert cache.get("m", MESSAGES, 0.2, base_url="http://other/v1/", response_format=json_format) == '{"json": 1}'
+    assert cache.get("m", MESSAGES, 0.2) == '{"材料": "TiO2"}'
+
+
+def test_cache_evicts_by_age_and_size(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.sqlite3", max_entries=3, max_age_seconds=None)
+    for i in range(5):
+        cache.put("m", [{"role": "user", "content": str(i)}], 0.2, str(i))
+    cache.prune()
+    assert len(cache) == 3
+    assert cache.get("m", [{"role": "user", "content": "0"}], 0.2) is None
+    assert cache.get("m", [{"role": "user", "content": "4"}], 0.2) == "4"
+
+    cache.max_age_seconds = -1
+    assert cache.get("m", [{"role": "user", "content": "4"}], 0.2) is None
+    cache.prune()
+    assert len(cache) == 0
+
+
+def test_cache_is_safe_across_threads(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.sqlite3")
+
+    def work(i):
+        messages = [{"role": "user", "content": str(i % 10)}]
+        cache.put("m", messages, 0.2, str(i % 10))
+        return cache.get("m", messages, 0.2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(work, range(200)))
+    assert results == [str(i % 10) for i in range(200)]
+    assert len(cache) == 10
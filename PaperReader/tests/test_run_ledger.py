@@ -0,0 +1,178 @@
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+from openpyxl import load_workbook
+
+from paperreader.io.catalog import ArtifactCatalog
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.ledger import RunLedger
+
+
+class _FakeElsevier:
+    def __init__(self, **kwargs):
+        pass
+
+    def download_xml(self, doi, destination):
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text("<article>body</article>", encoding="utf-8")
+        return destination
+
+
+def test_resume_skips_finished_dois_and_continues_after_a_crash(settings, monkeypatch):
+    settings = replace(settings, output_format="csv")
+    dois = ["10.1/a", "10.1/b", "10.1/c"]
+    calls = {"parse": [], "data": []}
+    broken = {"10.1/b": RuntimeError("llm down"), "10.1/c": KeyboardInterrupt()}
+
+    def fake_parse(source, output_path, doi=None, **kwargs):
+        calls["parse"].append(doi)
+        return {"content": {"sections": [{"heading": "Results", "text": f"PCE of {doi}"}]}}
+
+    def fake_data(client, cleaned_doc, fields=None):
+        doi = cleaned_doc["text"].split()[-1]
+        calls["data"].append(doi)
+        if doi in broken:
+            raise broken.pop(doi)
+        return [DataRecord(field="性能", value=doi)]
+
+    monkeypatch.setattr(run, "load_doi_list", lambda path: dois)
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="x"))
+    monkeypatch.setattr(run, "extract_data", fake_data)
+
+    with pytest.raises(KeyboardInterrupt):
+        run.run_pipeline(settings)
+
+    ledger = RunLedger(settings.output_ledger)
+    (info,) = ledger.list_runs()
+    # Ctrl-C escaped the run, so it is marked cancelled and stays resumable.
+    assert (info.status, info.done, info.failed) == ("cancelled", 1, 1)
+    ledger.close()
+
+    calls = {"parse": [], "data": []}
+    run.run_pipeline(settings, resume=info.run_id)
+
+    # Only the unfinished DOIs reach the LLM again, and their parse results are reused.
+    assert calls == {"parse": [], "data": ["10.1/b", "10.1/c"]}
+    ledger = RunLedger(settings.output_ledger)
+    resumed = ledger.get_run(info.run_id)
+    assert (resumed.status, resumed.done, resumed.failed) == ("completed", 3, 0)
+    ledger.close()
+
+    output = settings.output_xlsx / f"extracted_{info.run_id}.csv"
+    with output.open(encoding="utf-8-sig", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert sorted(row["value"] for row in rows) == dois
+
+    catalog = ArtifactCatalog(settings.output_catalog)
+    assert sorted(hit.doi for hit in catalog.search("PCE", field_name="性能")) == dois
+    catalog.close()
+
+
+def test_resume_rejects_unknown_run(settings):
+    with pytest.raises(ValueError):
+        run.run_pipeline(settings, resume="nope")
+
+
+def test_cancel_stops_at_stage_boundary_and_run_stays_resumable(settings, monkeypatch):
+    settings = replace(settings, output_format="csv", pipeline_workers=1)
+    dois = ["10.1/a", "10.1/b", "10.1/c"]
+    cancel = threading.Event()
+    events = []
+
+    def on_event(event, data):
+        events.append((event, data.get("doi")))
+        if event == "doi_done":
+            cancel.set()
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(
+        run,
+        "parse_document",
+        lambda source, output_path, doi=None, **kw: {"content": {"sections": [{"heading": "Results", "text": doi}]}},
+    )
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="x"))
+    monkeypatch.setattr(run, "extract_data", lambda client, doc, fields=None: [DataRecord(field="性能", value="1")])
+
+    run.run_pipeline(settings, dois=dois, on_event=on_event, cancel_event=cancel)
+
+    assert ("doi_done", "10.1/a") in events
+    assert events[-1] == ("run_finished", None)
+    ledger = RunLedger(settings.output_ledger)
+    (info,) = ledger.list_runs()
+    assert (info.status, info.done) == ("cancelled", 1)
+    assert ledger.dois(info.run_id, status="pending") == ["10.1/b", "10.1/c"]
+    ledger.close()
+
+    run.run_pipeline(settings, resume=info.run_id)
+    ledger = RunLedger(settings.output_ledger)
+    assert ledger.get_run(info.run_id).done == 3
+    ledger.close()
+
+
+def test_escaping_error_still_writes_xlsx_rows_and_fails_the_run(settings, monkeypatch):
+    settings = replace(settings, output_format="xlsx", pipeline_workers=1)
+
+    def fake_data(client, cleaned_doc, fields=None):
+        if "10.1/b" in cleaned_doc["text"]:
+            raise SystemExit("batch API down")
+        return [DataRecord(field="性能", value="1")]
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(
+        run,
+        "parse_document",
+        lambda source, output_path, doi=None, **kw: {"content": {"sections": [{"heading": "Results", "text": doi}]}},
+    )
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="x"))
+    monkeypatch.setattr(run, "extract_data", fake_data)
+
+    with pytest.raises(SystemExit):
+        run.run_pipeline(settings, dois=["10.1/a", "10.1/b"])
+
+    ledger = RunLedger(settings.output_ledger)
+    (info,) = ledger.list_runs()
+    assert (info.status, info.done) == ("failed", 1)
+    ledger.close()
+    workbook = load_workbook(settings.output_xlsx / f"extracted_{info.run_id}.xlsx", read_only=True)
+    assert [row[-1] for row in workbook["records"].iter_rows(min_row=2, values_only=True)] == ["10.1/a"]
+
+
+def test_resume_restores_the_runs_output_settings(settings, monkeypatch):
+    seen = []
+
+    def fake_process(doi, ctx):
+        seen.append((ctx.settings.extraction_mode, ctx.settings.relevance_max_tokens, ctx.settings.output_format))
+        if len(seen) == 1:
+            raise KeyboardInterrupt()
+        return []
+
+    monkeypatch.setattr(run, "_process_doi", fake_process)
+    started = replace(settings, output_format="csv", extraction_mode="combined", relevance_max_tokens=777)
+    with pytest.raises(KeyboardInterrupt):
+        run.run_pipeline(started, dois=["10.1/a"])
+    ledger = RunLedger(settings.output_ledger)
+    (info,) = ledger.list_runs()
+    assert info.settings["extraction_mode"] == "combined"
+    ledger.close()
+
+    run.run_pipeline(replace(settings, relevance_max_tokens=5), resume=info.run_id)
+
+    assert seen == [("combined", 777, "csv")] * 2
+
+
+def test_runs_started_in_the_same_second_get_distinct_ids(settings, monkeypatch):
+    monkeypatch.setattr(run, "_process_doi", lambda doi, ctx: [])
+    settings = replace(settings, output_format="csv")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda doi: run.run_pipeline(settings, dois=[doi]), ["10.1/a", "10.1/b"]))
+
+    ledger = RunLedger(settings.output_ledger)
+    assert len({info.run_id for info in ledger.list_runs()}) == 2
+    ledger.close()
@@ -0,0 +1,54 @@
+import csv
+
+import pytest
+from openpyxl import load_workbook
+
+from paperreader.config import load_settings
+from paperreader.io import sinks
+from paperreader.io.sinks import COLUMNS, open_sink
+
+
+ROWS = [
+    {"field": "材料", "value": "TiO2", "evidence": "Table 1", "doi": "10.1/a"},
+    {"field": "温度", "value": [300, 400], "evidence": None, "doi": "10.1/a"},
+]
+
+
+def test_csv_sink_is_readable_before_close(tmp_path):
+    path = tmp_path / "out.csv"
+    sink = open_sink("csv", path)
+    sink.write_rows(ROWS)
+
+    with path.open(encoding="utf-8-sig", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    sink.close()
+
+    assert [row["value"] for row in rows] == ["TiO2", "[300, 400]"]
+    assert rows[1]["evidence"] == ""
+
+
+def test_xlsx_sink_writes_header_and_rows(tmp_path):
+    path = tmp_path / "out.xlsx"
+    with open_sink("xlsx", path) as sink:
+        sink.write_rows(ROWS[:1])
+        sink.write_rows([])
+        sink.write_rows(ROWS[1:])
+
+    sheet = load_workbook(path).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert values[0] == COLUMNS
+    assert values[1] == ("材料", "TiO2", "Table 1", "10.1/a", None)
+    assert sink.rows_written == 2
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink("json", tmp_path / "out.json")
+
+
+def test_parquet_without_pyarrow_is_rejected_when_settings_load(monkeypatch):
+    monkeypatch.setattr(sinks.importlib.util, "find_spec", lambda name: None)
+    monkeypatch.setenv("OUTPUT_FORMAT", "parquet")
+
+    with pytest.raises(ValueError, match="pyarrow"):
+        load_settings()
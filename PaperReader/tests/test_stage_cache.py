@@ -0,0 +1,84 @@
+import threading
+import time
+
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.cache import StageCache
+
+
+class _FakeElsevier:
+    def __init__(self):
+        self.calls = 0
+
+    def download_xml(self, doi, destination):
+        self.calls += 1
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text("<article>body</article>", encoding="utf-8")
+        return destination
+
+
+class _FakeLLM:
+    stub = False
+
+
+def test_rerun_reuses_unchanged_stages_and_from_stage_forces_downstream(settings, monkeypatch):
+    calls = {"parse": 0, "info": 0, "data": 0}
+
+    def fake_parse(source, output_path, **kwargs):
+        calls["parse"] += 1
+        return {"content": {"sections": [{"heading": "Results", "text": "PCE 21%"}]}}
+
+    def fake_info(client, cleaned_doc):
+        calls["info"] += 1
+        return InfoExtraction(material_system="perovskite")
+
+    def fake_data(client, cleaned_doc, fields=None):
+        calls["data"] += 1
+        return [DataRecord(field="性能", value="21%")]
+
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+    monkeypatch.setattr(run, "extract_info", fake_info)
+    monkeypatch.setattr(run, "extract_data", fake_data)
+
+    elsevier = _FakeElsevier()
+    limits = run.StageLimits.from_settings(settings)
+
+    def process(from_stage=None):
+        cache = StageCache(settings.output_cache, from_stage=from_stage)
+        ctx = run.RunContext(settings=settings, llm_client=_FakeLLM(), elsevier=elsevier, limits=limits, cache=cache)
+        return run._process_doi("10.1/abc", ctx)
+
+    first = process()
+    second = process()
+    assert first == second
+    assert calls == {"parse": 1, "info": 1, "data": 1}
+    assert elsevier.calls == 1
+
+    process(from_stage="info")
+    assert calls == {"parse": 1, "info": 2, "data": 2}
+
+    process(from_stage="download")
+    assert calls == {"parse": 2, "info": 3, "data": 3}
+    assert elsevier.calls == 2
+
+
+def test_manifest_lock_is_shared_across_cache_instances(tmp_path):
+    from paperreader.pipeline import cache as cache_module
+
+    first, second = StageCache(tmp_path), StageCache(tmp_path)
+    order = []
+
+    def worker(stage_cache, name):
+        with stage_cache.locked("10.1/x"):
+            order.append(f"{name}-in")
+            time.sleep(0.05)
+            order.append(f"{name}-out")
+
+    threads = [threading.Thread(target=worker, args=(c, n)) for c, n in ((first, "a"), (second, "b"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert order in (["a-in", "a-out", "b-in", "b-out"], ["b-in", "b-out", "a-in", "a-out"])
+    assert cache_module._MANIFEST_LOCKS == {}
@@ -0,0 +1,110 @@
+import json
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from paperreader.llm.schemas import DataRecord, InfoExtraction
+from paperreader.pipeline import run
+from paperreader.pipeline.tracing import MetricsRegistry, Tracer
+from paperreader.web import server
+from paperreader.web.jobs import JobManager
+
+
+def test_spans_feed_histograms_errors_and_per_doi_timings():
+    registry = MetricsRegistry()
+    tracer = Tracer(registry, per_doi=True)
+
+    with tracer.span("download", "10.1/a"):
+        pass
+    with pytest.raises(RuntimeError):
+        with tracer.span("download", "10.1/a"):
+            raise RuntimeError("boom")
+    with tracer.span("export"):
+        pass
+
+    assert registry.durations["download"].count == 2
+    assert registry.errors == {"download": 1}
+    assert set(tracer.take("10.1/a")) == {"download"}
+    assert tracer.take("10.1/a") == {}
+
+    registry.count_doi("done")
+    registry.add_gauge("paperreader_dois_pending", 3)
+    text = registry.render({"paperreader_web_jobs": {(("status", "running"),): 1}})
+    assert 'paperreader_stage_duration_seconds_bucket{stage="download",le="+Inf"} 2' in text
+    assert 'paperreader_stage_duration_seconds_count{stage="export"} 1' in text
+    assert 'paperreader_stage_errors_total{stage="download"} 1' in text
+    assert 'paperreader_dois_total{status="done"} 1' in text
+    assert "paperreader_dois_pending 3" in text
+    assert 'paperreader_web_jobs{status="running"} 1' in text
+
+
+def test_registered_control_flow_exceptions_are_not_errors():
+    class Deferred(Exception):
+        pass
+
+    registry = MetricsRegistry()
+    tracer = Tracer(registry, outcomes={Deferred: "deferred", KeyboardInterrupt: "cancelled"})
+
+    with pytest.raises(Deferred):
+        with tracer.span("extract_info"):
+            raise Deferred()
+    with pytest.raises(KeyboardInterrupt):
+        with tracer.span("extract_data"):
+            raise KeyboardInterrupt()
+    with pytest.raises(ValueError):
+        with tracer.span("extract_data"):
+            raise ValueError("bad json")
+
+    assert registry.errors == {"extract_data": 1}
+    assert registry.interrupted == {("extract_info", "deferred"): 1, ("extract_data", "cancelled"): 1}
+    assert "extract_info" not in registry.durations
+    text = registry.render()
+    assert 'paperreader_stage_interrupted_total{stage="extract_info",outcome="deferred"} 1' in text
+
+
+def test_profile_writes_stage_timings_per_doi(settings, monkeypatch):
+    settings = replace(settings, output_format="csv", near_duplicate_threshold=0)
+
+    class _FakeElsevier:
+        def __init__(self, **kwargs):
+            pass
+
+        def download_xml(self, doi, destination):
+            return None
+
+    def fake_parse(source, output_path, doi=None, **kwargs):
+        if doi == "10.1/broken":
+            raise RuntimeError("parser down")
+        return {"content": {"sections": [{"heading": "Results", "text": "PCE 21%"}]}}
+
+    monkeypatch.setattr(run, "ElsevierClient", _FakeElsevier)
+    monkeypatch.setattr(run, "parse_document", fake_parse)
+    monkeypatch.setattr(run, "extract_info", lambda client, doc: InfoExtraction(material_system="x"))
+    monkeypatch.setattr(run, "extract_data", lambda client, doc, fields=None: [DataRecord(field="性能", value="21%")])
+
+    run.run_pipeline(settings, dois=["10.1/ok", "10.1/broken"], profile=True)
+
+    (report,) = settings.output_metrics.glob("timings_*.jsonl")
+    lines = {line["doi"]: line for line in map(json.loads, report.read_text(encoding="utf-8").splitlines())}
+    assert lines["10.1/ok"]["status"] == "done"
+    assert {"download", "parse_document", "extract_info", "extract_data", "export"} <= set(lines["10.1/ok"]["stages"])
+    assert lines["10.1/broken"]["status"] == "failed"
+    assert "extract_data" not in lines["10.1/broken"]["stages"]
+
+
+def test_metrics_endpoint_exposes_prometheus_text(settings, monkeypatch):
+    def runner(settings, dois=None, on_event=None, cancel_event=None):
+        on_event("run_finished", {"status": "completed", "output": "out.csv"})
+
+    manager = JobManager(max_workers=1, runner=runner)
+    monkeypatch.setattr(server, "jobs", manager)
+    manager.submit(settings, dois=["10.1/a"]).future.result(timeout=5)
+
+    response = TestClient(server.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE paperreader_stage_duration_seconds histogram" in response.text
+    assert 'paperreader_web_jobs{status="completed"} 1' in response.text
+    manager.shutdown()
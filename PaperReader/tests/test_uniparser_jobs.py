@@ -0,0 +1,286 @@
+import json as json_module
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from paperreader.ingestion.uniparser_jobs import UniParserJobQueue
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        return None
+
+    def iter_content(self, chunk_size):
+        yield json_module.dumps(self.payload).encode()
+
+
+class _FakeParserServer:
+    """Finishes job N after it has been polled N times; tracks concurrent jobs."""
+
+    def __init__(self, per_job_tokens=True):
+        self.per_job_tokens = per_job_tokens
+        self.lock = threading.Lock()
+        self.polls = {}
+        self.active = 0
+        self.max_active = 0
+        self.latest = None
+
+    def post(self, url, files=None, data=None, json=None, timeout=None, stream=False):
+        with self.lock:
+            if url.endswith("/trigger-file-async"):
+                assert data["sync"] is False
+                name = files["file"].name.rsplit("/", 1)[-1]
+                self.polls[name] = 0
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+                self.latest = name
+                if not self.per_job_tokens:
+                    return _FakeResponse({"status": "success"})
+                return _FakeResponse({"status": "success", "token": name})
+
+            # Without per-job tokens the server can only answer for the latest upload.
+            token = json["token"] if self.per_job_tokens else self.latest
+            self.polls[token] += 1
+            if self.polls[token] < int(token.split(".")[0]):
+                return _FakeResponse({"status": "processing"})
+            self.active -= 1
+            return _FakeResponse(
+                {"content": {"sections": [{"heading": token, "text": "body"}]}, "objects": [{"page": 1}]}
+            )
+
+
+def test_parse_many_bounds_in_flight_jobs_and_yields_as_completed(tmp_path):
+    sources = []
+    for n in (3, 1, 2, 1):
+        path = tmp_path / f"{n}.{len(sources)}.pdf"
+        path.write_bytes(b"%PDF")
+        sources.append(path)
+    server = _FakeParserServer()
+    jobs = UniParserJobQueue(host="http://parser", max_in_flight=2, poll_interval=0.01, session=server)
+
+    results = list(jobs.parse_many((source, source.with_suffix(".json"), None) for source in sources))
+    jobs.close()
+
+    assert sorted(source for source, _ in results) == sorted(sources)
+    assert [source.name for source, _ in results][0].startswith("1.")
+    assert server.max_active <= 2
+    for source, result in results:
+        assert result["content"]["sections"][0]["heading"] == source.name
+        # The future holds only the parsed fields; the file keeps the full response.
+        assert "objects" not in result
+        assert json_module.loads(source.with_suffix(".json").read_text(encoding="utf-8"))["objects"] == [{"page": 1}]
+
+
+def test_jobs_without_per_job_tokens_run_one_at_a_time(tmp_path):
+    sources = []
+    for n in (2, 1, 3):
+        path = tmp_path / f"{n}.{len(sources)}.pdf"
+        path.write_bytes(b"%PDF")
+        sources.append(path)
+    server = _FakeParserServer(per_job_tokens=False)
+    jobs = UniParserJobQueue(host="http://parser", token="shared-q", max_in_flight=3, poll_interval=0.01, session=server)
+
+    results = list(jobs.parse_many((source, source.with_suffix(".json"), None) for source in sources))
+    jobs.close()
+
+    assert server.max_active == 1
+    for source, result in results:
+        assert result["content"]["sections"][0]["heading"] == source.name
+
+
+def test_poller_failure_fails_pending_futures(tmp_path):
+    source = tmp_path / "1.0.pdf"
+    source.write_bytes(b"%PDF")
+    server = _FakeParserServer()
+    jobs = UniParserJobQueue(host="http://parser", poll_interval=0.01, session=server)
+
+    def broken_fetch(job):
+        raise RuntimeError("poller bug")
+
+    jobs._fetch = broken_fetch
+    future = jobs.submit(source, tmp_path / "1.0.json", doi="10.1/x")
+
+    with pytest.raises(RuntimeError, match="poller bug"):
+        future.result(timeout=5)
+    assert jobs._jobs == []
+
+
+def test_missing_source_resolves_to_placeholder(tmp_path):
+    jobs = UniParserJobQueue(host="http://parser", session=_FakeParserServer())
+    output = tmp_path / "missing.json"
+    result = jobs.submit(tmp_path / "missing.pdf", output, doi="10.1/x").result()
+    assert result["metadata"]["doi"] == "10.1/x"
+    assert json_module.loads(output.read_text(encoding="utf-8")) == result
+    assert result["content"]["sections"] == []
+
+
+def test_sync_parses_sharing_a_token_do_not_interleave(tmp_path, monkeypatch):
+    from paperreader.ingestion import uniparser_adapter
+
+    state = {"current": None}
+
+    def post(url, files=None, data=None, json=None, timeout=None, stream=False):
+        if url.endswith("/trigger-file-async"):
+            state["current"] = files["file"].name.rsplit("/", 1)[-1]
+            return _FakeResponse({"status": "success"})
+        # The server answers with whichever file was triggered last under the token.
+        time.sleep(0.01)
+        return _FakeResponse({"content": {"sections": [{"heading": state["current"], "text": "body"}]}})
+
+    monkeypatch.setattr(uniparser_adapter.requests, "post", post)
+    sources = []
+    for index in range(4):
+        path = tmp_path / f"{index}.pdf"
+        path.write_bytes(b"%PDF")
+        sources.append(path)
+
+    def parse(source):
+        return uniparser_adapter.parse_document(source, tmp_path / f"{source.stem}.json", token="shared")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(parse, sources))
+
+    assert [result["content"]["sections"][0]["heading"] for result in results] == [s.name for s in sources]
+
+
+def test_timed_out_exclusive_job_keeps_token_lock_until_server_finishes(tmp_path):
+    from paperreader.ingestion.uniparser_adapter import _token_lock
+
+    source = tmp_path / "8.0.pdf"
+    source.write_bytes(b"%PDF")
+    server = _FakeParserServer(per_job_tokens=False)
+    jobs = UniParserJobQueue(
+        host="http://parser",
+        token="shared-t",
+        poll_interval=0.01,
+        max_poll_interval=0.01,
+        job_timeout=0.02,
+        session=server,
+    )
+
+    output = tmp_path / "8.0.json"
+    result = jobs.submit(source, output, doi="10.1/slow").result(timeout=5)
+
+    assert result["content"]["sections"] == []
+    assert json_module.loads(output.read_text(encoding="utf-8")) == result
+    # The server is still working on the shared token, so nobody else may trigger under it.
+    assert _token_lock("shared-t").locked()
+    jobs.close()
+    assert server.polls["8.0.pdf"] == 8
+    assert not _token_lock("shared-t").locked()
+    # The late result was only drained; the placeholder the caller saw stays on disk.
+    assert json_module.loads(output.read_text(encoding="utf-8")) == result
+
+
+def test_mode_is_decided_by_the_first_trigger_response(tmp_path):
+    sources = []
+    for n in (1, 1, 1, 1):
+        path = tmp_path / f"{n}.{len(sources)}.pdf"
+        path.write_bytes(b"%PDF")
+        sources.append(path)
+    server = _FakeParserServer()
+    events = []
+
+    class _Session:
+        omit_token = False
+
+        def post(self, url, **kwargs):
+            if not url.endswith("/trigger-file-async"):
+                return server.post(url, **kwargs)
+            events.append("start")
+            if len(events) == 1:
+                time.sleep(0.05)
+            response = server.post(url, **kwargs)
+            events.append("end")
+            if self.omit_token:
+                response.payload.pop("token")
+            return response
+
+    session = _Session()
+    jobs = UniParserJobQueue(
+        host="http://parser", token="shared-m", max_in_flight=4, poll_interval=0.01, session=session
+    )
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(jobs.submit, source, source.with_suffix(".json")) for source in sources[:3]]
+        futures = [future.result() for future in futures]
+    results = [future.result(timeout=5) for future in futures]
+
+    # Nothing else was triggered until the first response had decided the mode.
+    assert events[:2] == ["start", "end"]
+    assert jobs._per_job_ids is True
+    for source, result in zip(sources, results):
+        assert result["content"]["sections"][0]["heading"] == source.name
+
+    # A per-job server omitting the token once must not flip the mode under running jobs;
+    # that result is keyed by the shared token and could be any job's, so it falls back.
+    session.omit_token = True
+    result = jobs.submit(sources[3], sources[3].with_suffix(".json")).result(timeout=5)
+    jobs.close()
+    assert jobs._per_job_ids is True
+    assert result["content"]["sections"] == []
+
+
+def test_sync_parse_error_status_keeps_placeholder(tmp_path, monkeypatch):
+    import requests
+
+    from paperreader.ingestion import uniparser_adapter
+
+    class _ErrorResponse(_FakeResponse):
+        def raise_for_status(self):
+            raise requests.HTTPError("502 Bad Gateway")
+
+        def iter_content(self, chunk_size):
+            yield b"<html>Bad Gateway</html>"
+
+    def post(url, files=None, data=None, json=None, timeout=None, stream=False):
+        if url.endswith("/trigger-file-async"):
+            return _FakeResponse({"status": "success"})
+        return _ErrorResponse(None)
+
+    monkeypatch.setattr(uniparser_adapter.requests, "post", post)
+    source = tmp_path / "paper.pdf"
+    source.write_bytes(b"%PDF")
+    output = tmp_path / "paper.json"
+
+    result = uniparser_adapter.parse_document(source, output, doi="10.1/err")
+
+    assert result["metadata"]["doi"] == "10.1/err"
+    assert json_module.loads(output.read_text(encoding="utf-8"))["content"]["sections"] == []
+
+
+def test_pending_poll_never_replaces_the_output_file(tmp_path):
+    source = tmp_path / "3.0.pdf"
+    source.write_bytes(b"%PDF")
+    output = tmp_path / "3.0.json"
+    output.write_text('{"previous": true}', encoding="utf-8")
+    server = _FakeParserServer()
+    seen = []
+    post = server.post
+
+    def watching_post(url, **kwargs):
+        if url.endswith("/get-result"):
+            seen.append(json_module.loads(output.read_text(encoding="utf-8")))
+        return post(url, **kwargs)
+
+    jobs = UniParserJobQueue(host="http://parser", poll_interval=0.01, session=SimpleNamespace(post=watching_post))
+    result = jobs.parse(source, output)
+    jobs.close()
+
+    assert seen == [{"previous": True}] * 3
+    assert result["content"]["sections"][0]["heading"] == "3.0.pdf"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["3.0.json", "3.0.pdf"]
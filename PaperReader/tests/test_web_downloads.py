@@ -0,0 +1,98 @@
+import io
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from paperreader.pipeline.ledger import RunLedger
+from paperreader.pipeline.run import artifact_paths
+from paperreader.web import server
+from paperreader.web import downloads
+
+
+def _client(settings, monkeypatch):
+    monkeypatch.setattr(server, "current_settings", lambda: settings)
+    return TestClient(server.app)
+
+
+def test_download_supports_ranges_and_etags(settings, monkeypatch):
+    export = settings.output_xlsx / "extracted_x.csv"
+    export.parent.mkdir(parents=True)
+    export.write_bytes(bytes(range(256)) * 4)
+    client = _client(settings, monkeypatch)
+
+    full = client.get("/download", params={"path": str(export)})
+    assert full.status_code == 200
+    assert full.content == export.read_bytes()
+    etag = full.headers["etag"]
+
+    assert client.get("/download", params={"path": str(export)}, headers={"If-None-Match": etag}).status_code == 304
+
+    part = client.get("/download", params={"path": str(export)}, headers={"Range": "bytes=10-19"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == "bytes 10-19/1024"
+    assert part.content == bytes(range(10, 20))
+
+    tail = client.get("/download", params={"path": str(export)}, headers={"Range": "bytes=-4"})
+    assert tail.content == bytes(range(252, 256))
+
+    stale = client.get("/download", params={"path": str(export)}, headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200
+
+    beyond = client.get("/download", params={"path": str(export)}, headers={"Range": "bytes=5000-"})
+    assert beyond.status_code == 416
+
+
+def test_download_is_confined_to_data_dir(settings, tmp_path_factory, monkeypatch):
+    outside = tmp_path_factory.mktemp("elsewhere") / "secret.txt"
+    outside.write_text("secret")
+    client = _client(settings, monkeypatch)
+
+    assert client.get("/download", params={"path": str(outside)}).status_code == 403
+    assert client.get("/download", params={"path": "../" * 10 + str(outside)}).status_code == 403
+    assert client.get("/download", params={"path": str(settings.data_dir / "missing.json")}).status_code == 404
+
+
+def test_stream_zip_yields_while_compressing(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloads, "CHUNK_SIZE", 1024)
+    member = tmp_path / "big.bin"
+    member.write_bytes(os.urandom(64 * 1024))
+
+    chunks = list(downloads.stream_zip([("big.bin", member), ("gone.bin", tmp_path / "gone.bin")]))
+
+    # The archive arrives in many pieces instead of one buffered blob.
+    assert len(chunks) > 2
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == ["big.bin"]
+    assert archive.read("big.bin") == member.read_bytes()
+
+
+def test_run_bundle_streams_outputs_of_the_run(settings, monkeypatch):
+    ledger = RunLedger(settings.output_ledger)
+    ledger.start_run("r1", ["10.1/a", "10.1/b"], None, "csv")
+    ledger.close()
+    for doi in ("10.1/a", "10.1/b"):
+        for kind, path in artifact_paths(settings, doi).items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f'{{"{kind}": "{doi}"}}', encoding="utf-8")
+    artifact_paths(settings, "10.1/b")["info"].unlink()
+    settings.output_xlsx.mkdir(parents=True)
+    (settings.output_xlsx / "extracted_r1.csv").write_text("doi\n", encoding="utf-8")
+    (settings.output_xlsx / "extracted_r2.csv").write_text("other run\n", encoding="utf-8")
+    client = _client(settings, monkeypatch)
+
+    response = client.get("/runs/r1/bundle.zip")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == [
+        "cleaned/10.1_a.json",
+        "cleaned/10.1_b.json",
+        "extracted_r1.csv",
+        "info/10.1_a.json",
+        "parsed/10.1_a.json",
+        "parsed/10.1_b.json",
+    ]
+    assert archive.read("parsed/10.1_a.json") == b'{"parsed": "10.1/a"}'
+    assert client.get("/runs/nope/bundle.zip").status_code == 404
@@ -0,0 +1,78 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from paperreader.web import server
+from paperreader.web.jobs import JobManager
+
+
+def _blocking_runner(started, release):
+    def runner(settings, dois=None, on_event=None, cancel_event=None):
+        on_event("run_started", {"run_id": "r1", "total": len(dois), "done": 0})
+        on_event("stage", {"doi": dois[0], "stage": "parse", "status": "running"})
+        started.set()
+        release.wait(timeout=5)
+        status = "cancelled" if cancel_event.is_set() else "completed"
+        if status == "completed":
+            on_event("doi_done", {"doi": dois[0], "rows": 1})
+        on_event("run_finished", {"status": status, "output": "out.csv"})
+
+    return runner
+
+
+def test_jobs_queue_report_progress_and_cancel(settings):
+    started, release = threading.Event(), threading.Event()
+    manager = JobManager(max_workers=1, runner=_blocking_runner(started, release))
+
+    running = manager.submit(settings, dois=["10.1/a", "10.1/b"], label="alice")
+    queued = manager.submit(settings, dois=["10.1/c"], label="bob")
+    assert started.wait(timeout=5)
+
+    snapshot = running.snapshot()
+    assert (snapshot["status"], snapshot["total"]) == ("running", 2)
+    assert snapshot["stages"] == {"10.1/a": "parse:running"}
+    assert queued.status == "queued"
+
+    assert manager.cancel(queued.job_id)
+    assert queued.status == "cancelled"
+    assert manager.cancel(running.job_id)
+    release.set()
+    running.future.result(timeout=5)
+
+    assert running.status == "cancelled"
+    assert not manager.cancel(running.job_id)
+    assert [message["event"] for message in running.events][-2:] == ["run_finished", "job_finished"]
+    manager.shutdown()
+
+
+def test_job_events_stream_replays_history(settings, monkeypatch):
+    release = threading.Event()
+    release.set()
+    manager = JobManager(max_workers=1, runner=_blocking_runner(threading.Event(), release))
+    monkeypatch.setattr(server, "jobs", manager)
+    job = manager.submit(settings, dois=["10.1/a"])
+    job.future.result(timeout=5)
+
+    with TestClient(server.app).stream("GET", f"/jobs/{job.job_id}/events") as response:
+        body = "".join(response.iter_text())
+
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events[0] == "job_queued"
+    assert events[-1] == "job_finished"
+    assert "doi_done" in events
+    manager.shutdown()
+
+
+def test_finished_jobs_drop_settings_and_old_ones_are_evicted(settings):
+    release = threading.Event()
+    release.set()
+    manager = JobManager(max_workers=1, runner=_blocking_runner(threading.Event(), release), max_finished=2)
+
+    jobs = [manager.submit(settings, dois=[f"10.1/{n}"]) for n in range(3)]
+    for job in jobs:
+        job.future.result(timeout=5)
+
+    assert all(job.settings is None and job.status == "completed" for job in jobs)
+    assert manager.get(jobs[0].job_id) is None
+    assert {job.job_id for job in manager.list()} == {jobs[1].job_id, jobs[2].job_id}
+    manager.shutdown()
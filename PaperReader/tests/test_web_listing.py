@@ -0,0 +1,54 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from paperreader.web import server
+from paperreader.web.listing import DirectoryIndex
+
+
+def test_listing_is_cached_until_directory_changes(tmp_path, monkeypatch):
+    (tmp_path / "b.json").write_text("{}")
+    (tmp_path / "a.json").write_text("{}")
+    (tmp_path / ".c.json.tmp").write_text("")
+    index = DirectoryIndex()
+
+    first = index.listing(tmp_path, (".json",))
+    assert first.names == ("a.json", "b.json")
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+    assert index.listing(tmp_path, (".json",)) is first
+    assert scans == []
+
+    (tmp_path / "c.json").write_text("{}")
+    stat = tmp_path.stat()
+    # Guarantee a visible mtime change even on coarse-grained filesystems.
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert len(index.listing(tmp_path, (".json",))) == 3
+    assert len(scans) == 1
+
+
+def test_files_endpoint_pages_listing(settings, monkeypatch):
+    settings.output_parsed.mkdir(parents=True)
+    for i in range(5):
+        (settings.output_parsed / f"10.1_{i}.json").write_text("{}")
+    monkeypatch.setattr(server, "current_settings", lambda: settings)
+
+    page = TestClient(server.app).get("/files/parsed", params={"offset": 2, "limit": 2}).json()
+
+    assert page["total"] == 5
+    assert [item["name"] for item in page["items"]] == ["10.1_2.json", "10.1_3.json"]
+
+
+def test_index_renders_first_page_only(settings, monkeypatch):
+    server.ensure_directories(settings)
+    for i in range(server.PAGE_SIZE + 5):
+        (settings.output_parsed / f"10.1_{i:03d}.json").write_text("{}")
+    monkeypatch.setattr(server, "current_settings", lambda: settings)
+
+    response = TestClient(server.app).get("/")
+
+    assert response.status_code == 200
+    assert response.text.count("<tr><td>原始</td>") == server.PAGE_SIZE
+    assert 'data-kind="parsed"' in response.text
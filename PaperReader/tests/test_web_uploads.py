@@ -0,0 +1,84 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from paperreader.web import server
+from paperreader.web.uploads import UploadTooLarge, extract_pdfs, save_stream
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar_gz(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("build, filename", [(_zip, "papers.zip"), (_tar_gz, "papers.tar.gz")])
+def test_extract_pdfs_flattens_and_skips_other_files(tmp_path, build, filename):
+    data = build({"batch/a.pdf": b"%PDF-a", "../../b.PDF": b"%PDF-b", "notes.txt": b"x", "batch/.c.pdf": b"x"})
+
+    saved = extract_pdfs(io.BytesIO(data), filename, tmp_path)
+
+    assert sorted(path.name for path in saved) == ["a.pdf", "b.PDF"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.pdf", "b.PDF"]
+    assert (tmp_path / "a.pdf").read_bytes() == b"%PDF-a"
+
+
+def test_colliding_flattened_names_are_renamed(tmp_path):
+    data = _zip({"one/a.pdf": b"%PDF-1", "two/a.pdf": b"%PDF-2", "three/A.pdf": b"%PDF-3"})
+
+    saved = extract_pdfs(io.BytesIO(data), "papers.zip", tmp_path)
+
+    assert [path.name for path in saved] == ["a.pdf", "a_2.pdf", "A_3.pdf"]
+    assert [path.read_bytes() for path in saved] == [b"%PDF-1", b"%PDF-2", b"%PDF-3"]
+
+
+def test_size_limit_counts_unpacked_bytes_and_leaves_no_partial_file(tmp_path):
+    data = _zip({"a.pdf": b"0" * 600, "b.pdf": b"0" * 600})
+
+    with pytest.raises(UploadTooLarge):
+        extract_pdfs(io.BytesIO(data), "bomb.zip", tmp_path, max_bytes=1000)
+    # a.pdf fit under the limit, but nothing is kept from a rejected archive.
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(UploadTooLarge):
+        save_stream(io.BytesIO(b"0" * 2000), tmp_path / "big.pdf", max_bytes=1000)
+    assert not (tmp_path / "big.pdf").exists()
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(".")]
+
+
+def test_upload_endpoint_accepts_pdfs_and_archives(settings, monkeypatch):
+    server.ensure_directories(settings)
+    monkeypatch.setattr(server, "current_settings", lambda: settings)
+    client = TestClient(server.app)
+
+    response = client.post(
+        "/upload/pdfs",
+        files=[
+            ("files", ("single.pdf", b"%PDF-single", "application/pdf")),
+            ("files", ("batch.zip", _zip({"x/one.pdf": b"%PDF-1", "x/two.pdf": b"%PDF-2"}), "application/zip")),
+        ],
+        follow_redirects=False,
+    )
+
+    assert response.status_code == 303
+    assert sorted(path.name for path in settings.input_pdfs.iterdir()) == ["one.pdf", "single.pdf", "two.pdf"]
+
+    monkeypatch.setattr(server, "UPLOAD_MAX_MB", 0)
+    response = client.post("/upload/pdfs", files=[("files", ("big.pdf", b"%PDF-big", "application/pdf"))])
+    assert response.status_code == 413
+    assert not (settings.input_pdfs / "big.pdf").exists()